@@ -10,16 +10,28 @@ MODEL_CONFIG = {
         "api_endpoint": "https://api.openai.com/v1",
         "temperature": 0.7,
         "max_tokens": 2048,
+        "api_key": None,  # Falls back to the OPENAI_API_KEY environment variable
+        "timeout_seconds": 60,
+        "connect_timeout_seconds": 5,
+        "max_connections": 4,
+        "max_retries": 3,
     },
     "local": {
         "model": "neural-chat",  # Ollama model name
         "api_endpoint": "http://localhost:11434",
         "temperature": 0.7,
         "max_tokens": 2048,
+        "timeout_seconds": 180,  # Local models can be slow to load and generate
+        "connect_timeout_seconds": 2,
+        "max_connections": 2,
+        "max_retries": 2,
+        "keep_alive": "30m",  # Keep the model and its prompt cache loaded between turns
     },
     "offline": {
         "mode": "templates",
-        "template_dir": "scripts/templates/",
+        "template_dir": "scripts/templates/",  # Relative to the add-in folder
+        "min_score": 4.0,          # Below this the request is reported as unmatched
+        "persist_index": True,     # Reuse scripts/templates/.index.json while templates are unchanged
     }
 }
 
@@ -32,13 +44,92 @@ PROMPT_CONFIG = {
     "max_recent_features": 5,
 }
 
+# Fusion API Reference Index (retrieval for prompts)
+API_INDEX_CONFIG = {
+    "enabled": True,
+    "sources": [],            # Stub .py files/dirs or JSON dumps; empty = installed adsk stubs, else scripts/api_reference.json
+    "index_path": None,       # None = .cache/api_index.bin inside the add-in folder
+    "top_k": 8,               # API snippets injected per request
+    "max_tokens": 600,        # Prompt budget for API snippets
+}
+
+# Follow-up Edit Configuration (patches instead of full regeneration)
+PATCH_CONFIG = {
+    "enabled": True,
+    "min_lines": 40,              # Shorter scripts are cheaper to regenerate than to patch
+    "context_lines": 3,
+    "fuzz": 2,                    # Context lines a hunk may drop at each end to find its place
+    "similarity_threshold": 0.8,  # Token similarity for hunks whose lines changed slightly
+}
+
+# Static Validation Configuration
+VALIDATION_CONFIG = {
+    "enabled": True,
+    "block_on_errors": True,  # Don't execute scripts with validation errors
+    "symbols_path": None,     # None = .cache/api_symbols.json inside the add-in folder (same sources as the API index)
+}
+
+# Context Capture Configuration
+CONTEXT_CONFIG = {
+    "incremental_snapshots": True,  # Rebuild context sections only after Fusion events
+    "assembly_prompt_depth": 2,     # Occurrence tree levels included in prompts
+    "assembly_prompt_limit": 50,    # Max occurrences included in prompts
+    "assembly_page_size": 200,      # Default page size for tree browsing
+    "selection_mode": "geometry",   # Options: "basic" (types only), "geometry" (fingerprints)
+    "selection_fingerprint_limit": 200,
+    "cam_max_operations_per_setup": 50,  # Operations listed per setup in CAM snapshots
+}
+
+# Speculative Generation Configuration
+SPECULATIVE_CONFIG = {
+    "enabled": False,               # Ask for several candidates and keep the first valid one
+    "candidates": 3,                # Total requests per message (caps spend)
+    "max_concurrent": 2,            # Requests in flight at once
+    "temperatures": [0.2, 0.5, 0.8],
+    "backends": [],                 # Extra MODEL_CONFIG backends to race against the default one
+}
+
+# Response Cache Configuration
+CACHE_CONFIG = {
+    "enabled": True,
+    "max_entries": 256,        # In-memory LRU size
+    "ttl_seconds": 86400,
+    "disk_dir": None,          # None = .cache/responses inside the add-in folder, "" = memory only
+    "max_disk_mb": 50,
+}
+
 # Execution Configuration
 EXECUTION_CONFIG = {
-    "timeout_seconds": 60,
+    "timeout_seconds": 60,  # Scripts running longer are interrupted and rolled back (0 disables)
+    "timeout_mode": "interrupt",  # "interrupt" (no per-line cost) or "trace" (checks on every script line)
+    "timeout_recheck_seconds": 1.0,  # Re-raise interval if a script swallows the timeout
+    "defer_compute": False,  # Recompute once after the script instead of after every feature
     "auto_transaction": True,
     "capture_output": True,
     "max_retries_on_error": 2,
     "sandbox_mode": True,
+    "compile_cache_size": 64,  # Compiled scripts kept for re-runs and parameter sweeps
+    "profile": False,          # Per-line / per-API-call timing of every run (slows scripts down)
+    "profile_top_n": 10,       # Hotspots reported per category
+    "output_buffer_chars": 200_000,  # Per stream; older output is dropped beyond this
+    "output_chunk_chars": 4096,  # Streamed to the panel every this many characters...
+    "output_flush_seconds": 0.25,  # ...or this often, whichever comes first
+}
+
+# Sandbox Configuration (worker processes for running generated code outside Fusion)
+SANDBOX_CONFIG = {
+    "workers": 0,  # 0 = one per core, at most 4
+    "memory_limit_mb": 512,  # Per worker; 0 disables
+    "startup_timeout_seconds": 30,
+    "python_executable": "",  # Empty = this interpreter (Fusion's bundled Python inside Fusion)
+}
+
+# Benchmarking (record real API latencies for scripts/benchmark.py to replay offline)
+BENCHMARK_CONFIG = {
+    "record_api_trace": False,  # Times every Fusion API call while the add-in runs (slows it down)
+    "trace_file": "",  # Empty = api_trace.json in the add-in folder
+    "max_events": 100_000,  # Call sequence kept in the trace; per-call statistics are unbounded
+    "samples_per_call": 256,  # Latency samples kept per API member
 }
 
 # UI Configuration
@@ -57,6 +148,13 @@ PROJECT_CONFIG = {
     "supported_geometry": ["stl", "step", "stp", "iges", "igs", "obj"],
     "supported_docs": ["txt", "md", "json", "pdf"],
     "supported_images": ["png", "jpg", "jpeg", "bmp"],
+    "ignore_dirs": [".git", ".svn", ".hg", "__pycache__", "node_modules", ".venv", "venv", ".cache"],  # Names or glob patterns, never descended into
+    "scan_workers": 8,  # Threads listing directories in parallel (helps most on network shares); 1 = serial
+    "manifest_dir": None,  # None = .cache/projects inside the add-in folder, "" = no manifest (always a full scan)
+    "watch_mode": "auto",  # "auto" (inotify on Linux, else polling), "inotify" or "poll" (use for network shares edited elsewhere)
+    "watch_debounce_seconds": 0.5,  # Changes are applied this long after the last one...
+    "watch_max_delay_seconds": 5.0,  # ...but no later than this after the first
+    "watch_poll_seconds": 30.0,  # Interval of the polling fallback
 }
 
 # Feature Flags
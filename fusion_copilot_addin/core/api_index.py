@@ -0,0 +1,415 @@
+"""
+API Index - Memory-mapped BM25 search over the Fusion 360 API reference
+"""
+
+import ast
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import re
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# File layout (little endian):
+#   header | doc table | term table (sorted by term bytes) | postings | strings
+_HEADER = struct.Struct("<8sIIf32sQQQQ")  # magic, docs, terms, avg doc length, source signature, 4 offsets
+_DOC = struct.Struct("<III")              # snippet offset, snippet length, doc length (terms)
+_TERM = struct.Struct("<IHII")            # term offset, term length, first posting, document frequency
+_POSTING = struct.Struct("<If")           # doc id, BM25 term weight (tf and length normalisation)
+MAGIC = b"FAPIIDX2"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+MAX_DOC_CHARS = 200
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can for from i in into is it me my of on or please "
+    "the this that to with would you self".split()
+)
+
+_IDENT_RE = re.compile(r"[A-Za-z][A-Za-z0-9]*")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+_SENTENCE_END_RE = re.compile(r"(?<!\.[a-z])\.\s(?=[A-Z])")
+
+
+def _stem(word: str) -> str:
+    """Plural folding so "edges" matches Edge and "bodies" matches Body"""
+    if len(word) <= 3 or word.endswith("ss"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("ches", "shes", "xes")):
+        return word[:-2]
+    if word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Search terms with camelCase split: addByTwoPoints -> addbytwopoints, add, by, two, point.
+    The whole identifier is kept so exact member names rank first.
+    """
+    terms = []
+    for identifier in _IDENT_RE.findall(text or ""):
+        parts = _CAMEL_RE.findall(identifier)
+        if len(parts) > 1:
+            terms.append(identifier.lower())
+        for part in parts:
+            part = part.lower()
+            if part not in STOPWORDS:
+                terms.append(_stem(part))
+    return terms
+
+
+class ApiEntry:
+    """One class or member of the API reference"""
+    
+    __slots__ = ("module", "class_name", "member", "kind", "signature", "doc")
+    
+    def __init__(self, module: str, class_name: str, member: str = "", kind: str = "class",
+                 signature: str = "", doc: str = ""):
+        self.module = module
+        self.class_name = class_name
+        self.member = member
+        self.kind = kind
+        self.signature = signature
+        self.doc = _first_sentence(doc)
+    
+    def snippet(self) -> str:
+        """One-line reference text shown in prompts"""
+        if self.kind == "class":
+            text = f"{self.module}.{self.class_name}"
+        else:
+            text = f"{self.class_name}.{self.member}{self.signature}"
+        return f"{text}  # {self.doc}" if self.doc else text
+    
+    def terms(self) -> List[str]:
+        """Indexed terms; names count twice so they outrank doc text"""
+        names = tokenize(f"{self.class_name} {self.member}")
+        return names + names + tokenize(self.signature) + tokenize(self.doc)
+
+
+def _first_sentence(doc: str) -> str:
+    doc = " ".join((doc or "").split())
+    # Sentence end: a period before a capital letter, but not in "e.g. X"
+    end = _SENTENCE_END_RE.search(doc)
+    if end and end.start() < MAX_DOC_CHARS:
+        return doc[:end.start() + 1]
+    return doc if len(doc) <= MAX_DOC_CHARS else doc[:MAX_DOC_CHARS - 3].rstrip() + "..."
+
+
+def collect_from_stubs(path: str, module: Optional[str] = None) -> List[ApiEntry]:
+    """
+    Read classes, methods and properties from an API stub file (the adsk
+    core.py / fusion.py / cam.py modules shipped with Fusion).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    module = module or "adsk." + os.path.splitext(os.path.basename(path))[0]
+    
+    entries = []
+    for node in tree.body:
+        if not isinstance(node, ast.ClassDef) or node.name.startswith("_"):
+            continue
+        bases = [_annotation(base).split(".")[-1] for base in node.bases]
+        bases = [base for base in bases if base != "object"]
+        signature = f"({', '.join(bases)})" if bases else ""
+        entries.append(ApiEntry(module, node.name, signature=signature, doc=ast.get_docstring(node) or ""))
+        
+        properties: Dict[str, ApiEntry] = {}
+        writable = set()
+        for item in node.body:
+            if isinstance(item, ast.FunctionDef) and not item.name.startswith("_"):
+                decorators = [ast.unparse(d) for d in item.decorator_list]
+                if any(d.endswith(".setter") for d in decorators):
+                    writable.add(item.name)
+                    continue
+                doc = ast.get_docstring(item) or ""
+                if "property" in decorators:
+                    returns = f": {_annotation(item.returns)}" if item.returns else ""
+                    properties[item.name] = ApiEntry(module, node.name, item.name, "property", returns, doc)
+                else:
+                    entries.append(ApiEntry(module, node.name, item.name, "method", _signature(item), doc))
+            elif isinstance(item, ast.Assign) and isinstance(item.value, ast.Constant):
+                # Enum values: JoinFeatureOperation = 0
+                for target in item.targets:
+                    if isinstance(target, ast.Name) and not target.id.startswith("_"):
+                        entries.append(ApiEntry(module, node.name, target.id, "constant"))
+            elif isinstance(item, ast.Assign) and isinstance(item.value, ast.Call):
+                # SWIG style: name = property(getter, setter, doc="...")
+                call = item.value
+                if getattr(call.func, "id", None) != "property":
+                    continue
+                doc = next((kw.value.value for kw in call.keywords
+                            if kw.arg == "doc" and isinstance(kw.value, ast.Constant)), "")
+                for target in item.targets:
+                    if isinstance(target, ast.Name) and not target.id.startswith("_"):
+                        properties[target.id] = ApiEntry(module, node.name, target.id, "property", "", doc)
+                        if len(call.args) > 1:
+                            writable.add(target.id)
+        
+        for name, entry in properties.items():
+            if name not in writable:
+                entry.signature += " (read-only)"
+            entries.append(entry)
+    return entries
+
+
+def _annotation(node) -> str:
+    text = ast.unparse(node)
+    return text.strip("'\"")
+
+
+def _signature(func: ast.FunctionDef) -> str:
+    """(name: Type, optional: Type = ...) -> Return"""
+    args = []
+    positional = func.args.args
+    first_default = len(positional) - len(func.args.defaults)
+    for i, arg in enumerate(positional):
+        if arg.arg in ("self", "cls"):
+            continue
+        text = f"{arg.arg}: {_annotation(arg.annotation)}" if arg.annotation else arg.arg
+        if i >= first_default:
+            text += " = ..."
+        args.append(text)
+    if func.args.vararg is not None:
+        args.append(f"*{func.args.vararg.arg}")
+    returns = f" -> {_annotation(func.returns)}" if func.returns else ""
+    return f"({', '.join(args)}){returns}"
+
+
+def collect_from_json(path: str) -> List[ApiEntry]:
+    """
+    Read a JSON dump: a list of
+    {"module", "class", "member", "kind", "signature", "doc"} objects.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        records = json.load(f)
+    return [
+        ApiEntry(
+            record.get("module", "adsk"),
+            record["class"],
+            record.get("member", ""),
+            record.get("kind", "method" if record.get("member") else "class"),
+            record.get("signature", ""),
+            record.get("doc", ""),
+        )
+        for record in records
+    ]
+
+
+def collect_entries(sources: Sequence[str]) -> List[ApiEntry]:
+    """Entries from stub files, stub directories and JSON dumps"""
+    entries = []
+    for path in expand_sources(sources):
+        if path.endswith(".json"):
+            entries.extend(collect_from_json(path))
+        else:
+            entries.extend(collect_from_stubs(path))
+    return entries
+
+
+def expand_sources(sources: Sequence[str]) -> List[str]:
+    """Source files, with directories expanded to the .py/.json files in them"""
+    files = []
+    for source in sources:
+        if os.path.isdir(source):
+            files.extend(
+                os.path.join(source, name) for name in sorted(os.listdir(source))
+                if name.endswith((".py", ".json")) and not name.startswith("_")
+            )
+        elif os.path.isfile(source):
+            files.append(source)
+    return files
+
+
+def source_signature(sources: Sequence[str]) -> bytes:
+    """Digest of source paths, sizes and mtimes (32 bytes, stored in the header)"""
+    digest = hashlib.sha256()
+    for path in expand_sources(sources):
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()[:32].encode("ascii")
+
+
+def write_index(entries: Sequence[ApiEntry], path: str, signature: bytes = b""):
+    """Build the inverted index and write it in the memory-mappable layout"""
+    strings = bytearray()
+    docs = []
+    postings: Dict[str, List[Tuple[int, int]]] = {}
+    total_length = 0
+    
+    for doc_id, entry in enumerate(entries):
+        text = entry.snippet().encode("utf-8")
+        terms = entry.terms()
+        counts: Dict[str, int] = {}
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        for term, count in counts.items():
+            postings.setdefault(term, []).append((doc_id, count))
+        docs.append((len(strings), len(text), len(terms)))
+        strings += text
+        total_length += len(terms)
+    average = total_length / len(docs) if docs else 0.0
+    
+    term_records = []
+    posting_blob = bytearray()
+    posting_count = 0
+    for term in sorted(postings, key=lambda t: t.encode("utf-8")):
+        encoded = term.encode("utf-8")
+        term_records.append((len(strings), len(encoded), posting_count, len(postings[term])))
+        strings += encoded
+        for doc_id, count in postings[term]:
+            # The document-dependent half of BM25 is fixed at build time
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * docs[doc_id][2] / (average or 1))
+            posting_blob += _POSTING.pack(doc_id, count * (BM25_K1 + 1) / (count + norm))
+        posting_count += len(postings[term])
+    
+    docs_offset = _HEADER.size
+    terms_offset = docs_offset + _DOC.size * len(docs)
+    postings_offset = terms_offset + _TERM.size * len(term_records)
+    strings_offset = postings_offset + len(posting_blob)
+    
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(docs), len(term_records), average, signature.ljust(32, b"\0")[:32],
+                             docs_offset, terms_offset, postings_offset, strings_offset))
+        for record in docs:
+            f.write(_DOC.pack(*record))
+        for record in term_records:
+            f.write(_TERM.pack(*record))
+        f.write(posting_blob)
+        f.write(strings)
+    os.replace(tmp_path, path)
+
+
+class ApiReferenceIndex:
+    """
+    Read-only BM25 index over API snippets, memory-mapped from disk.
+    
+    Opening only reads the header; term lookups binary-search the sorted term
+    table in place and touch just the postings they need, so load time does
+    not grow with the size of the API surface.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"Empty API index: {path}")
+        
+        (magic, self.doc_count, self.term_count, self.average_length, signature,
+         self._docs, self._terms, self._postings, self._strings) = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"Not an API index: {path}")
+        self.signature = signature.rstrip(b"\0")
+    
+    def __len__(self) -> int:
+        return self.doc_count
+    
+    def search(self, query: str, k: int = 8) -> List[Tuple[str, float]]:
+        """
+        Top-k snippets for a query.
+        
+        Returns:
+            [(snippet, score), ...] best first
+        """
+        if self.doc_count == 0:
+            return []
+        
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            found = self._find_term(term)
+            if found is None:
+                continue
+            first, frequency = found
+            idf = math.log(1 + (self.doc_count - frequency + 0.5) / (frequency + 0.5))
+            start = self._postings + first * _POSTING.size
+            block = self._mm[start:start + frequency * _POSTING.size]
+            for doc_id, weight in _POSTING.iter_unpack(block):
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * weight
+        
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.snippet(doc_id), score) for doc_id, score in best]
+    
+    def snippet(self, doc_id: int) -> str:
+        offset, length, _ = _DOC.unpack_from(self._mm, self._docs + doc_id * _DOC.size)
+        start = self._strings + offset
+        return self._mm[start:start + length].decode("utf-8")
+    
+    def close(self):
+        try:
+            self._mm.close()
+        except Exception:
+            pass
+        self._file.close()
+    
+    def _find_term(self, term: str) -> Optional[Tuple[int, int]]:
+        """(first posting, document frequency) via binary search on the term table"""
+        key = term.encode("utf-8")
+        lo, hi = 0, self.term_count - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            offset, length, first, frequency = _TERM.unpack_from(self._mm, self._terms + mid * _TERM.size)
+            start = self._strings + offset
+            candidate = self._mm[start:start + length]
+            if candidate == key:
+                return first, frequency
+            if candidate < key:
+                lo = mid + 1
+            else:
+                hi = mid - 1
+        return None
+
+
+def find_stub_sources() -> List[str]:
+    """API stub modules of the Fusion Python installation, if available"""
+    try:
+        import adsk
+    except Exception:
+        return []
+    if getattr(adsk, "__fake__", False):
+        # An offline stand-in (scripts/fake_adsk) implements only part of the API
+        return []
+    
+    package_dir = os.path.dirname(os.path.abspath(adsk.__file__))
+    for candidate in (os.path.join(package_dir, "defs", "adsk"), package_dir):
+        stubs = [os.path.join(candidate, name) for name in ("core.py", "fusion.py", "cam.py")]
+        stubs = [path for path in stubs if os.path.isfile(path)]
+        if stubs:
+            return stubs
+    return []
+
+
+def load_api_index(sources: Sequence[str], index_path: str) -> Optional[ApiReferenceIndex]:
+    """
+    Open the index at index_path, rebuilding it first if the sources changed
+    since it was written. Returns None if there is nothing to index.
+    """
+    if not expand_sources(sources):
+        return None
+    signature = source_signature(sources)
+    
+    try:
+        index = ApiReferenceIndex(index_path)
+        if index.signature == signature:
+            return index
+        index.close()
+    except (OSError, ValueError, struct.error):
+        pass
+    
+    entries = collect_entries(sources)
+    if not entries:
+        return None
+    write_index(entries, index_path, signature)
+    return ApiReferenceIndex(index_path)
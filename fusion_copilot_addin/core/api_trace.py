@@ -0,0 +1,210 @@
+"""
+API Trace - Records Fusion API call latencies and replays them offline
+"""
+
+import json
+import random
+import sys
+import time
+from typing import Dict, Any, List, Optional
+
+from core.profiler import api_name
+
+
+TRACE_VERSION = 1
+
+
+def _is_api_frame(frame) -> bool:
+    return str(frame.f_globals.get("__name__", "")).startswith("adsk")
+
+
+def _summarize(value) -> Any:
+    """JSON-friendly, bounded description of an argument"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return value if len(value) <= 80 else value[:77] + "..."
+    return type(value).__name__
+
+
+class ApiRecorder:
+    """
+    Records every adsk call the add-in makes on one thread:
+    - Uses sys.setprofile like ScriptProfiler: SWIG accessors show up as C
+      calls, API methods as Python frames in adsk modules
+    - Only outermost API calls are recorded (not the calls an API method
+      makes internally), with their latency and a summary of their
+      arguments
+    - Keeps up to max_samples latencies per call for LatencyModel, and the
+      first max_events calls in order
+    
+    start() and stop() bracket the recording (or use it as a context
+    manager); trace() returns it as a JSON-serialisable dict.
+    """
+    
+    def __init__(self, max_events: int = 100_000, max_samples: int = 256):
+        self.max_events = max_events
+        self.max_samples = max_samples
+        self._calls: Dict[str, List[Any]] = {}     # name -> [count, total seconds, samples]
+        self._events: List[List[Any]] = []         # [offset, name, seconds, args]
+        self._stack: List[Any] = []                # (key, name, start, args)
+        self._rng = random.Random(0)
+        self._started = 0.0
+        self._previous = None
+        self._active = False
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+        return False
+    
+    def start(self):
+        """Start recording calls made on the current thread"""
+        if self._active:
+            return
+        if not self._started:
+            self._started = time.perf_counter()
+        self._previous = sys.getprofile()
+        sys.setprofile(self._profile)
+        self._active = True
+    
+    def stop(self):
+        """Stop recording and restore the previous profile function"""
+        if not self._active:
+            return
+        sys.setprofile(self._previous)
+        self._previous = None
+        self._active = False
+        self._stack.clear()
+    
+    def _profile(self, frame, event, arg):
+        if event == "call":
+            if self._stack or not _is_api_frame(frame):
+                return
+            caller = frame.f_back
+            if caller is not None and _is_api_frame(caller):
+                return
+            code = frame.f_code
+            name = getattr(code, "co_qualname", code.co_name)
+            args = [_summarize(value) for key, value in frame.f_locals.items() if key != "self"]
+            self._stack.append((frame, name, time.perf_counter(), args))
+        elif event == "c_call":
+            if self._stack or _is_api_frame(frame):
+                return
+            name = api_name(arg)
+            if name is not None:
+                self._stack.append((arg, name, time.perf_counter(), []))
+        elif event in ("return", "c_return", "c_exception"):
+            key = frame if event == "return" else arg
+            if self._stack and self._stack[0][0] is key:
+                _, name, start, args = self._stack.pop()
+                self._add(name, start, time.perf_counter() - start, args)
+    
+    def _add(self, name: str, start: float, seconds: float, args: List[Any]):
+        stats = self._calls.get(name)
+        if stats is None:
+            stats = self._calls[name] = [0, 0.0, []]
+        stats[0] += 1
+        stats[1] += seconds
+        samples = stats[2]
+        if len(samples) < self.max_samples:
+            samples.append(seconds)
+        else:
+            # Reservoir sampling keeps the samples representative of the whole run
+            slot = self._rng.randrange(stats[0])
+            if slot < self.max_samples:
+                samples[slot] = seconds
+        if len(self._events) < self.max_events:
+            self._events.append([round(start - self._started, 6), name, seconds, args])
+    
+    def trace(self) -> Dict[str, Any]:
+        """
+        The recording:
+            {
+                "version": int,
+                "calls": {name: {"count", "total_seconds", "samples"}},
+                "events": [[offset, name, seconds, args], ...],
+            }
+        """
+        return {
+            "version": TRACE_VERSION,
+            "calls": {
+                name: {"count": count, "total_seconds": total, "samples": list(samples)}
+                for name, (count, total, samples) in self._calls.items()
+            },
+            "events": [list(event) for event in self._events],
+        }
+    
+    def save(self, path: str):
+        """Write the recording as JSON"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.trace(), f)
+
+
+def load_trace(path: str) -> Dict[str, Any]:
+    """Read a recording written by ApiRecorder.save()"""
+    with open(path, "r", encoding="utf-8") as f:
+        trace = json.load(f)
+    if trace.get("version") != TRACE_VERSION:
+        raise ValueError(f"Unsupported API trace version: {trace.get('version')}")
+    return trace
+
+
+class LatencyModel:
+    """
+    Replays recorded latencies:
+    - delay(name) waits for a latency drawn from the recorded samples of
+      that call (default_seconds for calls that were never recorded),
+      multiplied by scale
+    - Short waits spin instead of sleeping, because sleep() can't wait
+      less than a scheduler tick on some platforms
+    - Draws are seeded, so a benchmark is repeatable
+    """
+    
+    SPIN_SECONDS = 0.002
+    
+    def __init__(self, samples: Optional[Dict[str, List[float]]] = None, scale: float = 1.0,
+                 default_seconds: float = 0.0, seed: int = 0):
+        self.samples = {name: list(values) for name, values in (samples or {}).items() if values}
+        self.scale = scale
+        self.default_seconds = default_seconds
+        self.calls: Dict[str, int] = {}
+        self.charged_seconds = 0.0
+        self._rng = random.Random(seed)
+    
+    @classmethod
+    def from_trace(cls, trace: Dict[str, Any], **kwargs) -> "LatencyModel":
+        """Build a model from ApiRecorder.trace() or load_trace()"""
+        return cls({name: stats.get("samples", []) for name, stats in trace.get("calls", {}).items()}, **kwargs)
+    
+    def cost(self, name: str) -> float:
+        """Latency to charge for one call"""
+        samples = self.samples.get(name)
+        seconds = self._rng.choice(samples) if samples else self.default_seconds
+        return seconds * self.scale
+    
+    def delay(self, name: str):
+        """Wait as long as the call took when it was recorded"""
+        self.calls[name] = self.calls.get(name, 0) + 1
+        seconds = self.cost(name)
+        if seconds <= 0:
+            return
+        self.charged_seconds += seconds
+        if seconds >= self.SPIN_SECONDS:
+            time.sleep(seconds)
+            return
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            pass
+    
+    def summary(self, top_n: int = 10) -> Dict[str, Any]:
+        """Calls replayed so far, most frequent first"""
+        calls = sorted(self.calls.items(), key=lambda item: item[1], reverse=True)
+        return {
+            "calls": sum(self.calls.values()),
+            "charged_seconds": round(self.charged_seconds, 4),
+            "top_calls": [{"call": name, "count": count} for name, count in calls[:top_n]],
+        }
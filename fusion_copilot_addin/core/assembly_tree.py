@@ -0,0 +1,303 @@
+"""
+Assembly Tree - Compact, lazily expanded occurrence hierarchy
+"""
+
+from array import array
+from typing import Dict, Any, List, Optional, Iterator
+
+
+PATH_SEPARATOR = "/"
+
+
+class NameTable:
+    """
+    Interns strings to small integer ids.
+    Occurrence and component names repeat heavily in large assemblies.
+    """
+    
+    __slots__ = ("_names", "_ids")
+    
+    def __init__(self):
+        self._names: List[str] = []
+        self._ids: Dict[str, int] = {}
+    
+    def intern(self, name: str) -> int:
+        """Get the id for a name, adding it if new"""
+        name_id = self._ids.get(name)
+        if name_id is None:
+            name_id = len(self._names)
+            self._names.append(name)
+            self._ids[name] = name_id
+        return name_id
+    
+    def lookup(self, name: str) -> int:
+        """Get the id for a name, or -1 if it was never interned"""
+        return self._ids.get(name, -1)
+    
+    def name(self, name_id: int) -> str:
+        """Get the name for an id"""
+        return self._names[name_id]
+    
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+class TreeNode:
+    """Lightweight view of one node in an OccurrenceTree"""
+    
+    __slots__ = ("tree", "index")
+    
+    def __init__(self, tree: "OccurrenceTree", index: int):
+        self.tree = tree
+        self.index = index
+    
+    @property
+    def name(self) -> str:
+        return self.tree.names.name(self.tree.name_ids[self.index])
+    
+    @property
+    def component(self) -> str:
+        return self.tree.names.name(self.tree.component_ids[self.index])
+    
+    @property
+    def depth(self) -> int:
+        return self.tree.depths[self.index]
+    
+    @property
+    def path(self) -> str:
+        return self.tree.path_of(self.index)
+    
+    @property
+    def parent(self) -> Optional["TreeNode"]:
+        parent = self.tree.parents[self.index]
+        return TreeNode(self.tree, parent) if parent >= 0 else None
+    
+    def children(self) -> List["TreeNode"]:
+        """Get child nodes, expanding this node if needed"""
+        return [TreeNode(self.tree, i) for i in self.tree.child_indices(self.index)]
+    
+    def __repr__(self) -> str:
+        return f"TreeNode({self.path!r})"
+
+
+class OccurrenceTree:
+    """
+    Array-backed occurrence hierarchy.
+    
+    Nodes are stored in parallel arrays (parent, name id, component id, depth).
+    Children of a node are appended contiguously when the node is expanded, so
+    each node only needs a first-child index and a child count. Nodes are
+    expanded on demand, so asking for a shallow subtree never walks the rest
+    of the assembly.
+    """
+    
+    def __init__(self, root_component):
+        self.names = NameTable()
+        self.parents = array('i')
+        self.name_ids = array('i')
+        self.component_ids = array('i')
+        self.depths = array('H')
+        self.first_child = array('i')
+        self.child_count = array('i')
+        
+        # Fusion occurrence collections for nodes that are not expanded yet
+        self._pending: Dict[int, Any] = {}
+        
+        root_name = self._safe_name(root_component, "Root")
+        self._append(-1, root_name, root_name, 0, getattr(root_component, "occurrences", None))
+        self.total_occurrences = self._count_all(root_component)
+    
+    def __len__(self) -> int:
+        """Number of nodes materialised so far"""
+        return len(self.parents)
+    
+    @property
+    def root(self) -> TreeNode:
+        return TreeNode(self, 0)
+    
+    def is_expanded(self, index: int) -> bool:
+        """Check whether a node's children have been materialised"""
+        return self.first_child[index] >= 0 or index not in self._pending
+    
+    def expand(self, index: int):
+        """Materialise the direct children of a node"""
+        occurrences = self._pending.pop(index, None)
+        if occurrences is None:
+            return
+        
+        depth = self.depths[index] + 1
+        start = len(self.parents)
+        count = 0
+        try:
+            for i in range(occurrences.count):
+                occ = occurrences.item(i)
+                component = getattr(occ, "component", None)
+                self._append(
+                    index,
+                    self._safe_name(occ, f"Occurrence{i}"),
+                    self._safe_name(component, "Component"),
+                    depth,
+                    getattr(occ, "childOccurrences", None),
+                )
+                count += 1
+        except Exception:
+            pass
+        
+        self.first_child[index] = start if count else -1
+        self.child_count[index] = count
+    
+    def expand_to_depth(self, index: int, depth: int):
+        """Expand a subtree down to a relative depth"""
+        frontier = [index]
+        for _ in range(depth):
+            next_frontier = []
+            for node in frontier:
+                next_frontier.extend(self.child_indices(node))
+            if not next_frontier:
+                break
+            frontier = next_frontier
+    
+    def child_indices(self, index: int) -> range:
+        """Indices of a node's children, expanding the node if needed"""
+        if not self.is_expanded(index):
+            self.expand(index)
+        first = self.first_child[index]
+        if first < 0:
+            return range(0)
+        return range(first, first + self.child_count[index])
+    
+    def find(self, path: str) -> int:
+        """
+        Resolve a path like "Bracket:1/Bolt:3" to a node index.
+        An empty path is the root. Returns -1 if the path does not exist.
+        """
+        index = 0
+        for segment in self._split_path(path):
+            name_id = self.names.lookup(segment)
+            if name_id < 0:
+                # Not interned yet - it may be below an unexpanded node
+                self.expand(index)
+                name_id = self.names.lookup(segment)
+                if name_id < 0:
+                    return -1
+            
+            for child in self.child_indices(index):
+                if self.name_ids[child] == name_id:
+                    index = child
+                    break
+            else:
+                return -1
+        return index
+    
+    def path_of(self, index: int) -> str:
+        """Build the slash-separated path of a node (root is "")"""
+        segments = []
+        while index > 0:
+            segments.append(self.names.name(self.name_ids[index]))
+            index = self.parents[index]
+        return PATH_SEPARATOR.join(reversed(segments))
+    
+    def walk(self, index: int = 0, depth: int = 1) -> Iterator[int]:
+        """Pre-order walk of a subtree down to a relative depth (excludes the start node)"""
+        stack = [(child, 1) for child in reversed(self.child_indices(index))] if depth > 0 else []
+        while stack:
+            node, level = stack.pop()
+            yield node
+            if level < depth:
+                stack.extend((child, level + 1) for child in reversed(self.child_indices(node)))
+    
+    def page(self, path: str = "", depth: int = 1, offset: int = 0, limit: int = 200) -> Dict[str, Any]:
+        """
+        Get one page of the subtree under a path.
+        
+        Returns:
+            {
+                "path": str,
+                "depth": int,
+                "offset": int,
+                "items": [{"path", "name", "component", "depth", "child_count"}],
+                "next_offset": Optional[int],
+            }
+        """
+        index = self.find(path)
+        if index < 0:
+            return {"path": path, "error": f"No occurrence at '{path}'", "items": []}
+        
+        items = []
+        next_offset = None
+        base_depth = self.depths[index]
+        for position, node in enumerate(self.walk(index, depth)):
+            if position < offset:
+                continue
+            if len(items) >= limit:
+                next_offset = position
+                break
+            items.append(self._node_summary(node, base_depth))
+        
+        return {
+            "path": path,
+            "depth": depth,
+            "offset": offset,
+            "items": items,
+            "next_offset": next_offset,
+        }
+    
+    def summary(self, depth: int = 1, limit: int = 50) -> Dict[str, Any]:
+        """JSON-serializable overview of the top of the tree for prompts"""
+        page = self.page("", depth=depth, limit=limit)
+        return {
+            "root": self.names.name(self.name_ids[0]),
+            "total_occurrences": self.total_occurrences,
+            "top_level_count": len(self.child_indices(0)),
+            "items": page["items"],
+            "truncated": page["next_offset"] is not None,
+        }
+    
+    def _node_summary(self, index: int, base_depth: int) -> Dict[str, Any]:
+        """Summarise a node for paging output"""
+        expanded = self.is_expanded(index)
+        return {
+            "path": self.path_of(index),
+            "name": self.names.name(self.name_ids[index]),
+            "component": self.names.name(self.component_ids[index]),
+            "depth": self.depths[index] - base_depth,
+            "child_count": self.child_count[index] if expanded else self._pending_count(index),
+        }
+    
+    def _append(self, parent: int, name: str, component: str, depth: int, occurrences) -> int:
+        """Add a node to the arrays"""
+        index = len(self.parents)
+        self.parents.append(parent)
+        self.name_ids.append(self.names.intern(name))
+        self.component_ids.append(self.names.intern(component))
+        self.depths.append(depth)
+        self.first_child.append(-1)
+        self.child_count.append(0)
+        if occurrences is not None:
+            self._pending[index] = occurrences
+        return index
+    
+    def _pending_count(self, index: int) -> int:
+        """Child count of an unexpanded node without materialising it"""
+        try:
+            return self._pending[index].count
+        except Exception:
+            return 0
+    
+    @staticmethod
+    def _split_path(path: str) -> List[str]:
+        return [segment for segment in path.split(PATH_SEPARATOR) if segment]
+    
+    @staticmethod
+    def _safe_name(obj, default: str) -> str:
+        try:
+            return obj.name if obj is not None else default
+        except Exception:
+            return default
+    
+    @staticmethod
+    def _count_all(root_component) -> Optional[int]:
+        try:
+            return root_component.allOccurrences.count
+        except Exception:
+            return None
@@ -0,0 +1,228 @@
+"""
+CAM Context - Cached setup/operation summaries for the Manufacture workspace
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+
+
+CAM_WORKSPACE_ID = "CAMEnvironment"
+CAM_PRODUCT_TYPE = "CAMProductType"
+
+# Setup parameters describing the stock
+STOCK_PARAMETERS = (
+    "job_stockMode",
+    "job_stockFixedX",
+    "job_stockFixedY",
+    "job_stockFixedZ",
+    "job_stockOffsetSides",
+    "job_stockOffsetTop",
+    "job_stockOffsetBottom",
+)
+
+# Tool parameters included in summaries
+TOOL_PARAMETERS = (
+    "tool_number",
+    "tool_type",
+    "tool_description",
+    "tool_diameter",
+    "tool_numberOfFlutes",
+)
+
+
+def get_cam_product(doc):
+    """Get the CAM product of a document, or None if it has none"""
+    try:
+        product = doc.products.itemByProductType(CAM_PRODUCT_TYPE)
+    except Exception:
+        return None
+    if product is None:
+        return None
+    try:
+        import adsk.cam
+        return adsk.cam.CAM.cast(product)
+    except Exception:
+        return product
+
+
+class CamContextCapture:
+    """
+    Summarises CAM setups, operations, tools, stock and toolpath validity.
+    
+    Summaries are cached per setup together with a cheap signature (operation
+    count plus each operation's name and toolpath state). Only setups whose
+    signature changed are summarised again, so documents with hundreds of
+    operations stay cheap to capture on every prompt.
+    """
+    
+    def __init__(self, max_operations_per_setup: int = 50):
+        self.max_operations_per_setup = max_operations_per_setup
+        self._cache: Dict[str, Tuple[tuple, Dict[str, Any]]] = {}
+        self.rebuilt_setups = 0
+    
+    def clear(self):
+        """Drop all cached setup summaries"""
+        self._cache = {}
+    
+    def capture(self, cam) -> Optional[Dict[str, Any]]:
+        """
+        Build the CAM snapshot.
+        
+        Returns:
+            {
+                "setup_count": int,
+                "operation_count": int,
+                "invalid_toolpaths": int,
+                "setups": [setup summary, ...],
+                "tools": [tool summary, ...],
+            }
+        """
+        if cam is None:
+            return None
+        
+        setups = cam.setups
+        summaries = []
+        cache = {}
+        for i in range(setups.count):
+            setup = setups.item(i)
+            key = self._setup_key(setup, i)
+            operations = self._operations(setup)
+            signature = self._signature(setup, operations)
+            
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == signature:
+                summary = cached[1]
+            else:
+                summary = self._summarize_setup(setup, operations)
+                self.rebuilt_setups += 1
+            cache[key] = (signature, summary)
+            summaries.append(summary)
+        self._cache = cache
+        
+        tools: Dict[str, Dict[str, Any]] = {}
+        for summary in summaries:
+            for tool in summary["tools"]:
+                tools.setdefault(self._tool_key(tool), tool)
+        
+        return {
+            "setup_count": len(summaries),
+            "operation_count": sum(s["operation_count"] for s in summaries),
+            "invalid_toolpaths": sum(s["invalid_toolpaths"] for s in summaries),
+            "setups": summaries,
+            "tools": list(tools.values()),
+        }
+    
+    def _summarize_setup(self, setup, operations: List[Any]) -> Dict[str, Any]:
+        """Summarise one setup and its operations"""
+        ops = []
+        tools: Dict[str, Dict[str, Any]] = {}
+        invalid = 0
+        for op in operations:
+            op_summary = self._summarize_operation(op)
+            if op_summary["toolpath"] in ("invalid", "none"):
+                invalid += 1
+            tool = op_summary.pop("tool_info", None)
+            if tool:
+                tools.setdefault(self._tool_key(tool), tool)
+            if len(ops) < self.max_operations_per_setup:
+                ops.append(op_summary)
+        
+        return {
+            "name": self._get(setup, "name"),
+            "type": self._enum_name(self._get(setup, "operationType")),
+            "stock": self._parameters(self._get(setup, "parameters"), STOCK_PARAMETERS),
+            "operation_count": len(operations),
+            "invalid_toolpaths": invalid,
+            "operations": ops,
+            "truncated": len(operations) > len(ops),
+            "tools": list(tools.values()),
+        }
+    
+    def _summarize_operation(self, op) -> Dict[str, Any]:
+        """Summarise one operation"""
+        tool_info = None
+        tool = self._get(op, "tool")
+        if tool is not None:
+            tool_info = self._parameters(self._get(tool, "parameters"), TOOL_PARAMETERS)
+        
+        summary = {
+            "name": self._get(op, "name"),
+            "strategy": self._get(op, "strategy"),
+            "toolpath": self._toolpath_state(op),
+            "suppressed": bool(self._get(op, "isSuppressed")),
+            "tool_info": tool_info,
+        }
+        if tool_info and tool_info.get("tool_description"):
+            summary["tool"] = tool_info["tool_description"]
+        return summary
+    
+    def _toolpath_state(self, op) -> str:
+        """One of generating, none, invalid, warning, error, valid"""
+        if self._get(op, "isGenerating"):
+            return "generating"
+        if not self._get(op, "hasToolpath"):
+            return "none"
+        if not self._get(op, "isToolpathValid"):
+            return "invalid"
+        if self._get(op, "hasError"):
+            return "error"
+        if self._get(op, "hasWarning"):
+            return "warning"
+        return "valid"
+    
+    def _signature(self, setup, operations: List[Any]) -> tuple:
+        """Cheap change detector for a setup, over the same toolpath state the summary reports"""
+        return (self._get(setup, "name"), len(operations)) + tuple(
+            (self._get(op, "name"), self._toolpath_state(op), self._get(op, "isSuppressed"))
+            for op in operations
+        )
+    
+    def _operations(self, setup) -> List[Any]:
+        collection = self._get(setup, "allOperations")
+        if collection is None:
+            collection = self._get(setup, "operations")
+        if collection is None:
+            return []
+        try:
+            return [collection.item(i) for i in range(collection.count)]
+        except Exception:
+            return []
+    
+    def _setup_key(self, setup, index: int) -> str:
+        token = self._get(setup, "entityToken")
+        if isinstance(token, str) and token:
+            return token
+        return f"{index}:{self._get(setup, 'name')}"
+    
+    def _parameters(self, parameters, names: Tuple[str, ...]) -> Dict[str, Any]:
+        """Read named CAM parameters into a dict"""
+        values = {}
+        if parameters is None:
+            return values
+        for name in names:
+            try:
+                param = parameters.itemByName(name)
+            except Exception:
+                param = None
+            if param is None:
+                continue
+            value = self._get(self._get(param, "value"), "value")
+            if value is None:
+                value = self._get(param, "expression")
+            if value is not None:
+                values[name] = value
+        return values
+    
+    @staticmethod
+    def _tool_key(tool: Dict[str, Any]) -> str:
+        return f"{tool.get('tool_number')}:{tool.get('tool_description')}:{tool.get('tool_diameter')}"
+    
+    @staticmethod
+    def _enum_name(value) -> Any:
+        return getattr(value, "name", value)
+    
+    @staticmethod
+    def _get(obj, attribute: str):
+        try:
+            return getattr(obj, attribute, None)
+        except Exception:
+            return None
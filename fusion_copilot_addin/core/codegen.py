@@ -3,7 +3,84 @@ Code Generation - Prompt templates and code assembly
 """
 
 import json
-from typing import Dict, Any, List
+import re
+from typing import Dict, Any, Callable, List, Optional
+
+from config import API_INDEX_CONFIG, PATCH_CONFIG, PROMPT_CONFIG
+from core.context_packer import ContextPacker, PackedContext, estimate_tokens
+from core.diff_engine import PatchError, apply_patch, unified_diff
+from core.prompt_layout import ChatPrompt, PrefixReuseTracker, StaticPrefix
+
+# Follow-up requests that refer back to the current script. Only explicit
+# references count: a bare verb ("make a bracket") or a pronoun about the
+# new task ("fillet its edges") is a new request.
+_EDIT_CUE_RE = re.compile(
+    # "instead", "the script", "the previous one"
+    r"\binstead\b"
+    r"|\b(the|that|this|your|last|previous) (script|code|macro)\b"
+    r"|\b(the )?(previous|last) (one|version|result|feature|body|part)\b"
+    # "make it ...", "change the width ...", "undo that"
+    r"|^\s*(change|make|increase|decrease|reduce|raise|lower|rename|move|update|modify|adjust|"
+    r"edit|fix|remove|delete|replace|swap|double|halve|undo|revert) (it|its|them|that|the)\b"
+    # Comparatives on a dimension: "5 mm thicker", "wider" (not "a thicker plate")
+    r"|(?<!\ba )(?<!\ban )\b(thicker|thinner|wider|narrower|taller|shorter|deeper|shallower|longer)\b",
+    re.IGNORECASE,
+)
+
+
+def looks_like_edit(user_message: str) -> bool:
+    """Whether a message reads as an edit of the current script rather than a new task"""
+    return bool(_EDIT_CUE_RE.search(user_message or ""))
+
+
+def plan_step(item: Any) -> str:
+    """One plan step as text; models sometimes send numbers or {"step": ...} objects"""
+    if isinstance(item, str):
+        return item
+    if isinstance(item, dict):
+        for key in ("step", "description", "text", "title"):
+            if isinstance(item.get(key), str):
+                return item[key]
+    return json.dumps(item, ensure_ascii=False)
+
+
+def plan_steps(plan: Any) -> List[str]:
+    """A response's plan as a list of step strings"""
+    if plan is None or plan == "":
+        return []
+    if isinstance(plan, list):
+        return [plan_step(item) for item in plan]
+    return [plan_step(plan)]
+
+
+# Few-shot example shown after the system prompt (part of the static prefix)
+EXAMPLE_REQUEST = """## Current Fusion 360 Context:
+Document: Bracket (units: mm)
+
+## Relevant Fusion 360 API:
+UserParameters.add(name: str, value: ValueInput, units: str, comment: str) -> UserParameter  # Adds a new user parameter.
+UserParameters.itemByName(name: str) -> UserParameter  # Returns the user parameter with the name, or None.
+
+## User Request:
+Add a user parameter called wall_thickness set to 3 mm"""
+
+EXAMPLE_RESPONSE = json.dumps({
+    "title": "Add wall_thickness parameter",
+    "plan": ["Get the active design", "Add or update the wall_thickness user parameter"],
+    "code": (
+        "import adsk.core, adsk.fusion\n"
+        "\n"
+        "app = adsk.core.Application.get()\n"
+        "design = adsk.fusion.Design.cast(app.activeProduct)\n"
+        "params = design.userParameters\n"
+        "existing = params.itemByName('wall_thickness')\n"
+        "if existing:\n"
+        "    existing.expression = '3 mm'\n"
+        "else:\n"
+        "    params.add('wall_thickness', adsk.core.ValueInput.createByString('3 mm'), 'mm', 'Wall thickness')\n"
+    ),
+    "notes": "Updates the parameter instead of adding a duplicate if it already exists.",
+}, indent=2)
 
 
 class CodeGenerator:
@@ -16,40 +93,123 @@ class CodeGenerator:
     - Generate patch/diff format for code modifications
     """
     
-    def __init__(self, llm_client):
+    def __init__(self, llm_client, api_index=None):
         self.llm_client = llm_client
+        self.api_index = api_index
+        self.last_packing: Optional[PackedContext] = None
+        self.last_api_snippets: List[str] = []
+        self.static_prefix = self._compile_static_prefix()
+        self.prefix_reuse = PrefixReuseTracker()
     
-    def build_prompt(self, user_message: str, fusion_context: Dict[str, Any]) -> str:
+    def build_prompt(self, user_message: str, fusion_context: Dict[str, Any],
+                     current_code: Optional[str] = None) -> ChatPrompt:
         """
         Build the complete prompt to send to LLM.
         
-        Includes:
-        - System instructions (Copilot-like behavior)
-        - Current Fusion context
-        - User request
+        Layout (prefix first, so backend prompt caches can reuse it):
+        - Static prefix: system instructions, output format, few-shot example
+        - Volatile suffix: current Fusion context, API reference snippets
+          relevant to this request, the current script when the request
+          edits it (the model answers with a patch), and the user request
         """
+        suffix_template = self._get_request_template()
+        api_reference = self._format_api_reference(user_message, fusion_context)
+        script = self._get_edit_section().format(code=current_code.rstrip("\n")) if current_code else ""
         
-        system_prompt = self._get_system_prompt()
-        context_summary = self._format_context(fusion_context)
+        # Whatever the fixed parts of the prompt don't use is left for context
+        fixed_tokens = (self.static_prefix.tokens + estimate_tokens(suffix_template)
+                        + estimate_tokens(api_reference) + estimate_tokens(script)
+                        + estimate_tokens(user_message))
+        budget = PROMPT_CONFIG.get("max_context_size", 8000) - fixed_tokens
+        context_summary = self._format_context(fusion_context, user_message, budget)
         
-        prompt = f"""{system_prompt}
+        prompt = ChatPrompt(
+            self.static_prefix,
+            suffix_template.format(context=context_summary, api=api_reference, script=script,
+                                   request=user_message),
+        )
+        self.prefix_reuse.record(prompt)
+        return prompt
+    
+    def get_prefix_reuse_report(self) -> Dict[str, Any]:
+        """
+        How many prompt tokens repeated the previous turn's prefix, plus the
+        backend's own cache figures when it reports them.
+        """
+        report = self.prefix_reuse.report()
+        usage = getattr(self.llm_client, "last_usage", None)
+        if usage:
+            report["backend_usage"] = dict(usage)
+        return report
+    
+    def _compile_static_prefix(self) -> StaticPrefix:
+        """Build the immutable prompt prefix once per generator"""
+        system = f"{self._get_system_prompt()}\n\n{self._get_output_format()}"
+        return StaticPrefix(system, [(EXAMPLE_REQUEST, EXAMPLE_RESPONSE)])
+    
+    def _get_request_template(self) -> str:
+        """Volatile part of the prompt; everything that changes per turn goes here"""
+        return """## Current Fusion 360 Context:
+{context}
 
-## Current Fusion 360 Context:
-{context_summary}
+## Relevant Fusion 360 API:
+{api}
 
-## User Request:
-{user_message}
+{script}## User Request:
+{request}"""
+    
+    def _get_edit_section(self) -> str:
+        """Current script for follow-up edits; the model returns a patch instead of the whole script"""
+        context = PATCH_CONFIG.get("context_lines", 3)
+        return f"""## Current Script:
+```python
+{{code}}
+```
+
+Edit the Current Script. Instead of "code", return "patch": a unified diff
+against the Current Script (@@ hunk headers, {context} lines of context,
+only the changed parts).
 
-## Expected Output Format:
+"""
+    
+    def _format_api_reference(self, user_message: str, context: Dict[str, Any]) -> str:
+        """
+        Top-k API snippets for the request from the local reference index,
+        trimmed to the API token budget.
+        """
+        self.last_api_snippets = []
+        if self.api_index is None:
+            return "(no API reference available)"
+        
+        # Selected entity types (BRepFace, BRepEdge...) point at the relevant classes
+        selection = context.get("selection") or {}
+        query = " ".join([user_message] + list((selection.get("type_counts") or {}).keys()))
+        if context.get("cam"):
+            query += " cam setup operation"
+        
+        budget = API_INDEX_CONFIG.get("max_tokens", 600)
+        lines = []
+        used = 0
+        for snippet, _ in self.api_index.search(query, API_INDEX_CONFIG.get("top_k", 8)):
+            tokens = estimate_tokens(snippet) + 1
+            if used + tokens > budget:
+                break
+            lines.append(snippet)
+            used += tokens
+        
+        self.last_api_snippets = lines
+        return "\n".join(lines) if lines else "(no matching API entries)"
+    
+    def _get_output_format(self) -> str:
+        """Get the response format instructions"""
+        return """## Expected Output Format:
 Provide response as JSON with the following structure:
-{{
+{
   "title": "Brief task name",
   "plan": ["Step 1", "Step 2", "Step 3"],
   "code": "Fusion 360 Python API code",
   "notes": "Assumptions and variations"
-}}
-"""
-        return prompt
+}"""
     
     def _get_system_prompt(self) -> str:
         """Get base system prompt for Copilot-like behavior"""
@@ -60,7 +220,8 @@ Provide response as JSON with the following structure:
 3. Prefer parametric design: use user parameters for dimensions
 4. Be idempotent when reasonable (avoid duplicating features)
 5. Include helpful comments in code
-6. Suggest only valid Fusion 360 API calls
+6. Suggest only valid Fusion 360 API calls; prefer the classes and members
+   listed under "Relevant Fusion 360 API" and don't invent others
 
 When the user requests part generation, CAM setup, or drawing creation:
 - Create parametric designs with user-defined parameters
@@ -73,29 +234,21 @@ When the user requests edits to existing geometry:
 - Update values or edit features safely
 - Preserve other geometry unchanged"""
     
-    def _format_context(self, context: Dict[str, Any]) -> str:
-        """Format context dict into readable text for the prompt"""
-        lines = []
-        
-        if context.get('document'):
-            doc = context['document']
-            lines.append(f"Document: {doc.get('name', 'Unknown')}")
-            lines.append(f"Units: {context.get('units', 'mm')}")
-        
-        if context.get('parameters'):
-            lines.append(f"User Parameters: {len(context['parameters'])} defined")
-            for param in context['parameters'][:5]:  # Show first 5
-                lines.append(f"  - {param.get('name')}: {param.get('value')}")
-        
-        if context.get('selection'):
-            sel = context['selection']
-            if sel.get('count', 0) > 0:
-                lines.append(f"Selection: {sel['count']} entities selected")
+    def _format_context(self, context: Dict[str, Any], user_message: str = "",
+                        budget: Optional[int] = None) -> str:
+        """
+        Format context dict into readable text for the prompt.
         
-        if context.get('components'):
-            lines.append(f"Components: {len(context['components'])} top-level components")
+        Parameters, components and occurrences are ranked by relevance to the
+        user message and packed into the token budget. The packing report
+        (what was dropped) is kept in self.last_packing.
+        """
+        if budget is None:
+            budget = PROMPT_CONFIG.get("max_context_size", 8000)
         
-        return "\n".join(lines) if lines else "No context available"
+        packed = ContextPacker(budget).pack(context, user_message)
+        self.last_packing = packed
+        return packed.text
     
     def parse_llm_response(self, response_text: str) -> Dict[str, Any]:
         """
@@ -107,29 +260,52 @@ When the user requests edits to existing geometry:
         - Plain text responses
         """
         try:
-            # Try parsing as JSON first
-            result = json.loads(response_text)
-            return {
+            # Try parsing as JSON first (models often wrap it in a ```json fence)
+            result = json.loads(self._strip_json_fence(response_text))
+            parsed = {
                 "title": result.get("title", "Generated Code"),
-                "plan": result.get("plan", []),
+                "plan": plan_steps(result.get("plan")),
                 "code": result.get("code", ""),
                 "notes": result.get("notes", ""),
             }
+            if result.get("patch"):
+                parsed["patch"] = result["patch"]
+            return parsed
         except json.JSONDecodeError:
             # Fall back to markdown parsing
             return self._parse_markdown_response(response_text)
     
+    def create_stream_parser(self) -> "StreamingResponseParser":
+        """Create an incremental parser for a streamed response"""
+        return StreamingResponseParser(self.parse_llm_response)
+    
+    def _strip_json_fence(self, text: str) -> str:
+        """Remove a surrounding ```json ... ``` fence if present"""
+        stripped = text.strip()
+        if stripped.startswith("```json") and stripped.endswith("```"):
+            return stripped[len("```json"):-3]
+        return text
+    
     def _parse_markdown_response(self, text: str) -> Dict[str, Any]:
         """Parse markdown-formatted response"""
         lines = text.split('\n')
         code_block = []
+        patch_block = []
         plan = []
         title = "Generated Code"
         notes = ""
         in_code = False
+        in_patch = False
         
         for line in lines:
-            if line.startswith('```python') or line.startswith('```'):
+            if line.startswith('```diff') or line.startswith('```patch'):
+                in_patch = True
+            elif in_patch:
+                if line.startswith('```'):
+                    in_patch = False
+                else:
+                    patch_block.append(line)
+            elif line.startswith('```python') or line.startswith('```'):
                 in_code = not in_code
             elif in_code:
                 code_block.append(line)
@@ -138,27 +314,330 @@ When the user requests edits to existing geometry:
             elif line.startswith('- '):
                 plan.append(line[2:].strip())
         
-        return {
+        result = {
             "title": title,
             "plan": plan,
             "code": '\n'.join(code_block),
             "notes": notes,
         }
+        if patch_block:
+            result["patch"] = '\n'.join(patch_block) + '\n'
+        return result
+
+
+class StreamingResponseParser:
+    """
+    Incrementally parses an LLM response while it streams in.
+    
+    feed() returns events as soon as each piece is complete:
+    - {"type": "title", "value": str}
+    - {"type": "plan_item", "value": str}
+    - {"type": "code", "value": str}    (code arrives in chunks)
+    - {"type": "notes", "value": str}
+    
+    JSON responses (optionally inside a ```json fence) are scanned character
+    by character; anything else is handled line by line with the same rules
+    as the markdown parser. finish() returns the final dict in the same shape
+    as CodeGenerator.parse_llm_response().
+    """
+    
+    _ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+    
+    def __init__(self, fallback: Callable[[str], Dict[str, Any]]):
+        self._fallback = fallback
+        self._text: List[str] = []
+        self._mode = None  # None (undecided), "json" or "markdown"
+        self._pending = ""  # Undecided prefix / partial markdown line
+        self._in_code = False
+        self._in_patch = False
+        
+        # JSON scanner state
+        self._state = "start"
+        self._key = ""
+        self._value: List[str] = []
+        self._escape: Optional[str] = None
+        self._high_surrogate: Optional[str] = None
+        self._skip_depth = 0
+        self._skip_in_string = False
+        self._skip_escape = False
+        self._skip_text: Optional[List[str]] = None  # Raw text of a skipped array item
+        self._in_array = False
+        self._fields: Dict[str, Any] = {}
+        self._code_chunk: List[str] = []
+    
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Consume a chunk of response text and return completed events"""
+        if not text:
+            return []
+        self._text.append(text)
+        events: List[Dict[str, Any]] = []
+        
+        if self._mode is None:
+            self._pending += text
+            text = self._detect_mode()
+            if self._mode is None:
+                return events
+        
+        if self._mode == "json":
+            self._scan_json(text, events)
+        else:
+            self._scan_markdown(text, events)
+        return events
+    
+    def finish(self) -> Dict[str, Any]:
+        """Return the final parsed response once the stream has ended"""
+        if self._mode == "json":
+            fields = dict(self._fields)
+            if self._state == "str" and self._key:
+                # Stream was cut off inside a value - keep what arrived
+                fields[self._key] = "".join(self._value)
+            if self._state == "done" or fields:
+                result = {
+                    "title": fields.get("title", "Generated Code"),
+                    "plan": plan_steps(fields.get("plan")),
+                    "code": fields.get("code", ""),
+                    "notes": fields.get("notes", ""),
+                }
+                if fields.get("patch"):
+                    result["patch"] = fields["patch"]
+                return result
+        return self._fallback("".join(self._text))
+    
+    def _detect_mode(self) -> str:
+        """Decide between JSON and markdown; returns text left to scan"""
+        stripped = self._pending.lstrip()
+        if not stripped:
+            return ""
+        if stripped.startswith("{"):
+            self._mode = "json"
+        elif stripped.startswith("```"):
+            if "\n" not in stripped:
+                # Wait for the fence's language tag
+                return ""
+            fence, rest = stripped.split("\n", 1)
+            if fence[3:].strip().lower() == "json" and rest.lstrip()[:1] in ("", "{"):
+                self._mode = "json"
+                self._pending = rest
+            else:
+                self._mode = "markdown"
+        elif "```".startswith(stripped):
+            return ""
+        else:
+            self._mode = "markdown"
+        
+        text, self._pending = self._pending, ""
+        return text
+    
+    def _scan_markdown(self, text: str, events: List[Dict[str, Any]]):
+        """Handle complete lines with the markdown rules"""
+        self._pending += text
+        *lines, self._pending = self._pending.split("\n")
+        for line in lines:
+            self._markdown_line(line, events)
+    
+    def _markdown_line(self, line: str, events: List[Dict[str, Any]]):
+        # Patch blocks aren't streamed as code; finish() parses them
+        if self._in_patch:
+            self._in_patch = not line.startswith('```')
+        elif line.startswith('```diff') or line.startswith('```patch'):
+            self._in_patch = True
+        elif line.startswith('```'):
+            self._in_code = not self._in_code
+        elif self._in_code:
+            events.append({"type": "code", "value": line + "\n"})
+        elif line.startswith('# '):
+            events.append({"type": "title", "value": line[2:].strip()})
+        elif line.startswith('- '):
+            events.append({"type": "plan_item", "value": line[2:].strip()})
+    
+    def _scan_json(self, text: str, events: List[Dict[str, Any]]):
+        """Advance the top-level object scanner over a chunk"""
+        for ch in text:
+            state = self._state
+            
+            if state in ("str", "key_str", "array_str"):
+                self._string_char(ch, events)
+            elif state == "skip":
+                self._skip_char(ch, events)
+            elif state == "done":
+                break
+            elif ch in " \t\r\n":
+                continue
+            elif state == "start":
+                if ch == "{":
+                    self._state = "key"
+            elif state == "key":
+                if ch == '"':
+                    self._state = "key_str"
+                    self._value = []
+                elif ch == "}":
+                    self._state = "done"
+            elif state == "colon":
+                if ch == ":":
+                    self._state = "value"
+            elif state == "value":
+                if ch == '"':
+                    self._state = "str"
+                    self._value = []
+                elif ch == "[":
+                    self._state = "array"
+                    self._in_array = True
+                    self._fields[self._key] = []
+                else:
+                    self._begin_skip(ch, events)
+            elif state == "array":
+                if ch == '"':
+                    self._state = "array_str"
+                    self._value = []
+                elif ch == "]":
+                    self._in_array = False
+                    self._state = "after_value"
+                elif ch != ",":
+                    self._begin_skip(ch, events)
+            elif state == "after_value":
+                if ch == ",":
+                    self._state = "key"
+                elif ch == "}":
+                    self._state = "done"
+        
+        if self._code_chunk:
+            events.append({"type": "code", "value": "".join(self._code_chunk)})
+            self._code_chunk = []
+    
+    def _string_char(self, ch: str, events: List[Dict[str, Any]]):
+        """Decode one character of a JSON string"""
+        if self._escape is not None:
+            self._escape += ch
+            if self._escape[0] != "u":
+                self._emit_char(self._ESCAPES.get(ch, ch))
+                self._escape = None
+            elif len(self._escape) == 5:
+                self._emit_unicode(chr(int(self._escape[1:], 16)))
+                self._escape = None
+            return
+        
+        if ch == "\\":
+            self._escape = ""
+        elif ch == '"':
+            self._end_string(events)
+        else:
+            self._emit_char(ch)
+    
+    def _emit_unicode(self, char: str):
+        """Combine UTF-16 surrogate pairs from \\u escapes"""
+        if "\ud800" <= char <= "\udbff":
+            self._high_surrogate = char
+            return
+        if self._high_surrogate and "\udc00" <= char <= "\udfff":
+            char = (self._high_surrogate + char).encode("utf-16", "surrogatepass").decode("utf-16")
+        self._high_surrogate = None
+        self._emit_char(char)
+    
+    def _emit_char(self, char: str):
+        self._value.append(char)
+        if self._state == "str" and self._key == "code":
+            self._code_chunk.append(char)
+    
+    def _end_string(self, events: List[Dict[str, Any]]):
+        """Handle a closing quote"""
+        value = "".join(self._value)
+        self._value = []
+        
+        if self._state == "key_str":
+            self._key = value
+            self._state = "colon"
+        elif self._state == "array_str":
+            self._array_item(value, events)
+            self._state = "array"
+        else:
+            self._fields[self._key] = value
+            if self._key in ("title", "notes"):
+                events.append({"type": self._key, "value": value})
+            self._state = "after_value"
+    
+    def _array_item(self, value: Any, events: List[Dict[str, Any]]):
+        """Store a completed array item; plan items are coerced like parse_llm_response() does"""
+        if self._key == "plan":
+            value = plan_step(value)
+            events.append({"type": "plan_item", "value": value})
+        self._fields[self._key].append(value)
+    
+    def _begin_skip(self, ch: str, events: List[Dict[str, Any]]):
+        """Start skipping a value we don't stream (number, object, ...)"""
+        self._state = "skip"
+        self._skip_depth = 0
+        self._skip_in_string = False
+        self._skip_escape = False
+        # Array items are kept whole, so non-string plan steps aren't lost
+        self._skip_text = [] if self._in_array else None
+        self._skip_char(ch, events)
+    
+    def _skip_char(self, ch: str, events: List[Dict[str, Any]]):
+        if self._skip_text is not None and (self._skip_in_string or self._skip_depth > 0 or ch not in ",}]"):
+            self._skip_text.append(ch)
+        
+        if self._skip_in_string:
+            if self._skip_escape:
+                self._skip_escape = False
+            elif ch == "\\":
+                self._skip_escape = True
+            elif ch == '"':
+                self._skip_in_string = False
+            return
+        
+        if ch == '"':
+            self._skip_in_string = True
+        elif ch in "{[":
+            self._skip_depth += 1
+        elif ch in "}]" and self._skip_depth > 0:
+            self._skip_depth -= 1
+        elif self._skip_depth == 0 and ch in ",}]":
+            if self._in_array:
+                raw = "".join(self._skip_text or []).strip()
+                self._skip_text = None
+                try:
+                    self._array_item(json.loads(raw), events)
+                except ValueError:
+                    self._array_item(raw, events)
+                self._state = "array"
+                if ch == "]":
+                    self._in_array = False
+                    self._state = "after_value"
+            else:
+                self._state = "key" if ch == "," else "done"
 
 
 class PatchGenerator:
     """
     Generate unified diff patches for code modifications.
+    
+    Diffs come from core/diff_engine.py (patience anchors, Myers between
+    them). Patches are applied fuzzily, so model-written hunks with wrong
+    line numbers or slightly different context still land.
     """
     
     @staticmethod
     def generate_patch(original_code: str, modified_code: str) -> str:
         """Generate a unified diff patch"""
-        # TODO: Implement diff generation
-        return ""
+        return unified_diff(original_code, modified_code, PATCH_CONFIG.get("context_lines", 3))
     
     @staticmethod
     def apply_patch(original_code: str, patch: str) -> str:
-        """Apply a patch to code"""
-        # TODO: Implement patch application
-        return ""
+        """
+        Apply a patch to code.
+        
+        Raises PatchError if the patch has no hunks or any hunk can't be
+        placed (a partly applied script is worse than none).
+        """
+        report = apply_patch(
+            original_code,
+            patch,
+            fuzz=PATCH_CONFIG.get("fuzz", 2),
+            threshold=PATCH_CONFIG.get("similarity_threshold", 0.8),
+        )
+        if not report["applied"] and not report["failed"]:
+            raise PatchError("Patch contains no hunks", report)
+        if report["failed"]:
+            hunks = ", ".join(str(number + 1) for number in report["failed"])
+            raise PatchError(f"Patch hunk(s) {hunks} don't match the current script", report)
+        return report["code"]
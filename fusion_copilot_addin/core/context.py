@@ -5,6 +5,20 @@ Context Capture - Gathers live Fusion 360 context for AI prompting
 import json
 from typing import Dict, Any, List, Optional
 
+from config import CONTEXT_CONFIG
+from core.assembly_tree import OccurrenceTree
+from core.cam_context import CamContextCapture, CAM_WORKSPACE_ID, get_cam_product
+from core.param_graph import ParameterGraph
+from core.selection_geometry import SelectionFingerprinter
+from core.snapshot import (
+    SnapshotCache,
+    ContextEventSource,
+    FusionEventSource,
+    sections_for_event,
+    COMMAND_TERMINATED,
+    DOCUMENT_ACTIVATED,
+)
+
 
 class ContextCapture:
     """
@@ -15,30 +29,63 @@ class ContextCapture:
     - Components
     - CAM context (if in CAM workspace)
     - Units
+    
+    Sections are cached in a versioned snapshot and only rebuilt after a
+    Fusion event (selection changed, document activated, command terminated)
+    marks them dirty.
     """
     
-    def __init__(self, app):
+    def __init__(self, app, event_source: Optional[ContextEventSource] = None):
         self.app = app
         self.ui = app.userInterface
+        self.snapshots = SnapshotCache()
+        self.parameter_graph = ParameterGraph()
+        self.fingerprinter = SelectionFingerprinter(CONTEXT_CONFIG.get("selection_fingerprint_limit", 200))
+        self.cam_capture = CamContextCapture(CONTEXT_CONFIG.get("cam_max_operations_per_setup", 50))
+        self._active_document = None
+        
+        if event_source is None and CONTEXT_CONFIG.get("incremental_snapshots", True):
+            event_source = FusionEventSource(app)
         
-    def get_runtime_context(self) -> Dict[str, Any]:
+        self.event_source = event_source
+        self._events_live = False
+        if self.event_source is not None:
+            self.event_source.subscribe(self._on_context_event)
+            self._events_live = self.event_source.start()
+        
+    def get_runtime_context(self, force_refresh: bool = False) -> Dict[str, Any]:
         """
         Capture all relevant Fusion 360 context as a JSON-serializable dict.
         This gets included in prompts to the AI.
+        
+        Args:
+            force_refresh: Rebuild every section even if it is not dirty
         """
         try:
             doc = self.app.activeDocument
             if not doc:
+                self._active_document = None
                 return self._empty_context()
             
+            switched = not self._is_active_document(doc)
+            if force_refresh or not self._events_live or switched:
+                self.snapshots.invalidate_all()
+                self.fingerprinter.clear()
+                if switched:
+                    self.cam_capture.clear()
+                self._active_document = doc
+            
+            get = self.snapshots.get
+            workspace = get("workspace", self._get_active_workspace)
             context = {
-                "document": self._capture_document(doc),
-                "selection": self._capture_selection(),
-                "parameters": self._capture_parameters(doc),
-                "components": self._capture_components(doc),
-                "cam": self._capture_cam_context(),
-                "units": self._get_units(doc),
-                "workspace": self._get_active_workspace(),
+                "document": get("document", lambda: self._capture_document(doc)),
+                "selection": get("selection", self._capture_selection),
+                "parameters": get("parameters", lambda: self._build_parameters(doc)),
+                "components": get("components", lambda: self._capture_components(doc)),
+                "assembly": self._summarize_assembly(get("assembly", lambda: self._capture_assembly_tree(doc))),
+                "cam": get("cam", lambda: self._capture_cam_context(doc)),
+                "units": get("units", lambda: self._get_units(doc)),
+                "workspace": workspace,
             }
             
             return context
@@ -50,11 +97,83 @@ class ContextCapture:
                 "selection": None,
                 "parameters": [],
                 "components": [],
+                "assembly": None,
                 "cam": None,
                 "units": "mm",
                 "workspace": None,
             }
     
+    def get_assembly_tree(self) -> Optional[OccurrenceTree]:
+        """Get the cached occurrence tree of the active design"""
+        doc = self.app.activeDocument
+        if not doc:
+            return None
+        return self.snapshots.get("assembly", lambda: self._capture_assembly_tree(doc))
+    
+    def get_assembly_page(self, path: str = "", depth: int = 1, offset: int = 0,
+                          limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Get one page of the occurrence tree under a path, e.g.
+        get_assembly_page("Frame:1", depth=2) for the subtree under Frame:1.
+        """
+        tree = self.get_assembly_tree()
+        if tree is None:
+            return {"path": path, "error": "No active design", "items": []}
+        if limit is None:
+            limit = CONTEXT_CONFIG.get("assembly_page_size", 200)
+        return tree.page(path, depth=depth, offset=offset, limit=limit)
+    
+    def get_parameter_impact(self, *names: str) -> List[str]:
+        """
+        Get the parameters affected by editing the given ones (the edited
+        parameters plus everything downstream), in evaluation order.
+        """
+        return self.parameter_graph.impact(names)
+    
+    def get_snapshot_versions(self) -> Dict[str, int]:
+        """Get the version number of each cached context section"""
+        return self.snapshots.versions()
+    
+    def invalidate(self, *sections: str):
+        """Mark sections dirty (all sections if none are given)"""
+        if sections:
+            self.snapshots.invalidate(*sections)
+        else:
+            self.snapshots.invalidate_all()
+    
+    def design_changed(self):
+        """
+        Invalidate what a script run may have changed. Scripts run through
+        the API don't fire commandTerminated, so the executor's caller
+        reports them here, as if a command had finished.
+        """
+        self._on_context_event(COMMAND_TERMINATED, None)
+    
+    def close(self):
+        """Detach from Fusion events"""
+        if self.event_source is not None:
+            self.event_source.unsubscribe(self._on_context_event)
+            self.event_source.stop()
+        self._events_live = False
+    
+    def _on_context_event(self, event_name: str, args: Any):
+        """Invalidate the sections affected by a Fusion event"""
+        sections = sections_for_event(event_name)
+        if sections:
+            self.snapshots.invalidate(*sections)
+        if event_name in (COMMAND_TERMINATED, DOCUMENT_ACTIVATED):
+            # Selected geometry may have been edited or belongs to another document
+            self.fingerprinter.clear()
+        if event_name == DOCUMENT_ACTIVATED:
+            self.cam_capture.clear()
+    
+    def _is_active_document(self, doc) -> bool:
+        """Check that the cached snapshot belongs to this document"""
+        try:
+            return self._active_document is not None and self._active_document == doc
+        except Exception:
+            return False
+    
     def _capture_document(self, doc) -> Dict[str, Any]:
         """Extract document information"""
         try:
@@ -70,10 +189,17 @@ class ContextCapture:
     def _capture_selection(self) -> Dict[str, Any]:
         """Extract currently selected entities"""
         try:
-            selection = self.ui.activeSelectionSet
-            if not selection:
+            # Selections defines __len__, so test for None and count explicitly
+            selection = self.ui.activeSelections
+            if selection is None or selection.count == 0:
                 return {"count": 0, "entities": []}
             
+            if CONTEXT_CONFIG.get("selection_mode", "geometry") == "geometry":
+                doc = self.app.activeDocument
+                design = doc.design if doc else None
+                units_manager = design.unitsManager if design else None
+                return self.fingerprinter.capture(selection, self._get_units(doc), units_manager)
+            
             entities = []
             for i in range(selection.count):
                 entity = selection.item(i)
@@ -104,12 +230,25 @@ class ContextCapture:
                     "name": param.name,
                     "value": str(param.value),
                     "unit": param.unit if hasattr(param, 'unit') else None,
+                    "expression": param.expression if hasattr(param, 'expression') else None,
                 })
             
             return parameters
         except Exception as e:
             return [{"error": str(e)}]
     
+    def _build_parameters(self, doc) -> List[Dict[str, Any]]:
+        """Capture parameters and update the dependency graph incrementally"""
+        parameters = self._capture_parameters(doc)
+        try:
+            self.parameter_graph.sync(p for p in parameters if "name" in p)
+            for param in parameters:
+                if "name" in param:
+                    param["depends_on"] = sorted(self.parameter_graph.dependencies(param["name"], transitive=False))
+        except Exception:
+            pass
+        return parameters
+    
     def _capture_components(self, doc) -> List[Dict[str, Any]]:
         """Extract top-level component structure"""
         try:
@@ -131,14 +270,44 @@ class ContextCapture:
         except Exception as e:
             return [{"error": str(e)}]
     
-    def _capture_cam_context(self) -> Optional[Dict[str, Any]]:
-        """Extract CAM workspace info if active"""
+    def _capture_assembly_tree(self, doc) -> Optional[OccurrenceTree]:
+        """Create a lazily expanded occurrence tree for the design"""
         try:
-            # TODO: Implement CAM context capture if CAM workspace is active
-            return None
+            if not doc.design:
+                return None
+            return OccurrenceTree(doc.design.rootComponent)
         except Exception:
             return None
     
+    def _summarize_assembly(self, tree: Optional[OccurrenceTree]) -> Optional[Dict[str, Any]]:
+        """Summarise the top of the occurrence tree for prompts"""
+        if tree is None:
+            return None
+        try:
+            return tree.summary(
+                depth=CONTEXT_CONFIG.get("assembly_prompt_depth", 2),
+                limit=CONTEXT_CONFIG.get("assembly_prompt_limit", 50),
+            )
+        except Exception as e:
+            return {"error": str(e)}
+    
+    def _capture_cam_context(self, doc) -> Optional[Dict[str, Any]]:
+        """Extract CAM setups/operations if the Manufacture workspace is active"""
+        try:
+            if not self._is_cam_workspace():
+                return None
+            return self.cam_capture.capture(get_cam_product(doc))
+        except Exception as e:
+            return {"error": str(e)}
+    
+    def _is_cam_workspace(self) -> bool:
+        """Check whether the Manufacture workspace is active"""
+        try:
+            workspace = self.ui.activeWorkspace
+            return workspace is not None and workspace.id == CAM_WORKSPACE_ID
+        except Exception:
+            return False
+    
     def _get_units(self, doc) -> str:
         """Get active document units"""
         try:
@@ -151,8 +320,10 @@ class ContextCapture:
     def _get_active_workspace(self) -> str:
         """Get current workspace (Design, CAM, Drawing, etc.)"""
         try:
-            # TODO: Determine active workspace
-            return "Design"
+            workspace = self.ui.activeWorkspace
+            if workspace is None:
+                return "Unknown"
+            return workspace.name
         except Exception:
             return "Unknown"
     
@@ -163,6 +334,7 @@ class ContextCapture:
             "selection": {"count": 0, "entities": []},
             "parameters": [],
             "components": [],
+            "assembly": None,
             "cam": None,
             "units": "mm",
             "workspace": None,
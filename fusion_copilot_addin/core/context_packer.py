@@ -0,0 +1,309 @@
+"""
+Context Packer - Fits captured Fusion context into a prompt token budget
+"""
+
+import math
+import re
+from typing import Dict, Any, List, Optional, Set
+
+
+_WORD_RE = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+")
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+# Base weight of each section's items before relevance is added
+SECTION_WEIGHTS = {
+    "selection": 1.5,
+    "parameters": 1.0,
+    "components": 0.6,
+    "assembly": 0.4,
+    "cam": 0.8,
+}
+
+# Section display order and titles in the packed text
+SECTION_ORDER = ("selection", "parameters", "components", "assembly", "cam")
+SECTION_TITLES = {
+    "selection": "Selected Entities",
+    "parameters": "Relevant Parameters",
+    "components": "Top-level Components",
+    "assembly": "Occurrences",
+    "cam": "CAM Setups",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate BPE token count without a tokenizer.
+    
+    Uses the larger of ~4 characters per token and the number of word and
+    punctuation pieces, which tracks real tokenizers closely for code and
+    identifiers.
+    """
+    if not text:
+        return 0
+    by_chars = math.ceil(len(text) / 4)
+    if by_chars < 64:
+        return max(by_chars, len(_PIECE_RE.findall(text)))
+    return by_chars
+
+
+def extract_terms(text: str) -> Set[str]:
+    """Lowercase search terms, splitting camelCase identifiers (BracketWidth -> bracket, width)"""
+    if not text:
+        return set()
+    terms = {word.lower() for word in _WORD_RE.findall(text)}
+    terms.update(word.lower() for word in re.findall(r"\w+", text))
+    return terms
+
+
+class ContextItem:
+    """One optional line of context competing for budget"""
+    
+    __slots__ = ("section", "label", "text", "terms", "order", "score", "tokens")
+    
+    def __init__(self, section: str, label: str, text: str, order: int, extra_terms: str = ""):
+        self.section = section
+        self.label = label
+        self.text = text
+        self.terms = extract_terms(f"{label} {extra_terms}")
+        self.order = order
+        self.score = 0.0
+        self.tokens = estimate_tokens(text) + 1  # +1 for the newline
+
+
+class PackedContext:
+    """Result of packing: prompt text plus a report of what was left out"""
+    
+    def __init__(self, text: str, budget: int, used_tokens: int,
+                 included: Dict[str, int], dropped: Dict[str, List[str]]):
+        self.text = text
+        self.budget = budget
+        self.used_tokens = used_tokens
+        self.included = included
+        self.dropped = dropped
+    
+    @property
+    def dropped_count(self) -> int:
+        return sum(len(labels) for labels in self.dropped.values())
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable packing report"""
+        return {
+            "budget": self.budget,
+            "used_tokens": self.used_tokens,
+            "included": dict(self.included),
+            "dropped": {section: list(labels) for section, labels in self.dropped.items()},
+        }
+
+
+class ContextPacker:
+    """
+    Packs context into a token budget.
+    
+    Header lines (document, units, selection, section counts) are always
+    kept. Individual parameters, components and occurrences are ranked by
+    relevance to the user message and the current selection, then added
+    greedily until the budget is spent.
+    """
+    
+    def __init__(self, budget_tokens: int):
+        self.budget_tokens = max(0, int(budget_tokens))
+    
+    def pack(self, context: Dict[str, Any], user_message: str = "") -> PackedContext:
+        """Pack a runtime context dict for a given user message"""
+        header = self._header_lines(context)
+        items = self._collect_items(context)
+        
+        query_terms = extract_terms(user_message)
+        selection_terms = self._selection_terms(context.get("selection"))
+        message_lower = (user_message or "").lower()
+        for item in items:
+            item.score = self._score(item, query_terms, selection_terms, message_lower)
+        self._boost_parameter_neighbours(items, context.get('parameters') or [], message_lower)
+        
+        used = sum(estimate_tokens(line) + 1 for line in header)
+        # Reserve room for section titles and the omission note
+        reserve = 24 + 8 * len(SECTION_ORDER)
+        
+        chosen: List[ContextItem] = []
+        dropped: Dict[str, List[str]] = {}
+        for item in sorted(items, key=lambda i: (-i.score, i.order)):
+            if used + item.tokens + reserve <= self.budget_tokens:
+                chosen.append(item)
+                used += item.tokens
+            else:
+                dropped.setdefault(item.section, []).append(item.label)
+        
+        lines = list(header)
+        included: Dict[str, int] = {}
+        by_section: Dict[str, List[ContextItem]] = {}
+        for item in chosen:
+            by_section.setdefault(item.section, []).append(item)
+        
+        for section in SECTION_ORDER:
+            section_items = sorted(by_section.get(section, []), key=lambda i: i.order)
+            if not section_items:
+                continue
+            included[section] = len(section_items)
+            lines.append(f"{SECTION_TITLES[section]}:")
+            used += estimate_tokens(lines[-1]) + 1
+            lines.extend(item.text for item in section_items)
+        
+        if dropped:
+            note = "Omitted for context budget: " + ", ".join(
+                f"{len(labels)} {section}" for section, labels in dropped.items()
+            )
+            lines.append(note)
+            used += estimate_tokens(note) + 1
+        
+        text = "\n".join(lines) if lines else "No context available"
+        return PackedContext(text, self.budget_tokens, used, included, dropped)
+    
+    def _header_lines(self, context: Dict[str, Any]) -> List[str]:
+        """Lines that are always included"""
+        lines = []
+        
+        if context.get('document'):
+            doc = context['document']
+            lines.append(f"Document: {doc.get('name', 'Unknown')}")
+            lines.append(f"Units: {context.get('units', 'mm')}")
+        
+        if context.get('workspace'):
+            lines.append(f"Workspace: {context['workspace']}")
+        
+        if context.get('parameters'):
+            lines.append(f"User Parameters: {len(context['parameters'])} defined")
+        
+        sel = context.get('selection')
+        if sel and sel.get('count', 0) > 0:
+            lines.append(f"Selection: {sel['count']} entities selected")
+        
+        if context.get('components'):
+            lines.append(f"Components: {len(context['components'])} top-level components")
+        
+        assembly = context.get('assembly')
+        if assembly and assembly.get('total_occurrences') is not None:
+            lines.append(f"Assembly: {assembly['total_occurrences']} occurrences")
+        
+        cam = context.get('cam')
+        if cam and cam.get('setup_count') is not None:
+            lines.append(
+                f"CAM: {cam['setup_count']} setups, {cam.get('operation_count', 0)} operations, "
+                f"{cam.get('invalid_toolpaths', 0)} needing toolpath generation"
+            )
+        
+        return lines
+    
+    def _collect_items(self, context: Dict[str, Any]) -> List[ContextItem]:
+        """Turn list-like context sections into rankable items"""
+        items = []
+        order = 0
+        
+        sel = context.get('selection') or {}
+        for entity in sel.get('entities') or []:
+            label = f"{entity.get('type', 'Entity')}#{entity.get('index', order)}"
+            items.append(ContextItem("selection", label, "  - " + self._describe_entity(entity, sel.get('units')), order,
+                                     " ".join(str(entity.get(k, "")) for k in ('name', 'body', 'component'))))
+            order += 1
+        
+        for param in context.get('parameters') or []:
+            name = param.get('name')
+            if not name:
+                continue
+            value = param.get('value')
+            unit = param.get('unit')
+            text = f"  - {name}: {value}" + (f" {unit}" if unit else "")
+            items.append(ContextItem("parameters", name, text, order, param.get('comment') or ""))
+            order += 1
+        
+        for comp in context.get('components') or []:
+            name = comp.get('name')
+            if not name:
+                continue
+            items.append(ContextItem("components", name, f"  - {name}", order))
+            order += 1
+        
+        assembly = context.get('assembly') or {}
+        for occ in assembly.get('items') or []:
+            path = occ.get('path')
+            if not path:
+                continue
+            text = f"  - {path} ({occ.get('component')})"
+            items.append(ContextItem("assembly", path, text, order, occ.get('component') or ""))
+            order += 1
+        
+        cam = context.get('cam') or {}
+        for setup in cam.get('setups') or []:
+            name = setup.get('name') or "Setup"
+            stock = setup.get('stock', {}).get('job_stockMode')
+            text = f"  - {name}: {setup.get('operation_count', 0)} operations" + (f", stock {stock}" if stock else "")
+            items.append(ContextItem("cam", name, text, order))
+            order += 1
+            for op in setup.get('operations') or []:
+                op_name = op.get('name') or "Operation"
+                text = f"    - {op_name} [{op.get('strategy')}] tool={op.get('tool', '?')} toolpath={op.get('toolpath')}"
+                items.append(ContextItem("cam", f"{name}/{op_name}", text, order,
+                                         f"{op.get('strategy') or ''} {op.get('tool') or ''}"))
+                order += 1
+        
+        return items
+    
+    def _score(self, item: ContextItem, query_terms: Set[str], selection_terms: Set[str],
+               message_lower: str) -> float:
+        """Relevance of an item to the message and selection"""
+        score = SECTION_WEIGHTS.get(item.section, 0.5)
+        if item.terms:
+            score += 2.0 * len(item.terms & query_terms) / math.sqrt(len(item.terms))
+            score += 1.0 * len(item.terms & selection_terms) / math.sqrt(len(item.terms))
+        if item.label.lower() in message_lower:
+            score += 5.0
+        return score
+    
+    def _boost_parameter_neighbours(self, items: List[ContextItem], parameters: List[Dict[str, Any]],
+                                    message_lower: str):
+        """Pull in the direct inputs and dependents of parameters named in the message"""
+        mentioned = {p['name'] for p in parameters if p.get('name') and p['name'].lower() in message_lower}
+        if not mentioned:
+            return
+        
+        neighbours = set()
+        for param in parameters:
+            depends_on = param.get('depends_on') or []
+            if param.get('name') in mentioned:
+                neighbours.update(depends_on)
+            elif mentioned.intersection(depends_on):
+                neighbours.add(param.get('name'))
+        
+        for item in items:
+            if item.section == "parameters" and item.label in neighbours:
+                item.score += 3.0
+    
+    def _describe_entity(self, entity: Dict[str, Any], units: Optional[str] = None) -> str:
+        """One-line description of a selected entity fingerprint, every value with its unit"""
+        # Fingerprints without units are in Fusion's internal cm
+        units = units or "cm"
+        parts = [entity.get('type', 'Entity')]
+        if entity.get('name'):
+            parts.append(f"'{entity['name']}'")
+        for key, suffix in (('area', '^2'), ('length', ''), ('volume', '^3')):
+            if key in entity:
+                parts.append(f"{key}={entity[key]} {units}{suffix}")
+        if entity.get('normal'):
+            parts.append("normal=({})".format(", ".join(str(v) for v in entity['normal'])))
+        if entity.get('bbox'):
+            lo, hi = entity['bbox']
+            parts.append(f"bbox={lo}..{hi} {units}")
+        if entity.get('body'):
+            parts.append(f"body={entity['body']}")
+        return " ".join(parts)
+    
+    def _selection_terms(self, selection: Optional[Dict[str, Any]]) -> Set[str]:
+        """Terms describing the current selection"""
+        terms: Set[str] = set()
+        if not selection:
+            return terms
+        for entity in selection.get('entities') or []:
+            for key in ('type', 'name', 'component', 'body'):
+                value = entity.get(key)
+                if isinstance(value, str):
+                    terms.update(extract_terms(value))
+        return terms
@@ -0,0 +1,460 @@
+"""
+Diff Engine - Line/token diffs and fuzzy unified patch application
+"""
+
+import bisect
+import re
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+
+# (tag, i1, i2, j1, j2) with tag in equal/replace/delete/insert, like difflib
+Opcode = Tuple[str, int, int, int, int]
+
+MAX_EDIT_DISTANCE = 1000   # Myers gives up beyond this and reports a replace (its trace is O(D^2))
+MAX_FUZZY_CANDIDATES = 200
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class PatchError(ValueError):
+    """A patch couldn't be applied; report holds the apply_patch() result"""
+    
+    def __init__(self, message: str, report: Dict[str, Any]):
+        super().__init__(message)
+        self.report = report
+
+
+# Sequence diff
+
+def _intern(a: Sequence, b: Sequence) -> Tuple[List[int], List[int]]:
+    """Map items to ints so comparisons in the inner loops are cheap"""
+    table: Dict[Any, int] = {}
+    return ([table.setdefault(x, len(table)) for x in a],
+            [table.setdefault(x, len(table)) for x in b])
+
+
+def _myers(a: List[int], b: List[int], a0: int, a1: int, b0: int, b1: int,
+           matches: List[Tuple[int, int]]):
+    """
+    Matching pairs of a shortest edit script between a[a0:a1] and b[b0:b1]
+    (Myers' O((N+M)D) greedy algorithm). Beyond MAX_EDIT_DISTANCE the
+    region is left unmatched.
+    """
+    n, m = a1 - a0, b1 - b0
+    max_d = min(n + m, MAX_EDIT_DISTANCE)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace: List[List[int]] = []
+    final_d = -1
+    
+    for d in range(max_d + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[a0 + x] == b[b0 + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                final_d = d
+                break
+        if final_d >= 0:
+            break
+        trace.append(v[offset - d:offset + d + 1])
+    
+    if final_d < 0:
+        return
+    
+    # Walk back through the recorded frontiers
+    found = []
+    x, y = n, m
+    for d in range(final_d, 0, -1):
+        previous = trace[d - 1]
+        k = x - y
+        if k == -d or (k != d and previous[k - 1 + d - 1] < previous[k + 1 + d - 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = previous[prev_k + d - 1]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            x -= 1
+            y -= 1
+            found.append((a0 + x, b0 + y))
+        x, y = prev_x, prev_y
+    while x > 0 and y > 0:
+        x -= 1
+        y -= 1
+        found.append((a0 + x, b0 + y))
+    matches.extend(found)
+
+
+def _unique_anchors(a: List[int], b: List[int], a0: int, a1: int, b0: int, b1: int) -> List[Tuple[int, int]]:
+    """
+    Patience anchors: items occurring exactly once on both sides, reduced to
+    the longest run that is increasing on both sides.
+    """
+    counts: Dict[int, List[int]] = {}
+    for i in range(a0, a1):
+        entry = counts.get(a[i])
+        if entry is None:
+            counts[a[i]] = [1, i, 0, -1]
+        else:
+            entry[0] += 1
+    for j in range(b0, b1):
+        entry = counts.get(b[j])
+        if entry is not None:
+            entry[2] += 1
+            entry[3] = j
+    pairs = [(entry[1], entry[3]) for entry in counts.values() if entry[0] == 1 and entry[2] == 1]
+    if not pairs:
+        return []
+    pairs.sort()
+    
+    # Longest increasing subsequence of b positions (patience sorting)
+    tails: List[int] = []
+    tail_index: List[int] = []
+    previous = [-1] * len(pairs)
+    for index, (_, j) in enumerate(pairs):
+        pile = bisect.bisect_left(tails, j)
+        if pile > 0:
+            previous[index] = tail_index[pile - 1]
+        if pile == len(tails):
+            tails.append(j)
+            tail_index.append(index)
+        else:
+            tails[pile] = j
+            tail_index[pile] = index
+    
+    anchors = []
+    index = tail_index[-1] if tail_index else -1
+    while index >= 0:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+def _match_sequences(a: List[int], b: List[int]) -> List[Tuple[int, int]]:
+    """Matching (i, j) pairs: patience anchors, Myers between them"""
+    matches: List[Tuple[int, int]] = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a0, a1, b0, b1 = stack.pop()
+        while a0 < a1 and b0 < b1 and a[a0] == b[b0]:
+            matches.append((a0, b0))
+            a0 += 1
+            b0 += 1
+        while a0 < a1 and b0 < b1 and a[a1 - 1] == b[b1 - 1]:
+            a1 -= 1
+            b1 -= 1
+            matches.append((a1, b1))
+        if a0 == a1 or b0 == b1:
+            continue
+        
+        anchors = _unique_anchors(a, b, a0, a1, b0, b1)
+        if not anchors:
+            _myers(a, b, a0, a1, b0, b1, matches)
+            continue
+        start_a, start_b = a0, b0
+        for i, j in anchors:
+            stack.append((start_a, i, start_b, j))
+            matches.append((i, j))
+            start_a, start_b = i + 1, j + 1
+        stack.append((start_a, a1, start_b, b1))
+    matches.sort()
+    return matches
+
+
+def diff_sequences(a: Sequence, b: Sequence) -> List[Opcode]:
+    """Opcodes turning sequence a into b (hashable items)"""
+    ia, ib = _intern(a, b)
+    opcodes: List[Opcode] = []
+    i = j = 0
+    for mi, mj in _match_sequences(ia, ib) + [(len(a), len(b))]:
+        if mi > i or mj > j:
+            tag = "replace" if mi > i and mj > j else ("delete" if mi > i else "insert")
+            opcodes.append((tag, i, mi, j, mj))
+        if mi < len(a):
+            if opcodes and opcodes[-1][0] == "equal":
+                tag, i1, _, j1, _ = opcodes[-1]
+                opcodes[-1] = ("equal", i1, mi + 1, j1, mj + 1)
+            else:
+                opcodes.append(("equal", mi, mi + 1, mj, mj + 1))
+        i, j = mi + 1, mj + 1
+    return opcodes
+
+
+def diff_lines(original: str, modified: str) -> List[Opcode]:
+    """Line-level opcodes between two scripts"""
+    return diff_sequences(original.splitlines(), modified.splitlines())
+
+
+def tokenize_line(line: str) -> List[str]:
+    """Identifiers, numbers and punctuation of a line (whitespace dropped)"""
+    return _TOKEN_RE.findall(line)
+
+
+def diff_tokens(old_line: str, new_line: str) -> List[Opcode]:
+    """Token-level opcodes between two lines (for inline highlighting)"""
+    return diff_sequences(tokenize_line(old_line), tokenize_line(new_line))
+
+
+def token_similarity(a: str, b: str) -> float:
+    """2 * matched tokens / total tokens, in [0, 1]"""
+    if a == b:
+        return 1.0
+    ta, tb = tokenize_line(a), tokenize_line(b)
+    if not ta and not tb:
+        return 1.0
+    if not ta or not tb:
+        return 0.0
+    ia, ib = _intern(ta, tb)
+    return 2.0 * len(_match_sequences(ia, ib)) / (len(ta) + len(tb))
+
+
+# Unified diffs
+
+def unified_diff(original: str, modified: str, context: int = 3,
+                 fromfile: str = "a/script.py", tofile: str = "b/script.py") -> str:
+    """Unified diff of two scripts ("" if they're identical)"""
+    a, b = original.splitlines(), modified.splitlines()
+    opcodes = diff_sequences(a, b)
+    if all(op[0] == "equal" for op in opcodes):
+        return ""
+    
+    out = [f"--- {fromfile}", f"+++ {tofile}"]
+    for group in _group_opcodes(opcodes, context):
+        i1, i2, j1, j2 = group[0][1], group[-1][2], group[0][3], group[-1][4]
+        out.append(f"@@ -{_hunk_range(i1, i2)} +{_hunk_range(j1, j2)} @@")
+        for tag, a1, a2, b1, b2 in group:
+            if tag == "equal":
+                out.extend(" " + line for line in a[a1:a2])
+                continue
+            out.extend("-" + line for line in a[a1:a2])
+            out.extend("+" + line for line in b[b1:b2])
+    return "\n".join(out) + "\n"
+
+
+def _hunk_range(start: int, stop: int) -> str:
+    length = stop - start
+    if length == 1:
+        return str(start + 1)
+    # An empty range names the line before it
+    return f"{start + 1 if length else start},{length}"
+
+
+def _group_opcodes(opcodes: List[Opcode], context: int) -> List[List[Opcode]]:
+    """Split opcodes into hunks with at most `context` equal lines around changes"""
+    codes = list(opcodes)
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = (tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2)
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = (tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context))
+    
+    groups: List[List[Opcode]] = []
+    group: List[Opcode] = []
+    for tag, i1, i2, j1, j2 in codes:
+        # A long equal run ends one hunk and starts the next
+        if tag == "equal" and i2 - i1 > 2 * context and group:
+            group.append((tag, i1, i1 + context, j1, j1 + context))
+            groups.append(group)
+            group = []
+            i1, j1 = i2 - context, j2 - context
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        groups.append(group)
+    return groups
+
+
+class Hunk:
+    """One @@ section of a unified diff"""
+    
+    __slots__ = ("old_start", "lines")
+    
+    def __init__(self, old_start: Optional[int]):
+        self.old_start = old_start          # 1-based, None if the header had no numbers
+        self.lines: List[Tuple[str, str]] = []  # (" " | "-" | "+", text)
+    
+    @property
+    def old_lines(self) -> List[str]:
+        return [text for tag, text in self.lines if tag != "+"]
+    
+    @property
+    def new_lines(self) -> List[str]:
+        return [text for tag, text in self.lines if tag != "-"]
+    
+    def trimmed(self, fuzz: int) -> Tuple["Hunk", int]:
+        """Copy without up to `fuzz` context lines at each end, and the number dropped at the start"""
+        start, stop = 0, len(self.lines)
+        while start < min(fuzz, stop) and self.lines[start][0] == " ":
+            start += 1
+        while stop > start and len(self.lines) - stop < fuzz and self.lines[stop - 1][0] == " ":
+            stop -= 1
+        hunk = Hunk(self.old_start + start if self.old_start is not None else None)
+        hunk.lines = self.lines[start:stop]
+        return hunk, start
+
+
+def parse_patch(patch: str) -> List[Hunk]:
+    """
+    Parse a unified diff. Tolerates what models tend to produce: missing
+    or wrong line numbers ("@@ ... @@"), wrong hunk lengths and context
+    lines that lost their leading space.
+    """
+    hunks: List[Hunk] = []
+    lines = patch.splitlines()
+    current: Optional[Hunk] = None
+    for index, line in enumerate(lines):
+        if line.startswith("@@"):
+            match = _HUNK_RE.match(line)
+            current = Hunk(int(match.group(1)) if match else None)
+            hunks.append(current)
+        elif line.startswith("--- ") and index + 1 < len(lines) and lines[index + 1].startswith("+++ "):
+            current = None
+        elif current is None or line.startswith("\\"):
+            continue
+        elif line[:1] in (" ", "-", "+"):
+            current.lines.append((line[0], line[1:]))
+        elif line.startswith("```"):
+            current = None
+        else:
+            current.lines.append((" ", line))
+    return [hunk for hunk in hunks if any(tag != " " for tag, _ in hunk.lines)]
+
+
+def _normalize(line: str) -> str:
+    return " ".join(line.split())
+
+
+class _LineIndex:
+    """Positions of each exact and whitespace-normalised line of a script"""
+    
+    def __init__(self, lines: List[str]):
+        self.lines = lines
+        self.normalized = [_normalize(line) for line in lines]
+        self.exact: Dict[str, List[int]] = {}
+        self.loose: Dict[str, List[int]] = {}
+        for i, line in enumerate(lines):
+            self.exact.setdefault(line, []).append(i)
+            self.loose.setdefault(self.normalized[i], []).append(i)
+    
+    def find(self, block: List[str], lower: int, expected: int, loose: bool) -> Optional[int]:
+        """Start of the occurrence of block closest to expected, at or after lower"""
+        lines = self.normalized if loose else self.lines
+        if loose:
+            block = [_normalize(line) for line in block]
+        positions = (self.loose if loose else self.exact).get(block[0], ())
+        best = None
+        for position in positions:
+            if position < lower or lines[position:position + len(block)] != block:
+                continue
+            if best is None or abs(position - expected) < abs(best - expected):
+                best = position
+        return best
+    
+    def find_similar(self, block: List[str], lower: int, expected: int,
+                     threshold: float) -> Optional[int]:
+        """Start of the window whose lines are most similar to block (token level)"""
+        starts = set()
+        for offset, line in enumerate(block):
+            for position in self.loose.get(_normalize(line), ()):
+                starts.add(position - offset)
+        starts.add(expected)
+        limit = len(self.lines) - len(block)
+        candidates = sorted((s for s in starts if lower <= s <= limit), key=lambda s: abs(s - expected))
+        
+        best, best_score = None, threshold
+        for start in candidates[:MAX_FUZZY_CANDIDATES]:
+            score = sum(token_similarity(self.lines[start + i], line) for i, line in enumerate(block)) / len(block)
+            if score > best_score or (score == best_score and best is None):
+                best, best_score = start, score
+        return best
+
+
+def apply_patch(original: str, patch: str, fuzz: int = 2, threshold: float = 0.8) -> Dict[str, Any]:
+    """
+    Apply a unified diff to a script.
+    
+    Each hunk is placed at the match closest to where its header (corrected
+    by the drift of earlier hunks) says it should be, trying in turn:
+    exact lines, whitespace-insensitive lines, up to `fuzz` context lines
+    dropped at each end, then token-level similarity of at least threshold.
+    
+    Returns:
+        {
+            "code": str,            # patched script (hunks that failed are skipped)
+            "applied": int,
+            "failed": list[int],    # indexes of hunks that couldn't be placed
+            "fuzzy": int,           # hunks placed by anything but an exact match
+        }
+    """
+    lines = original.splitlines()
+    index = _LineIndex(lines)
+    hunks = parse_patch(patch)
+    out: List[str] = []
+    cursor = 0
+    drift = 0
+    applied, fuzzy, failed = 0, 0, []
+    
+    for number, hunk in enumerate(hunks):
+        expected = max(cursor, hunk.old_start - 1 + drift) if hunk.old_start is not None else cursor
+        placed = _place_hunk(index, hunk, cursor, expected, fuzz, threshold)
+        if placed is None:
+            failed.append(number)
+            continue
+        
+        position, used, exact = placed
+        out.extend(lines[cursor:position])
+        # Context comes from the script itself: a loose or fuzzy match may
+        # differ from the hunk's copy in whitespace or tokens
+        offset = 0
+        for tag, text in used.lines:
+            if tag == "+":
+                out.append(text)
+                continue
+            if tag == " ":
+                out.append(lines[position + offset])
+            offset += 1
+        cursor = position + offset
+        if used.old_start is not None:
+            drift = position - (used.old_start - 1)
+        applied += 1
+        fuzzy += 0 if exact else 1
+    
+    out.extend(lines[cursor:])
+    code = "\n".join(out)
+    if out and (original.endswith("\n") or not original):
+        code += "\n"
+    return {"code": code, "applied": applied, "failed": failed, "fuzzy": fuzzy}
+
+
+def _place_hunk(index: _LineIndex, hunk: Hunk, lower: int, expected: int,
+                fuzz: int, threshold: float) -> Optional[Tuple[int, Hunk, bool]]:
+    """(position, hunk as applied, exact?) or None"""
+    if not hunk.old_lines:
+        # Pure insertion without context: trust the line number
+        return min(max(lower, expected), len(index.lines)), hunk, True
+    
+    for level in range(fuzz + 1):
+        candidate, leading = hunk.trimmed(level) if level else (hunk, 0)
+        if level and len(candidate.lines) == len(hunk.lines):
+            break  # No context left to drop
+        block = candidate.old_lines
+        if not block:
+            break
+        for loose in (False, True):
+            position = index.find(block, lower, expected + leading, loose)
+            if position is not None:
+                return position, candidate, level == 0 and not loose
+    
+    position = index.find_similar(hunk.old_lines, lower, expected, threshold)
+    if position is not None:
+        return position, hunk, False
+    return None
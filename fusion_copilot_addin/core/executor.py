@@ -2,10 +2,122 @@
 Code Executor - Safely executes generated Fusion 360 API code
 """
 
+import ast
+import builtins
+import hashlib
+import time
 import traceback
-import sys
-from typing import Dict, Any
-from io import StringIO
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional, Tuple
+
+from config import EXECUTION_CONFIG
+from core.output_capture import OutputCapture
+from core.profiler import ScriptProfiler
+from core.watchdog import ExecutionTimeout, Watchdog
+
+
+PARAMS_NAME = "__params__"
+
+
+class _ParameterHoister(ast.NodeTransformer):
+    """
+    Rewrites top-level constant assignments (NAME = 10, NAME = 'M6') as
+    NAME = __params__.get('NAME', 10), so one compiled code object can run
+    with any injected values.
+    
+    Constants directly in the body of a top-level function (as in
+    run(context)) are keyed by the function, 'run.NAME', so they never
+    collide with module constants.
+    
+    A name is only hoisted when its scope binds it once: counters,
+    accumulators and constants that are later reassigned aren't
+    parameters (injecting them would override every assignment).
+    """
+    
+    def __init__(self):
+        self.parameters: Dict[str, Any] = {}
+    
+    def hoist(self, tree: ast.Module) -> ast.Module:
+        tree.body = self._hoist_block(tree.body, "", self._module_assignment_counts(tree))
+        for node in tree.body:
+            if isinstance(node, ast.FunctionDef):
+                node.body = self._hoist_block(node.body, f"{node.name}.", self._assignment_counts(node))
+        return ast.fix_missing_locations(tree)
+    
+    def _hoist_block(self, body, prefix: str = "", assignments: Optional[Dict[str, int]] = None):
+        for node in body:
+            if not (isinstance(node, ast.Assign) and len(node.targets) == 1
+                    and isinstance(node.targets[0], ast.Name)):
+                continue
+            value = self._constant(node.value)
+            if value is None:
+                continue
+            name = node.targets[0].id
+            if assignments is not None and assignments.get(name, 0) > 1:
+                continue
+            key = prefix + name
+            self.parameters.setdefault(key, value)
+            node.value = ast.copy_location(ast.Call(
+                func=ast.Attribute(value=ast.Name(id=PARAMS_NAME, ctx=ast.Load()), attr="get", ctx=ast.Load()),
+                args=[ast.Constant(value=key), node.value],
+                keywords=[],
+            ), node.value)
+        return body
+    
+    @staticmethod
+    def _assignment_counts(function: ast.FunctionDef) -> Dict[str, int]:
+        """How often each name is bound anywhere in a function (loop targets and += included)"""
+        counts: Dict[str, int] = {}
+        for node in ast.walk(function):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                counts[node.id] = counts.get(node.id, 0) + 1
+        return counts
+    
+    @staticmethod
+    def _module_assignment_counts(tree: ast.Module) -> Dict[str, int]:
+        """How often each module-level name is bound, including in functions that declare it global"""
+        counts: Dict[str, int] = {}
+        
+        def visit(node):
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+                    if not isinstance(child, ast.Lambda):
+                        counts[child.name] = counts.get(child.name, 0) + 1
+                    for inner in ast.walk(child):
+                        if isinstance(inner, ast.Global):
+                            for name in inner.names:
+                                counts[name] = counts.get(name, 0) + 1
+                    continue
+                if isinstance(child, ast.Name) and isinstance(child.ctx, ast.Store):
+                    counts[child.id] = counts.get(child.id, 0) + 1
+                visit(child)
+        
+        visit(tree)
+        return counts
+    
+    @staticmethod
+    def _constant(node):
+        """Value of a number/string literal (including negative numbers), else None"""
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            value = _ParameterHoister._constant(node.operand)
+            return -value if isinstance(value, (int, float)) else None
+        if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)) \
+                and not isinstance(node.value, bool):
+            return node.value
+        return None
+
+
+class CompiledScript:
+    """A compiled script in the executor's cache"""
+    
+    __slots__ = ("script_id", "code", "source", "parameters", "runs")
+    
+    def __init__(self, script_id: str, code, parameters: Dict[str, Any], source: str = ""):
+        self.script_id = script_id
+        self.code = code
+        self.source = source
+        self.parameters = parameters  # Injectable names and their defaults
+        self.runs = 0
 
 
 class CodeExecutor:
@@ -14,19 +126,63 @@ class CodeExecutor:
     
     Safety features:
     - Transaction boundaries
+    - Timeout (EXECUTION_CONFIG["timeout_seconds"]): a watchdog interrupts
+      runaway scripts and their timeline features and new user parameters
+      are rolled back
     - Error capture and formatting
     - Result/output capture
     - Stack trace reporting
+    
+    Re-runs are cheap:
+    - Compiled code objects are kept in an LRU keyed by the source hash
+    - Scripts run in a shallow copy of a base namespace built once
+      (builtins, adsk), so the base itself is never modified
+    - run_cached() re-runs a compiled script with different values for its
+      top-level constants without recompiling
+    
+    Profiling (opt-in, EXECUTION_CONFIG["profile"] or profile=True) adds a
+    "profile" report with the slowest lines and adsk call sites; when off,
+    no tracer is installed.
+    
+    Multi-feature scripts:
+    - defer_compute suspends design computation for the run and
+      recomputes once at the end
+    - run_batch() / queue() + run_queued() run several scripts in one
+      transaction and one recompute, with a result per script
     """
     
     def __init__(self, app):
         self.app = app
         self.ui = app.userInterface
+        self.cache_size = EXECUTION_CONFIG.get("compile_cache_size", 64)
+        self.profile = EXECUTION_CONFIG.get("profile", False)
+        self.profile_top_n = EXECUTION_CONFIG.get("profile_top_n", 10)
+        self.timeout = EXECUTION_CONFIG.get("timeout_seconds", 60)
+        self.timeout_mode = EXECUTION_CONFIG.get("timeout_mode", "interrupt")
+        self.timeout_recheck = EXECUTION_CONFIG.get("timeout_recheck_seconds", 1.0)
+        self.defer_compute = EXECUTION_CONFIG.get("defer_compute", False)
+        self.output_chars = EXECUTION_CONFIG.get("output_buffer_chars", 200_000)
+        self.output_chunk_chars = EXECUTION_CONFIG.get("output_chunk_chars", 4096)
+        self.output_flush_seconds = EXECUTION_CONFIG.get("output_flush_seconds", 0.25)
+        self._scripts: "OrderedDict[str, CompiledScript]" = OrderedDict()
+        self._base_namespace: Optional[Dict[str, Any]] = None
+        self._queue: List[Tuple[str, Optional[Dict[str, Any]]]] = []
+        self.compile_hits = 0
+        self.compile_misses = 0
         
-    def run_code(self, code: str) -> Dict[str, Any]:
+    def run_code(self, code: str, params: Optional[Dict[str, Any]] = None,
+                 profile: Optional[bool] = None, defer_compute: Optional[bool] = None,
+                 on_output: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
         """
         Execute code in a safe, bounded transaction.
         
+        With defer_compute (default EXECUTION_CONFIG["defer_compute"]) the
+        design isn't recomputed after each feature, only once when the
+        script is done; scripts that read computed geometry (volumes,
+        faces of new features) mid-run see stale values in this mode.
+        
+        on_output receives {"stream", "text"} chunks while the script runs.
+        
         Returns:
             {
                 "success": bool,
@@ -34,74 +190,272 @@ class CodeExecutor:
                 "error": Optional[str],
                 "stack_trace": Optional[str],
                 "execution_time": float,
+                "script_id": Optional[str],   # for run_cached()
+                "parameters": dict,           # injectable names and defaults
+                "profile": dict,              # only when profiling (see ScriptProfiler.report)
+                "timeout": dict,              # only on timeout: seconds, line, source, rolled_back
+                "compute_time": float,        # only with defer_compute: the final recompute
             }
         """
         try:
-            # Capture stdout/stderr
-            old_stdout = sys.stdout
-            old_stderr = sys.stderr
-            sys.stdout = StringIO()
-            sys.stderr = StringIO()
-            
+            script, _ = self.compile(code)
+        except SyntaxError as e:
+            return self._result(None, False, error=f"Syntax error on line {e.lineno}: {e.msg}",
+                                stack_trace=traceback.format_exc())
+        return self._execute(script, params, profile, defer_compute, on_output)
+    
+    def run_cached(self, script_id: str, params: Optional[Dict[str, Any]] = None,
+                   profile: Optional[bool] = None, defer_compute: Optional[bool] = None,
+                   on_output: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
+        """
+        Re-run a previously compiled script, overriding its top-level
+        constants with params (names from the "parameters" of its result).
+        """
+        script = self._scripts.get(script_id)
+        if script is None:
+            result = self._result(None, False, error="Script is no longer cached; run its code again")
+            result["script_id"] = script_id
+            return result
+        self._scripts.move_to_end(script_id)
+        return self._execute(script, params, profile, defer_compute, on_output)
+    
+    def run_batch(self, codes: List[str], params: Optional[List[Optional[Dict[str, Any]]]] = None,
+                  defer_compute: bool = True, stop_on_error: bool = False,
+                  on_output: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
+        """
+        Run several scripts in one transaction, by default with a single
+        recompute at the end instead of one per feature.
+        
+        A failing script doesn't stop the others unless stop_on_error; a
+        timeout stops the batch and rolls back every script in it. Output
+        chunks passed to on_output carry the script's index as "script".
+        
+        Returns:
+            {
+                "success": bool,          # every script succeeded
+                "results": list[dict],    # per script, as run_code(); skipped ones have "skipped": True
+                "execution_time": float,
+                "compute_time": float,
+                "rolled_back": bool,
+            }
+        """
+        started = time.perf_counter()
+        params = params or []
+        items = []
+        for index, code in enumerate(codes):
+            try:
+                script, _ = self.compile(code)
+            except SyntaxError as e:
+                script = e
+            items.append((script, params[index] if index < len(params) else None))
+        
+        results, transaction = self._execute_scripts(items, None, defer_compute, stop_on_error, on_output)
+        return {
+            "success": all(result["success"] for result in results),
+            "results": results,
+            "execution_time": round(time.perf_counter() - started, 4),
+            "compute_time": transaction.compute_time if transaction else 0.0,
+            "rolled_back": bool(transaction and transaction.rolled_back),
+        }
+    
+    def queue(self, code: str, params: Optional[Dict[str, Any]] = None) -> int:
+        """Add a script to the batch run by run_queued(); returns the queue length"""
+        self._queue.append((code, params))
+        return len(self._queue)
+    
+    def run_queued(self, defer_compute: bool = True, stop_on_error: bool = False) -> Dict[str, Any]:
+        """Run every queued script as one batch (see run_batch) and empty the queue"""
+        queued, self._queue = self._queue, []
+        return self.run_batch([code for code, _ in queued], [params for _, params in queued],
+                              defer_compute, stop_on_error)
+    
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+    
+    def compile(self, code: str) -> Tuple[CompiledScript, bool]:
+        """Compiled script for code, from the cache when possible; returns (script, cache hit)"""
+        script_id = hashlib.sha256(code.encode("utf-8")).hexdigest()[:16]
+        script = self._scripts.get(script_id)
+        if script is not None:
+            self._scripts.move_to_end(script_id)
+            self.compile_hits += 1
+            return script, True
+        
+        hoister = _ParameterHoister()
+        tree = hoister.hoist(ast.parse(code, filename=f"<copilot:{script_id}>"))
+        script = CompiledScript(script_id, compile(tree, f"<copilot:{script_id}>", "exec"),
+                                hoister.parameters, code)
+        self.compile_misses += 1
+        self._scripts[script_id] = script
+        while len(self._scripts) > self.cache_size:
+            self._scripts.popitem(last=False)
+        return script, False
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        return {
+            "scripts": len(self._scripts),
+            "hits": self.compile_hits,
+            "misses": self.compile_misses,
+        }
+    
+    def _namespace(self) -> Dict[str, Any]:
+        """Base globals shared by every run (never modified; runs get a copy)"""
+        if self._base_namespace is None:
+            self._base_namespace = {
+                "__builtins__": builtins,
+                "adsk": __import__("adsk"),
+            }
+        return self._base_namespace
+    
+    def _execute(self, script: CompiledScript, params: Optional[Dict[str, Any]],
+                 profile: Optional[bool] = None, defer_compute: Optional[bool] = None,
+                 on_output: Optional[Callable] = None) -> Dict[str, Any]:
+        defer = self.defer_compute if defer_compute is None else defer_compute
+        results, transaction = self._execute_scripts([(script, params)], profile, defer, on_output=on_output)
+        result = results[0]
+        if defer and transaction is not None:
+            result["compute_time"] = transaction.compute_time
+        return result
+    
+    def _execute_scripts(self, items: List[Tuple[Any, Optional[Dict[str, Any]]]], profile: Optional[bool],
+                         defer_compute: bool, stop_on_error: bool = False,
+                         on_output: Optional[Callable] = None):
+        """
+        Run (script, params) pairs in one transaction; an item whose script
+        is a SyntaxError is reported without running. Returns (results,
+        transaction), transaction being None if none was opened.
+        """
+        results: List[Dict[str, Any]] = []
+        try:
             # Create transaction context
             doc = self.app.activeDocument
             if not doc:
-                return {
-                    "success": False,
-                    "error": "No active document",
-                    "output": "",
-                    "stack_trace": None,
-                }
+                return [self._result(script, False, error="No active document")
+                        for script, _ in items], None
             
             design = doc.design
             
             # Execute code within transaction
-            with self._transaction_context(doc, design):
-                # Execute the generated code
-                exec_globals = {
-                    'app': self.app,
-                    'doc': doc,
-                    'design': design,
-                    'adsk': __import__('adsk'),
-                }
+            with self._transaction_context(doc, design, defer_compute) as transaction:
+                for index, (script, params) in enumerate(items):
+                    if transaction.aborted:
+                        result = self._result(script, False, error="Skipped: an earlier script timed out")
+                        result["skipped"] = True
+                    elif stop_on_error and results and not results[-1]["success"]:
+                        result = self._result(script, False, error="Skipped: an earlier script in the batch failed")
+                        result["skipped"] = True
+                    elif isinstance(script, SyntaxError):
+                        result = self._result(None, False, error=f"Syntax error on line {script.lineno}: {script.msg}")
+                    else:
+                        forward = on_output
+                        if on_output is not None and len(items) > 1:
+                            forward = lambda chunk, index=index: on_output(dict(chunk, script=index))
+                        result = self._run_script(script, params, doc, design, profile, forward)
+                        if "timeout" in result:
+                            transaction.aborted = True
+                    results.append(result)
+        except Exception as e:
+            stack_trace = traceback.format_exc()
+            return [self._result(script, False, error=str(e), stack_trace=stack_trace)
+                    for script, _ in items], None
+        
+        for result in results:
+            timeout = result.get("timeout")
+            if timeout is not None and transaction.rolled_back:
+                timeout["rolled_back"] = True
+                result["error"] += " (its changes were rolled back)"
+        return results, transaction
+    
+    def _run_script(self, script: CompiledScript, params: Optional[Dict[str, Any]], doc, design,
+                    profile: Optional[bool], on_output: Optional[Callable] = None) -> Dict[str, Any]:
+        started = time.perf_counter()
+        watchdog = Watchdog(self.timeout, script.code.co_filename, self.timeout_mode, self.timeout_recheck)
+        profiler = None
+        if self.profile if profile is None else profile:
+            profiler = ScriptProfiler(script.code.co_filename, script.source, self.profile_top_n)
+        # Capture stdout/stderr for this execution only (other threads keep theirs)
+        capture = OutputCapture(self.output_chars, on_output, self.output_chunk_chars, self.output_flush_seconds)
+        try:
+            with capture:
+                # Copy-on-write: the script only ever writes to its own copy
+                exec_globals = dict(self._namespace())
+                exec_globals.update(app=self.app, doc=doc, design=design)
+                exec_globals[PARAMS_NAME] = dict(params or {})
                 
-                exec(code, exec_globals)
+                script.runs += 1
+                if profiler is None:
+                    with watchdog:
+                        exec(script.code, exec_globals)
+                else:
+                    # Profiler first: in trace mode the watchdog yields the tracer to it
+                    with profiler, watchdog:
+                        exec(script.code, exec_globals)
             
-            # Capture output
-            output = sys.stdout.getvalue()
-            error_output = sys.stderr.getvalue()
+            error_output = capture.errors
+            result = self._result(script, True, output=capture.output,
+                                  error=error_output if error_output else None)
             
-            return {
-                "success": True,
-                "output": output,
-                "error": error_output if error_output else None,
-                "stack_trace": None,
-                "execution_time": 0.0,
+        except ExecutionTimeout as e:
+            line = watchdog.stopped_at(e.__traceback__)
+            source = script.source.splitlines()[line - 1].strip() if line else ""
+            error = f"Script timed out after {self.timeout:g} s"
+            if line:
+                error += f" on line {line}: {source}"
+            result = self._result(script, False, output=capture.output, error=error,
+                                  stack_trace=traceback.format_exc())
+            result["timeout"] = {
+                "seconds": self.timeout,
+                "line": line,
+                "source": source,
+                "rolled_back": False,  # Set once the transaction has rolled back
             }
             
         except Exception as e:
-            stack_trace = traceback.format_exc()
-            return {
-                "success": False,
-                "output": sys.stdout.getvalue() if hasattr(sys.stdout, 'getvalue') else "",
-                "error": str(e),
-                "stack_trace": stack_trace,
-                "execution_time": 0.0,
-            }
-        finally:
-            # Restore stdout/stderr
-            sys.stdout = old_stdout
-            sys.stderr = old_stderr
+            result = self._result(script, False, output=capture.output, error=str(e),
+                                  stack_trace=traceback.format_exc())
+        
+        result["execution_time"] = round(time.perf_counter() - started, 4)
+        if profiler is not None:
+            result["profile"] = profiler.report()
+        return result
     
-    def _transaction_context(self, doc, design):
+    @staticmethod
+    def _result(script, success: bool, output: str = "", error: Optional[str] = None,
+                stack_trace: Optional[str] = None) -> Dict[str, Any]:
+        compiled = isinstance(script, CompiledScript)
+        return {
+            "success": success,
+            "output": output,
+            "error": error,
+            "stack_trace": stack_trace,
+            "execution_time": 0.0,
+            "script_id": script.script_id if compiled else None,
+            "parameters": script.parameters if compiled else {},
+        }
+    
+    def _transaction_context(self, doc, design, defer_compute: bool = False):
         """Context manager for Fusion transactions"""
         class TransactionContext:
-            def __init__(ctx_self, doc, design):
+            def __init__(ctx_self, doc, design, defer_compute):
                 ctx_self.doc = doc
                 ctx_self.design = design
                 ctx_self.action = None
+                ctx_self.checkpoint = (None, None)
+                ctx_self.defer_compute = defer_compute
+                ctx_self.was_deferred = False
+                ctx_self.compute_time = 0.0
+                ctx_self.aborted = False  # Set by the caller to roll back instead of committing
+                ctx_self.rolled_back = False
             
             def __enter__(ctx_self):
+                ctx_self.checkpoint = ctx_self._checkpoint()
+                if ctx_self.defer_compute:
+                    try:
+                        ctx_self.was_deferred = ctx_self.design.isComputeDeferred
+                        ctx_self.design.isComputeDeferred = True
+                    except Exception:
+                        ctx_self.defer_compute = False
                 try:
                     ctx_self.action = ctx_self.design.createCustomFeatureAction("AI Generated Code")
                     return ctx_self
@@ -110,22 +464,107 @@ class CodeExecutor:
                     return ctx_self
             
             def __exit__(ctx_self, exc_type, exc_val, exc_tb):
+                if ctx_self.aborted or (exc_type is not None and issubclass(exc_type, ExecutionTimeout)):
+                    ctx_self.rolled_back = ctx_self.rollback()
+                    ctx_self._resume_compute()
+                    return
+                ctx_self._resume_compute()
                 try:
                     if ctx_self.action:
                         ctx_self.action.commit()
                 except Exception:
                     pass
+            
+            def _resume_compute(ctx_self):
+                """Turn deferred compute back off: one recompute for everything the scripts did"""
+                if not ctx_self.defer_compute or ctx_self.was_deferred:
+                    return
+                started = time.perf_counter()
+                try:
+                    ctx_self.design.isComputeDeferred = False
+                except Exception:
+                    pass
+                ctx_self.compute_time = round(time.perf_counter() - started, 4)
+            
+            def _checkpoint(ctx_self):
+                """Timeline length and user parameter count before the script runs"""
+                counts = []
+                for collection in ("timeline", "userParameters"):
+                    try:
+                        counts.append(getattr(ctx_self.design, collection).count)
+                    except Exception:
+                        counts.append(None)
+                return tuple(counts)
+            
+            def rollback(ctx_self) -> bool:
+                """
+                Delete timeline features and user parameters added since the
+                checkpoint. Edits to existing parameters are not restored.
+                """
+                timeline_count, param_count = ctx_self.checkpoint
+                if timeline_count is None and param_count is None:
+                    return False
+                try:
+                    if timeline_count is not None:
+                        timeline = ctx_self.design.timeline
+                        if timeline.count > timeline_count:
+                            timeline.markerPosition = timeline_count
+                            timeline.deleteAllAfterMarker()
+                    if param_count is not None:
+                        params = ctx_self.design.userParameters
+                        for i in range(params.count - 1, param_count - 1, -1):
+                            params.item(i).deleteMe()
+                    return True
+                except Exception:
+                    return False
         
-        return TransactionContext(doc, design)
+        return TransactionContext(doc, design, defer_compute)
 
 
 class DiagnosticsEngine:
     """
     Analyzes execution errors and suggests fixes.
+    
+    With a CodeValidator, scripts are also checked before they run
+    (precheck) and its findings are folded into error analysis.
     """
     
-    def __init__(self, app):
+    def __init__(self, app, validator=None):
         self.app = app
+        self.validator = validator
+    
+    def precheck(self, code: str) -> Dict[str, Any]:
+        """
+        Statically validate code before execution.
+        
+        Returns:
+            {
+                "ok": bool,             # no errors found
+                "issues": list[dict],   # line, col, severity, code, message
+                "diagnosis": str,
+                "likely_fixes": list[str],
+                "elapsed_ms": float,
+            }
+        """
+        if self.validator is None:
+            return {"ok": True, "issues": [], "diagnosis": "", "likely_fixes": [], "elapsed_ms": 0.0}
+        
+        report = self.validator.validate(code)
+        errors = [issue for issue in report["issues"] if issue["severity"] == "error"]
+        diagnosis = ""
+        if errors:
+            first = errors[0]
+            diagnosis = f"Line {first['line']}: {first['message']}"
+            if len(errors) > 1:
+                diagnosis += f" (+{len(errors) - 1} more)"
+        
+        return {
+            "ok": report["valid"],
+            "issues": report["issues"],
+            "diagnosis": diagnosis,
+            "likely_fixes": [f"Line {issue['line']}: {issue['message']}" for issue in report["issues"]],
+            "elapsed_ms": report["elapsed_ms"],
+        }
     
     def analyze_error(self, error_text: str, code: str) -> Dict[str, Any]:
         """
@@ -141,6 +580,10 @@ class DiagnosticsEngine:
         diagnosis = self._diagnose_error(error_text)
         fixes = self._suggest_fixes(error_text, code)
         
+        # Static findings point at the exact line, so they go first
+        if self.validator is not None and code:
+            fixes = self.precheck(code)["likely_fixes"] + fixes
+        
         return {
             "diagnosis": diagnosis,
             "likely_fixes": fixes,
@@ -3,7 +3,21 @@ Orchestrator - Routes requests between UI, LLM, and code executor
 """
 
 import json
-from typing import Dict, Any, Optional
+import os
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional
+
+from config import (API_INDEX_CONFIG, CACHE_CONFIG, MODEL_CONFIG, PATCH_CONFIG, SPECULATIVE_CONFIG,
+                    VALIDATION_CONFIG)
+from core.api_index import find_stub_sources, load_api_index
+from core.codegen import CodeGenerator, PatchGenerator, looks_like_edit
+from core.diff_engine import PatchError
+from core.executor import DiagnosticsEngine
+from core.pipeline import CancelToken, GenerationCancelled
+from core.response_cache import ResponseCache, make_cache_key
+from core.speculative import SpeculativeGenerator, check_candidate
+from core.template_engine import TemplateEngine
+from core.validator import CodeValidator, load_symbol_table
 
 
 class Orchestrator:
@@ -14,72 +28,277 @@ class Orchestrator:
     - Calls LLM for code generation
     - Routes to executor
     - Returns results to UI
+    
+    Chat requests may run on a worker thread (see core/pipeline.py): with a
+    MainThreadDispatcher, context capture is marshalled to Fusion's main
+    thread and everything else stays on the caller's thread.
     """
     
-    def __init__(self, app, context_capture, executor):
+    def __init__(self, app, context_capture, executor, dispatcher=None):
         self.app = app
         self.context_capture = context_capture
         self.executor = executor
-        self.llm_client = None  # Will be initialized with model selection
+        self.dispatcher = dispatcher
+        self.llm_client = self._create_llm_client()
+        self.api_index = self._create_api_index()
+        self.codegen = CodeGenerator(self.llm_client, self.api_index)
+        self.validator = self._create_validator()
+        self.diagnostics = DiagnosticsEngine(app, self.validator)
+        self.response_cache = self._create_response_cache()
+        self.template_engine = self._create_template_engine()
+        self._extra_clients = []
+        self.speculative = self._create_speculative_generator()
+        self.current_code: Optional[str] = None  # Last generated or executed script (base for edits)
+        self._cached_code_keys: "OrderedDict[str, str]" = OrderedDict()  # Script -> response cache key
         
-    def process_chat_message(self, user_message: str) -> Dict[str, Any]:
+    def process_chat_message(self, user_message: str, cancel: Optional[CancelToken] = None,
+                             force: bool = False) -> Dict[str, Any]:
         """
         Main entry point for chat messages from the UI panel.
         
+        force skips the response cache lookup (regenerate); the new result
+        replaces the cached one.
+        
         Returns:
             {
                 "title": str,
                 "plan": list[str],
                 "code": str,
                 "notes": str,
-                "error": Optional[str]
+                "error": Optional[str],
+                "cancelled": bool,      # only present when cancel was set
             }
         """
         try:
             # Capture current Fusion context
-            context = self.context_capture.get_runtime_context()
+            context = self._capture_context(cancel)
+            
+            # Follow-up edits of a long script are answered with a patch
+            base_code = self._edit_base(user_message)
+            
+            # Near-identical requests against the same design state are served from cache
+            cache_key = self._cache_key(user_message, context, base_code)
+            cached = None if force else self._cache_lookup(cache_key)
+            if cached is not None:
+                self._remember(cached)
+                return cached
             
             # Generate code using LLM
-            result = self._generate_code(user_message, context)
+            result = self._generate_code(user_message, context, base_code, cancel)
+            self._cache_store(cache_key, result)
+            self._remember(result)
             
             return result
             
+        except GenerationCancelled as e:
+            return self._cancelled_result(e)
         except Exception as e:
-            return {
-                "error": str(e),
-                "code": "",
-                "plan": [],
-                "title": "Error",
-                "notes": "Failed to generate code"
-            }
+            return self._error_result(e)
+    
+    def stream_chat_message(self, user_message: str,
+                            on_event: Callable[[Dict[str, Any]], None],
+                            cancel: Optional[CancelToken] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        Like process_chat_message(), but streams partial output.
+        
+        on_event receives {"type": "title"|"plan_item"|"code"|"notes", "value": ...}
+        as soon as each piece of the response is complete. The final result
+        is returned in the same shape as process_chat_message(). Setting
+        cancel stops the request between stages or mid-stream (the
+        connection is dropped).
+        """
+        try:
+            context = self._capture_context(cancel)
+            
+            if self.llm_client is None:
+                result = self._generate_code(user_message, context)
+                self._remember(result)
+                return result
+            
+            base_code = self._edit_base(user_message)
+            cache_key = self._cache_key(user_message, context, base_code)
+            cached = None if force else self._cache_lookup(cache_key)
+            if cached is not None:
+                self._replay_events(cached, on_event)
+                self._remember(cached)
+                return cached
+            
+            if self.speculative is not None:
+                # Candidates race in the background; only the winner is shown
+                result = self._generate_code(user_message, context, base_code, cancel)
+                self._replay_events(result, on_event)
+                self._cache_store(cache_key, result)
+                self._remember(result)
+                return result
+            
+            prompt = self.codegen.build_prompt(user_message, context, base_code)
+            parser = self.codegen.create_stream_parser()
+            stream = self.llm_client.stream(prompt)
+            try:
+                for chunk in stream:
+                    if cancel is not None:
+                        cancel.raise_if_cancelled()
+                    for event in parser.feed(chunk):
+                        on_event(event)
+            finally:
+                # Closing an unfinished stream drops its connection
+                stream.close()
+            
+            result = parser.finish()
+            result["error"] = None
+            if base_code is not None and not result.get("code"):
+                # A patch streams no code; send the patched script once it's applied
+                result = self._regenerate_if_unpatched(self._resolve_patch(result, base_code),
+                                                       user_message, context, base_code, cancel)
+                on_event({"type": "code", "value": result.get("code", "")})
+            self._cache_store(cache_key, result)
+            self._remember(result)
+            return result
+            
+        except GenerationCancelled as e:
+            return self._cancelled_result(e)
+        except Exception as e:
+            return self._error_result(e)
     
-    def execute_code(self, code: str) -> Dict[str, Any]:
+    def execute_code(self, code: str, profile: Optional[bool] = None,
+                     on_output: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
         """
         Execute generated code in Fusion 360.
         
+        Code is validated first; with block_on_errors, scripts with static
+        errors are rejected without touching the design. profile overrides
+        EXECUTION_CONFIG["profile"] for this run. on_output receives the
+        script's output as {"stream", "text"} chunks while it runs.
+        
         Returns:
             {
                 "success": bool,
                 "output": str,
                 "error": Optional[str],
-                "stack_trace": Optional[str]
+                "stack_trace": Optional[str],
+                "validation": list[dict],   # static issues (when validation is enabled)
+                "profile": dict,            # hotspot report (when profiling)
             }
         """
-        return self.executor.run_code(code)
+        check = self.diagnostics.precheck(code)
+        if not check["ok"] and VALIDATION_CONFIG.get("block_on_errors", True):
+            self._cache_evict(code)
+            return {
+                "success": False,
+                "output": "",
+                "error": f"Validation failed: {check['diagnosis']}",
+                "stack_trace": None,
+                "validation": check["issues"],
+                "likely_fixes": check["likely_fixes"],
+            }
+        
+        result = self.executor.run_code(code, profile=profile, on_output=on_output)
+        self._design_changed(result)
+        if check["issues"]:
+            result["validation"] = check["issues"]
+        if result.get("success"):
+            # What actually ran (possibly edited in the panel) is the base for follow-up edits
+            self.current_code = code
+        else:
+            self._cache_evict(code)
+        return result
+    
+    def execute_batch(self, codes: List[str], stop_on_error: bool = False,
+                      on_output: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
+        """
+        Execute several scripts in one transaction with a single recompute
+        (CodeExecutor.run_batch). Scripts that fail validation are reported
+        and left out of the batch. Output chunks carry the index into codes
+        as "script".
+        """
+        checks = [self.diagnostics.precheck(code) for code in codes]
+        block = VALIDATION_CONFIG.get("block_on_errors", True)
+        runnable = [i for i, check in enumerate(checks) if check["ok"] or not block]
+        
+        forward = None
+        if on_output is not None:
+            forward = lambda chunk: on_output(dict(chunk, script=runnable[chunk.get("script", 0)]))
+        batch = self.executor.run_batch([codes[i] for i in runnable], stop_on_error=stop_on_error,
+                                        on_output=forward)
+        if runnable and not batch.get("rolled_back"):
+            self.context_capture.design_changed()
+        ran = dict(zip(runnable, batch["results"]))
+        results = []
+        for i, check in enumerate(checks):
+            result = ran.get(i)
+            if result is None:
+                result = {
+                    "success": False,
+                    "output": "",
+                    "error": f"Validation failed: {check['diagnosis']}",
+                    "stack_trace": None,
+                    "likely_fixes": check["likely_fixes"],
+                }
+            if check["issues"]:
+                result["validation"] = check["issues"]
+            if not result["success"] and not result.get("skipped"):
+                self._cache_evict(codes[i])
+            results.append(result)
+        
+        succeeded = [codes[i] for i in runnable if ran[i].get("success")]
+        if succeeded and not batch["rolled_back"]:
+            self.current_code = succeeded[-1]
+        batch["results"] = results
+        batch["success"] = all(result["success"] for result in results)
+        return batch
+    
+    def rerun_code(self, script_id: str, params: Optional[Dict[str, Any]] = None,
+                   profile: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Re-run an executed script (script_id from execute_code()) with new
+        values for its top-level constants, without recompiling it.
+        """
+        result = self.executor.run_cached(script_id, params, profile=profile)
+        self._design_changed(result)
+        return result
+    
+    def _design_changed(self, result: Dict[str, Any]):
+        """Drop cached context after a script run, unless its changes were rolled back"""
+        timeout = result.get("timeout") or {}
+        if result.get("success") or not timeout.get("rolled_back"):
+            self.context_capture.design_changed()
     
     def get_code_explanation(self, code: str) -> str:
         """Get AI explanation of what code does"""
         # TODO: Call LLM for explanation
         return "Code explanation will be implemented"
     
-    def _generate_code(self, user_message: str, context: Dict[str, Any]) -> Dict[str, Any]:
+    def _generate_code(self, user_message: str, context: Dict[str, Any],
+                       base_code: Optional[str] = None,
+                       cancel: Optional[CancelToken] = None) -> Dict[str, Any]:
         """
         Call LLM to generate code based on user message and context.
         
         This is where the "Copilot-like" magic happens - enriching the prompt
-        with live Fusion context.
+        with live Fusion context. With base_code the model is asked for a
+        patch against it, which is applied here.
         """
-        # TODO: Integrate with LLM (OpenAI, local model, etc.)
+        if self.speculative is not None:
+            prompt = self.codegen.build_prompt(user_message, context, base_code)
+            result = self.speculative.generate(
+                prompt,
+                parse=lambda text: self._resolve_patch(self.codegen.parse_llm_response(text), base_code),
+                cancel=cancel,
+            )
+            return self._regenerate_if_unpatched(result, user_message, context, base_code, cancel)
+        
+        if self.llm_client is not None:
+            prompt = self.codegen.build_prompt(user_message, context, base_code)
+            response_text = self.llm_client.generate(prompt)
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            result = self._resolve_patch(self.codegen.parse_llm_response(response_text), base_code)
+            result["error"] = None
+            return self._regenerate_if_unpatched(result, user_message, context, base_code, cancel)
+        
+        if self.template_engine is not None:
+            return self.template_engine.generate(user_message, context)
+        
         return {
             "title": "Generated Code",
             "plan": ["Step 1", "Step 2", "Step 3"],
@@ -87,6 +306,250 @@ class Orchestrator:
             "notes": "This is a placeholder",
             "error": None
         }
+    
+    
+    def _edit_base(self, user_message: str) -> Optional[str]:
+        """The current script, if this message should be answered with a patch against it"""
+        if not PATCH_CONFIG.get("enabled", True) or self.llm_client is None or not self.current_code:
+            return None
+        if self.current_code.count("\n") + 1 < PATCH_CONFIG.get("min_lines", 40):
+            return None
+        return self.current_code if looks_like_edit(user_message) else None
+    
+    def _resolve_patch(self, result: Dict[str, Any], base_code: Optional[str]) -> Dict[str, Any]:
+        """Turn a patch response into the full edited script (code stays empty if it doesn't apply)"""
+        if base_code is None or result.get("code") or not result.get("patch"):
+            return result
+        try:
+            result["code"] = PatchGenerator.apply_patch(base_code, result["patch"])
+        except PatchError as e:
+            result["patch_error"] = str(e)
+        return result
+    
+    def _regenerate_if_unpatched(self, result: Dict[str, Any], user_message: str,
+                                 context: Dict[str, Any], base_code: Optional[str],
+                                 cancel: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """Fall back to generating the whole script when an edit produced no usable patch"""
+        if base_code is None or result.get("code"):
+            return result
+        retry = self._generate_code(user_message, context, cancel=cancel)
+        reason = result.get("patch_error") or "No patch in response"
+        retry["notes"] = f"{retry.get('notes', '')}\n{reason}; regenerated the full script.".strip()
+        return retry
+    
+    def _remember(self, result: Dict[str, Any]):
+        if result.get("code") and not result.get("error"):
+            self.current_code = result["code"]
+    
+    def get_prefix_reuse_report(self) -> Dict[str, Any]:
+        """Prompt prefix tokens reused across turns (see CodeGenerator)"""
+        return self.codegen.get_prefix_reuse_report()
+    
+    def get_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Response cache hit/miss statistics"""
+        return self.response_cache.stats() if self.response_cache else None
+    
+    def _create_api_index(self):
+        """
+        Open the memory-mapped API reference index, building it from the
+        configured sources (or Fusion's installed stubs) if they changed.
+        """
+        if not API_INDEX_CONFIG.get("enabled", True):
+            return None
+        
+        addin_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        index_path = API_INDEX_CONFIG.get("index_path") or os.path.join(addin_path, ".cache", "api_index.bin")
+        
+        try:
+            return load_api_index(self._api_sources(), index_path)
+        except Exception:
+            return None
+    
+    def _create_validator(self) -> Optional[CodeValidator]:
+        """Static validator over the symbol table of the API index sources"""
+        if not VALIDATION_CONFIG.get("enabled", True):
+            return None
+        
+        addin_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        symbols_path = VALIDATION_CONFIG.get("symbols_path") or os.path.join(addin_path, ".cache", "api_symbols.json")
+        
+        try:
+            return CodeValidator(load_symbol_table(self._api_sources(), symbols_path))
+        except Exception:
+            return None
+    
+    def _api_sources(self) -> list:
+        """Configured API sources, else Fusion's installed stubs, else the bundled JSON seed"""
+        sources = list(API_INDEX_CONFIG.get("sources") or [])
+        if not sources:
+            addin_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            sources = find_stub_sources() or [os.path.join(addin_path, "scripts", "api_reference.json")]
+        return sources
+    
+    def _check_candidate(self, code: str) -> list:
+        """Speculative candidate check: cheap checks, then validator errors"""
+        problems = check_candidate(code)
+        if problems or self.validator is None:
+            return problems
+        report = self.validator.validate(code)
+        return [f"Line {issue['line']}: {issue['message']}"
+                for issue in report["issues"] if issue["severity"] == "error"]
+    
+    def _create_speculative_generator(self) -> Optional[SpeculativeGenerator]:
+        """Candidate racing across temperatures/backends, if enabled"""
+        if not SPECULATIVE_CONFIG.get("enabled") or self.llm_client is None:
+            return None
+        
+        clients = [self.llm_client]
+        for name in SPECULATIVE_CONFIG.get("backends") or []:
+            try:
+                from llm_backends import create_backend
+                client = create_backend(name)
+            except Exception:
+                client = None
+            if client is not None:
+                clients.append(client)
+        self._extra_clients = clients[1:]
+        
+        return SpeculativeGenerator(
+            clients,
+            self.codegen.parse_llm_response,
+            temperatures=SPECULATIVE_CONFIG.get("temperatures") or [None],
+            candidates=SPECULATIVE_CONFIG.get("candidates", 3),
+            max_concurrent=SPECULATIVE_CONFIG.get("max_concurrent", 2),
+            checker=self._check_candidate,
+        )
+    
+    def _create_template_engine(self) -> Optional[TemplateEngine]:
+        """Load the offline template library when the offline backend is selected"""
+        if MODEL_CONFIG.get("default_backend") != "offline":
+            return None
+        
+        settings = MODEL_CONFIG.get("offline", {})
+        template_dir = settings.get("template_dir", "scripts/templates/")
+        if not os.path.isabs(template_dir):
+            addin_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            template_dir = os.path.join(addin_path, template_dir)
+        
+        try:
+            return TemplateEngine(
+                template_dir,
+                min_score=settings.get("min_score", 4.0),
+                persist_index=settings.get("persist_index", True),
+            )
+        except Exception:
+            return None
+    
+    def _create_response_cache(self) -> Optional[ResponseCache]:
+        """Create the response cache described by CACHE_CONFIG"""
+        if not CACHE_CONFIG.get("enabled", True):
+            return None
+        
+        disk_dir = CACHE_CONFIG.get("disk_dir")
+        if disk_dir is None:
+            addin_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            disk_dir = os.path.join(addin_path, ".cache", "responses")
+        
+        return ResponseCache(
+            max_entries=CACHE_CONFIG.get("max_entries", 256),
+            ttl_seconds=CACHE_CONFIG.get("ttl_seconds", 86400),
+            disk_dir=disk_dir or None,
+            max_disk_bytes=int(CACHE_CONFIG.get("max_disk_mb", 50) * 1024 * 1024),
+        )
+    
+    def _cache_key(self, user_message: str, context: Dict[str, Any],
+                   base_code: Optional[str] = None) -> Optional[str]:
+        """Key for a request, or None if it shouldn't be cached"""
+        if self.response_cache is None or self.llm_client is None:
+            return None
+        backend = f"{self.llm_client.name}:{self.llm_client.model}"
+        return make_cache_key(user_message, context, backend, base_code or "")
+    
+    def _cache_lookup(self, cache_key: Optional[str]) -> Optional[Dict[str, Any]]:
+        if cache_key is None:
+            return None
+        cached = self.response_cache.get(cache_key)
+        if cached is not None:
+            cached["cached"] = True
+            self._track_cached_code(cached["code"], cache_key)
+        return cached
+    
+    def _cache_store(self, cache_key: Optional[str], result: Dict[str, Any]):
+        """Only generations whose code passes the static checks and the validator are cached"""
+        if cache_key is None or result.get("error") or not result.get("code"):
+            return
+        if self._check_candidate(result["code"]):
+            return
+        self.response_cache.put(cache_key, result)
+        self._track_cached_code(result["code"], cache_key)
+    
+    def _track_cached_code(self, code: str, cache_key: str):
+        """Remember which entry served a script, so it can be evicted if the script fails"""
+        self._cached_code_keys[code] = cache_key
+        self._cached_code_keys.move_to_end(code)
+        while len(self._cached_code_keys) > CACHE_CONFIG.get("max_entries", 256):
+            self._cached_code_keys.popitem(last=False)
+    
+    def _cache_evict(self, code: str):
+        """Drop the cached response that produced a script that failed"""
+        cache_key = self._cached_code_keys.pop(code, None)
+        if cache_key is not None and self.response_cache is not None:
+            self.response_cache.discard(cache_key)
+    
+    def _replay_events(self, result: Dict[str, Any], on_event: Callable[[Dict[str, Any]], None]):
+        """Send a cached result through the streaming callback"""
+        on_event({"type": "title", "value": result.get("title", "")})
+        for step in result.get("plan") or []:
+            on_event({"type": "plan_item", "value": step})
+        on_event({"type": "code", "value": result.get("code", "")})
+        if result.get("notes"):
+            on_event({"type": "notes", "value": result["notes"]})
+    
+    def _capture_context(self, cancel: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """Read the live Fusion context (on the main thread when called from a worker)"""
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        if self.dispatcher is not None:
+            return self.dispatcher.call(self.context_capture.get_runtime_context, cancel=cancel)
+        return self.context_capture.get_runtime_context()
+    
+    def _cancelled_result(self, reason: Exception) -> Dict[str, Any]:
+        """Result of a request that was cancelled or superseded"""
+        return {
+            "error": None,
+            "cancelled": True,
+            "code": "",
+            "plan": [],
+            "title": "Cancelled",
+            "notes": str(reason) or "cancelled",
+        }
+    
+    def _error_result(self, error: Exception) -> Dict[str, Any]:
+        """Result returned to the UI when generation fails"""
+        return {
+            "error": str(error),
+            "code": "",
+            "plan": [],
+            "title": "Error",
+            "notes": "Failed to generate code"
+        }
+    
+    def close(self):
+        """Release LLM connections and the API index mapping"""
+        if self.llm_client is not None:
+            self.llm_client.close()
+        for client in self._extra_clients:
+            client.close()
+        if self.api_index is not None:
+            self.api_index.close()
+    
+    def _create_llm_client(self):
+        """Create the configured LLM backend (None if unavailable)"""
+        try:
+            from llm_backends import create_backend
+            return create_backend()
+        except Exception:
+            return None
 
 
 class CodeGenerationRequest:
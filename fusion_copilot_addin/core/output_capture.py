@@ -0,0 +1,176 @@
+"""
+Output Capture - Per-execution stdout/stderr capture with bounded memory
+"""
+
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Optional
+
+
+_current: ContextVar[Optional["OutputCapture"]] = ContextVar("copilot_output_capture", default=None)
+_install_lock = threading.Lock()
+
+
+class RingBuffer:
+    """Keeps the last max_chars characters written; older text is dropped"""
+    
+    __slots__ = ("max_chars", "_chunks", "_size", "dropped")
+    
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self._chunks: Deque[str] = deque()
+        self._size = 0
+        self.dropped = 0
+    
+    def write(self, text: str):
+        if not text:
+            return
+        if len(text) >= self.max_chars:
+            self.dropped += self._size + len(text) - self.max_chars
+            self._chunks.clear()
+            text = text[-self.max_chars:]
+            self._size = 0
+        self._chunks.append(text)
+        self._size += len(text)
+        while self._size > self.max_chars:
+            excess = self._size - self.max_chars
+            head = self._chunks[0]
+            if len(head) <= excess:
+                self._chunks.popleft()
+                self._size -= len(head)
+                self.dropped += len(head)
+            else:
+                self._chunks[0] = head[excess:]
+                self._size -= excess
+                self.dropped += excess
+    
+    def getvalue(self) -> str:
+        text = "".join(self._chunks)
+        if self.dropped:
+            return f"[... {self.dropped} earlier characters dropped ...]\n{text}"
+        return text
+
+
+class _RoutingStream:
+    """
+    Installed once as sys.stdout / sys.stderr. Writes go to the capture of
+    the current context (thread, task) if there is one, otherwise to the
+    stream that was there before.
+    """
+    
+    def __init__(self, name: str, original):
+        self.name = name
+        self.original = original
+    
+    def write(self, text: str) -> int:
+        capture = _current.get()
+        if capture is None:
+            return self.original.write(text) if self.original is not None else len(text)
+        capture.write(self.name, text)
+        return len(text)
+    
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+    
+    def flush(self):
+        if _current.get() is None and self.original is not None:
+            self.original.flush()
+    
+    def isatty(self) -> bool:
+        return False
+    
+    @property
+    def encoding(self) -> str:
+        return getattr(self.original, "encoding", None) or "utf-8"
+    
+    def fileno(self) -> int:
+        return self.original.fileno()
+
+
+def install():
+    """Route sys.stdout/sys.stderr through the current capture (idempotent)"""
+    with _install_lock:
+        for name in ("stdout", "stderr"):
+            stream = getattr(sys, name)
+            if not isinstance(stream, _RoutingStream):
+                setattr(sys, name, _RoutingStream(name, stream))
+
+
+class OutputCapture:
+    """
+    Captures what one execution prints, without touching other executions:
+    - Entering sets a context variable that the routing streams read, so
+      concurrent executions (threads or tasks) each get their own output
+    - Each stream keeps at most max_chars in a RingBuffer, so a chatty
+      script can't grow memory without bound
+    - on_chunk, if given, receives {"stream", "text"} as the script runs,
+      every chunk_chars characters or at the first line end after
+      flush_seconds, whichever comes first
+    """
+    
+    def __init__(self, max_chars: int = 200_000,
+                 on_chunk: Optional[Callable[[Dict[str, Any]], Any]] = None,
+                 chunk_chars: int = 4096, flush_seconds: float = 0.25):
+        self.stdout = RingBuffer(max_chars)
+        self.stderr = RingBuffer(max_chars)
+        self.on_chunk = on_chunk
+        self.chunk_chars = chunk_chars
+        self.flush_seconds = flush_seconds
+        self._pending: Dict[str, list] = {"stdout": [], "stderr": []}
+        self._pending_size = 0
+        self._last_flush = 0.0
+        self._token = None
+    
+    def __enter__(self):
+        install()
+        self._last_flush = 0.0  # The first complete line goes out immediately
+        self._token = _current.set(self)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        _current.reset(self._token)
+        self.flush()
+        return False
+    
+    def write(self, name: str, text: str):
+        (self.stdout if name == "stdout" else self.stderr).write(text)
+        if self.on_chunk is None or not text:
+            return
+        self._pending[name].append(text)
+        self._pending_size += len(text)
+        if self._pending_size >= self.chunk_chars:
+            self.flush()
+        elif text.endswith("\n") and time.monotonic() - self._last_flush >= self.flush_seconds:
+            # Timed flushes wait for a line end so chunks don't split print() calls
+            self.flush()
+    
+    def flush(self):
+        """Send pending text to on_chunk"""
+        self._last_flush = time.monotonic()
+        if self.on_chunk is None or not self._pending_size:
+            return
+        for name, parts in self._pending.items():
+            if parts:
+                text = "".join(parts)
+                parts.clear()
+                # Streaming is best effort; it must never fail the script
+                token = _current.set(None)
+                try:
+                    self.on_chunk({"stream": name, "text": text[-self.stdout.max_chars:]})
+                except Exception:
+                    pass
+                finally:
+                    _current.reset(token)
+        self._pending_size = 0
+    
+    @property
+    def output(self) -> str:
+        return self.stdout.getvalue()
+    
+    @property
+    def errors(self) -> str:
+        return self.stderr.getvalue()
@@ -0,0 +1,211 @@
+"""
+Parameter Graph - Dependency DAG over user parameter expressions
+"""
+
+import re
+from typing import Dict, Any, List, Optional, Set, Iterable
+
+
+_IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+def extract_identifiers(expression: str) -> Set[str]:
+    """Get every identifier in a Fusion parameter expression (names, units, functions)"""
+    if not expression:
+        return set()
+    return set(_IDENTIFIER_RE.findall(expression))
+
+
+class ParameterGraph:
+    """
+    Dependency graph of user parameters.
+    
+    An edge A -> B means B's expression references A, so editing A changes B.
+    Identifiers that are not parameters (units, functions) are ignored, but
+    references to parameters that don't exist yet are remembered so the edge
+    appears as soon as the parameter is added.
+    """
+    
+    def __init__(self):
+        self.expressions: Dict[str, str] = {}
+        self._depends_on: Dict[str, Set[str]] = {}
+        self._dependents: Dict[str, Set[str]] = {}
+        # identifier -> parameters whose expression mention it but it isn't a parameter (yet)
+        self._unresolved: Dict[str, Set[str]] = {}
+        self._order: Optional[List[str]] = None
+        self._cycles: List[str] = []
+    
+    def __len__(self) -> int:
+        return len(self.expressions)
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.expressions
+    
+    def build(self, parameters: Iterable[Dict[str, Any]]):
+        """Rebuild the graph from captured parameter dicts"""
+        self.__init__()
+        for param in parameters:
+            name = param.get("name")
+            if name:
+                self.expressions[name] = param.get("expression") or ""
+                self._depends_on[name] = set()
+                self._dependents.setdefault(name, set())
+        for name in self.expressions:
+            self._link(name)
+    
+    def sync(self, parameters: Iterable[Dict[str, Any]]) -> Set[str]:
+        """
+        Bring the graph in line with a fresh parameter capture.
+        Only parameters whose expression changed are re-linked.
+        
+        Returns:
+            Names of parameters that were added, removed or changed
+        """
+        incoming = {}
+        for param in parameters:
+            name = param.get("name")
+            if name:
+                incoming[name] = param.get("expression") or ""
+        
+        changed = set()
+        for name in list(self.expressions):
+            if name not in incoming:
+                self.remove(name)
+                changed.add(name)
+        for name, expression in incoming.items():
+            if self.expressions.get(name) != expression or name not in self.expressions:
+                self.update(name, expression)
+                changed.add(name)
+        return changed
+    
+    def update(self, name: str, expression: str):
+        """Add or change one parameter and re-link only its edges"""
+        is_new = name not in self.expressions
+        self._unlink(name)
+        self.expressions[name] = expression or ""
+        self._depends_on[name] = set()
+        self._dependents.setdefault(name, set())
+        self._link(name)
+        
+        if is_new:
+            # Parameters that referenced this name before it existed
+            for waiting in self._unresolved.pop(name, set()):
+                self._depends_on[waiting].add(name)
+                self._dependents[name].add(waiting)
+        self._order = None
+    
+    def remove(self, name: str):
+        """Remove a parameter; its dependents keep an unresolved reference"""
+        if name not in self.expressions:
+            return
+        self._unlink(name)
+        for dependent in self._dependents.pop(name, set()):
+            self._depends_on[dependent].discard(name)
+            self._unresolved.setdefault(name, set()).add(dependent)
+        del self.expressions[name]
+        del self._depends_on[name]
+        self._order = None
+    
+    def dependencies(self, name: str, transitive: bool = True) -> Set[str]:
+        """Parameters that a parameter's value is computed from"""
+        return self._reach(name, self._depends_on, transitive)
+    
+    def dependents(self, name: str, transitive: bool = True) -> Set[str]:
+        """Parameters that change when this parameter changes"""
+        return self._reach(name, self._dependents, transitive)
+    
+    def impact(self, names: Iterable[str]) -> List[str]:
+        """
+        Affected closure of an edit: the edited parameters plus everything
+        downstream of them, in evaluation order.
+        """
+        affected = set()
+        for name in names:
+            if name in self.expressions:
+                affected.add(name)
+                affected |= self.dependents(name)
+        return [name for name in self.topological_order() if name in affected]
+    
+    def related(self, names: Iterable[str]) -> List[str]:
+        """Parameters needed to understand an edit: upstream inputs plus the affected closure"""
+        names = list(names)
+        closure = set(self.impact(names))
+        for name in list(closure):
+            closure |= self.dependencies(name)
+        return [name for name in self.topological_order() if name in closure]
+    
+    def topological_order(self) -> List[str]:
+        """Evaluation order (dependencies first). Cycle members are appended at the end."""
+        if self._order is not None:
+            return self._order
+        
+        in_degree = {name: len(deps) for name, deps in self._depends_on.items()}
+        ready = [name for name, degree in in_degree.items() if degree == 0]
+        order = []
+        while ready:
+            name = ready.pop()
+            order.append(name)
+            for dependent in self._dependents.get(name, ()):
+                in_degree[dependent] -= 1
+                if in_degree[dependent] == 0:
+                    ready.append(dependent)
+        
+        placed = set(order)
+        self._cycles = [name for name in self.expressions if name not in placed]
+        order.extend(self._cycles)
+        self._order = order
+        return order
+    
+    @property
+    def cycles(self) -> List[str]:
+        """Parameters involved in (or downstream of) a reference cycle"""
+        self.topological_order()
+        return list(self._cycles)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable adjacency for prompts and the UI"""
+        return {
+            "order": list(self.topological_order()),
+            "depends_on": {name: sorted(deps) for name, deps in self._depends_on.items() if deps},
+            "cycles": self.cycles,
+        }
+    
+    def _link(self, name: str):
+        """Create edges from the parameters named in an expression"""
+        for identifier in extract_identifiers(self.expressions[name]):
+            if identifier == name:
+                continue
+            if identifier in self.expressions:
+                self._depends_on[name].add(identifier)
+                self._dependents.setdefault(identifier, set()).add(name)
+            else:
+                self._unresolved.setdefault(identifier, set()).add(name)
+        self._order = None
+    
+    def _unlink(self, name: str):
+        """Drop the edges created by a parameter's expression"""
+        for dependency in self._depends_on.get(name, ()):
+            self._dependents.get(dependency, set()).discard(name)
+        if name in self.expressions:
+            for identifier in extract_identifiers(self.expressions[name]):
+                waiting = self._unresolved.get(identifier)
+                if waiting:
+                    waiting.discard(name)
+                    if not waiting:
+                        del self._unresolved[identifier]
+        self._depends_on[name] = set()
+    
+    @staticmethod
+    def _reach(name: str, edges: Dict[str, Set[str]], transitive: bool) -> Set[str]:
+        if not transitive:
+            return set(edges.get(name, ()))
+        seen = set()
+        stack = list(edges.get(name, ()))
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            stack.extend(edges.get(node, ()))
+        seen.discard(name)
+        return seen
@@ -0,0 +1,292 @@
+"""
+Pipeline - Chat requests on a worker thread, adsk access marshalled to the main thread
+"""
+
+import json
+import threading
+from typing import Dict, Any, Callable, List, Optional
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a request when it was cancelled or superseded"""
+
+
+class CancelToken:
+    """Cancellation flag shared between the panel, the pipeline and the orchestrator"""
+    
+    __slots__ = ("_event", "reason")
+    
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+    
+    def cancel(self, reason: str = "cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+    
+    def is_set(self) -> bool:
+        return self._event.is_set()
+    
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise GenerationCancelled(self.reason or "cancelled")
+
+
+class _MainThreadCall:
+    __slots__ = ("fn", "args", "done", "result", "error")
+    
+    def __init__(self, fn: Callable, args: tuple):
+        self.fn = fn
+        self.args = args
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class MainThreadDispatcher:
+    """
+    Runs callables on Fusion's main thread.
+    
+    - Worker threads queue calls and fire a Fusion custom event; Fusion
+      invokes the handler on the main thread, which drains the queue
+    - One event is fired per batch: calls queued before the handler runs
+      share it
+    - call() waits for the result (or re-raises); post() doesn't wait
+    - Calls made on the main thread, or without Fusion (app is None), run
+      inline
+    """
+    
+    EVENT_ID = "fusion_copilot_main_thread"
+    
+    def __init__(self, app, event_id: str = EVENT_ID):
+        self.app = app
+        self.event_id = event_id
+        self._main_thread = threading.get_ident()
+        self._lock = threading.Lock()
+        self._queue: List[_MainThreadCall] = []
+        self._scheduled = False
+        self._closed = False
+        self._event = None
+        self._handler = None
+        if app is not None:
+            self._register()
+    
+    def _register(self):
+        try:
+            import adsk.core
+        except ImportError:
+            return
+        
+        dispatcher = self
+        
+        class _Handler(adsk.core.CustomEventHandler):
+            def notify(self, args):
+                dispatcher.drain()
+        
+        try:
+            # A previous load of the add-in may have left the event registered
+            self.app.unregisterCustomEvent(self.event_id)
+        except Exception:
+            pass
+        try:
+            self._event = self.app.registerCustomEvent(self.event_id)
+            self._handler = _Handler()
+            self._event.add(self._handler)
+        except Exception:
+            self._event = None
+            self._handler = None
+    
+    @property
+    def on_main_thread(self) -> bool:
+        return threading.get_ident() == self._main_thread
+    
+    def call(self, fn: Callable, *args, cancel: Optional[CancelToken] = None):
+        """Run fn(*args) on the main thread and return its result"""
+        if self._event is None or self.on_main_thread:
+            return fn(*args)
+        
+        item = _MainThreadCall(fn, args)
+        self._enqueue(item)
+        while not item.done.wait(0.05):
+            if self._closed:
+                raise GenerationCancelled("shutting down")
+            if cancel is not None and cancel.is_set():
+                # Marked done, so the main thread skips it if it hasn't started yet
+                item.done.set()
+                cancel.raise_if_cancelled()
+        if item.error is not None:
+            raise item.error
+        return item.result
+    
+    def post(self, fn: Callable, *args):
+        """Queue fn(*args) for the main thread without waiting"""
+        if self._event is None or self.on_main_thread:
+            fn(*args)
+            return
+        self._enqueue(_MainThreadCall(fn, args))
+    
+    def _enqueue(self, item: _MainThreadCall):
+        with self._lock:
+            if self._closed:
+                raise GenerationCancelled("shutting down")
+            self._queue.append(item)
+            if self._scheduled:
+                return
+            self._scheduled = True
+        try:
+            self.app.fireCustomEvent(self.event_id, "")
+        except Exception:
+            with self._lock:
+                self._scheduled = False
+    
+    def drain(self):
+        """Run everything queued (main thread, from the custom event handler)"""
+        with self._lock:
+            items, self._queue = self._queue, []
+            self._scheduled = False
+        for item in items:
+            if item.done.is_set():
+                continue
+            try:
+                item.result = item.fn(*item.args)
+            except Exception as e:
+                item.error = e
+            finally:
+                item.done.set()
+    
+    def close(self):
+        """Unregister the custom event; pending and future calls fail"""
+        with self._lock:
+            self._closed = True
+            items, self._queue = self._queue, []
+        for item in items:
+            item.error = GenerationCancelled("shutting down")
+            item.done.set()
+        if self._event is not None:
+            try:
+                self._event.remove(self._handler)
+                self.app.unregisterCustomEvent(self.event_id)
+            except Exception:
+                pass
+            self._event = None
+
+
+class _Request:
+    __slots__ = ("request_id", "message", "force", "token")
+    
+    def __init__(self, request_id, message: str, force: bool = False):
+        self.request_id = request_id
+        self.message = message
+        self.force = force  # Regenerate instead of answering from the response cache
+        self.token = CancelToken()
+
+
+class GenerationPipeline:
+    """
+    Serves chat messages from the palette without blocking Fusion's UI.
+    
+    - Requests run one at a time on a worker thread; the orchestrator
+      marshals context capture (the only adsk access) to the main thread
+    - Submitting a new message supersedes the one in flight: it is
+      cancelled, and only the newest queued message runs next
+    - Stream events and the final result are posted to the palette on the
+      main thread, tagged with the request id so the panel can drop
+      anything from superseded requests
+    """
+    
+    def __init__(self, orchestrator, dispatcher: MainThreadDispatcher,
+                 send: Callable[[str, str], Any]):
+        self.orchestrator = orchestrator
+        self.dispatcher = dispatcher
+        self.send = send
+        self._condition = threading.Condition()
+        self._pending: Optional[_Request] = None
+        self._active: Optional[_Request] = None
+        self._closed = False
+        self._counter = 0
+        self._thread = threading.Thread(target=self._run, name="copilot-generation", daemon=True)
+        self._thread.start()
+    
+    def submit(self, message: str, request_id=None, force: bool = False):
+        """
+        Queue a message, superseding whatever is queued or running; returns
+        its request id. force bypasses the response cache.
+        """
+        with self._condition:
+            if self._closed:
+                return None
+            self._counter += 1
+            request = _Request(request_id if request_id is not None else self._counter, message, force)
+            for previous in (self._pending, self._active):
+                if previous is not None:
+                    previous.token.cancel("superseded")
+                    if previous is self._pending:
+                        self._post("generationCancelled", previous, {"reason": "superseded"})
+            self._pending = request
+            self._condition.notify()
+        return request.request_id
+    
+    def cancel(self, request_id=None) -> bool:
+        """Cancel a request (default: the running or queued one)"""
+        with self._condition:
+            for request in (self._active, self._pending):
+                if request is not None and request_id in (None, request.request_id):
+                    request.token.cancel("cancelled")
+                    if request is self._pending:
+                        self._pending = None
+                        self._post("generationCancelled", request, {"reason": "cancelled"})
+                    return True
+        return False
+    
+    @property
+    def busy(self) -> bool:
+        with self._condition:
+            return self._active is not None or self._pending is not None
+    
+    def close(self, timeout: float = 2.0):
+        """Cancel everything and stop the worker"""
+        with self._condition:
+            self._closed = True
+            for request in (self._active, self._pending):
+                if request is not None:
+                    request.token.cancel("shutting down")
+            self._pending = None
+            self._condition.notify()
+        self._thread.join(timeout)
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                request, self._pending = self._pending, None
+                self._active = request
+            try:
+                self._process(request)
+            finally:
+                with self._condition:
+                    self._active = None
+    
+    def _process(self, request: _Request):
+        token = request.token
+        
+        def on_event(event: Dict[str, Any]):
+            if not token.is_set():
+                self._post("streamEvent", request, event)
+        
+        result = self.orchestrator.stream_chat_message(request.message, on_event, cancel=token,
+                                                       force=request.force)
+        if token.is_set() or result.get("cancelled"):
+            self._post("generationCancelled", request, {"reason": token.reason or "cancelled"})
+        else:
+            self._post("generationResult", request, result)
+    
+    def _post(self, action: str, request: _Request, payload: Dict[str, Any]):
+        data = dict(payload, requestId=request.request_id)
+        try:
+            self.dispatcher.post(self.send, action, json.dumps(data))
+        except GenerationCancelled:
+            pass
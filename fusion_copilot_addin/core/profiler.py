@@ -0,0 +1,181 @@
+"""
+Profiler - Per-line and per-API-call timing of generated scripts
+"""
+
+import sys
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+
+def api_name(func) -> Optional[str]:
+    """
+    Display name of an adsk function called from a script, or None if it
+    isn't one. SWIG accessors such as Design__get_rootComponent become
+    Design.rootComponent.
+    """
+    module = getattr(func, "__module__", None) or ""
+    if "adsk" not in module and not module.startswith(("_core", "_fusion", "_cam")):
+        return None
+    name = getattr(func, "__qualname__", None) or getattr(func, "__name__", "?")
+    for marker in ("__get_", "__set_"):
+        if marker in name:
+            owner, _, member = name.partition(marker)
+            return f"{owner}.{member}" + (" =" if marker == "__set_" else "")
+    return name.replace("_", ".", 1) if "." not in name and "_" in name[1:] else name
+
+
+class ScriptProfiler:
+    """
+    Opt-in profiler for one script run:
+    - Line timing (sys.settrace): wall and CPU time between line events in
+      the script's own frames. A line includes the API calls it makes but
+      not nested script frames (functions, generator expressions), which
+      are timed on their own lines, so percentages add up to at most 100
+    - API call sites (sys.setprofile): wall and CPU time of every adsk call
+      made directly from a script line, keyed by (line, call)
+    
+    Nothing is installed unless the executor enables profiling, so normal
+    runs pay nothing.
+    """
+    
+    def __init__(self, filename: str, source: str = "", top_n: int = 10):
+        self.filename = filename
+        self.source_lines = source.splitlines()
+        self.top_n = top_n
+        self._lines: Dict[int, List[float]] = {}                  # line -> [hits, wall, cpu]
+        self._calls: Dict[Tuple[int, str], List[float]] = {}      # (line, call) -> [count, wall, cpu]
+        self._frames: Dict[Any, Tuple[int, Optional[float], Optional[float]]] = {}  # frame -> (line, wall start, cpu start)
+        self._stack: List[Tuple[Any, int, str, float, float]] = []
+        self._started = (0.0, 0.0)
+        self._elapsed = (0.0, 0.0)
+        self._previous_profile = None
+    
+    def __enter__(self):
+        self._started = (time.perf_counter(), time.thread_time())
+        # An ApiRecorder may be running; it resumes when the profiled run ends
+        self._previous_profile = sys.getprofile()
+        sys.setprofile(self._profile)
+        sys.settrace(self._trace)
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        sys.settrace(None)
+        sys.setprofile(self._previous_profile)
+        self._previous_profile = None
+        wall, cpu = time.perf_counter(), time.thread_time()
+        for frame in list(self._frames):
+            self._pause_line(frame, wall, cpu)
+        self._frames.clear()
+        self._elapsed = (wall - self._started[0], cpu - self._started[1])
+        return False
+    
+    # Line timing
+    
+    def _trace(self, frame, event, arg):
+        """Global trace: only the script's own frames get a local tracer"""
+        if frame.f_code.co_filename != self.filename:
+            return None
+        # The calling line stops its clock while a nested script frame runs
+        if frame.f_back is not None and frame.f_back in self._frames:
+            self._pause_line(frame.f_back, time.perf_counter(), time.thread_time())
+        return self._trace_line
+    
+    def _trace_line(self, frame, event, arg):
+        wall, cpu = time.perf_counter(), time.thread_time()
+        if event == "line":
+            self._pause_line(frame, wall, cpu)
+            line = frame.f_lineno
+            stats = self._lines.get(line)
+            if stats is None:
+                stats = self._lines[line] = [0, 0.0, 0.0]
+            stats[0] += 1
+            self._frames[frame] = (line, wall, cpu)
+        elif event == "return":
+            self._pause_line(frame, wall, cpu)
+            self._frames.pop(frame, None)
+            caller = frame.f_back
+            if caller is not None and caller in self._frames:
+                self._frames[caller] = (self._frames[caller][0], wall, cpu)
+        return self._trace_line
+    
+    def _pause_line(self, frame, wall: float, cpu: float):
+        """Add the time since the frame's current line (re)started to that line"""
+        line, wall_start, cpu_start = self._frames.get(frame, (0, None, None))
+        if wall_start is None:
+            return
+        stats = self._lines[line]
+        stats[1] += wall - wall_start
+        stats[2] += cpu - cpu_start
+        self._frames[frame] = (line, None, None)
+    
+    # API call sites
+    
+    def _profile(self, frame, event, arg):
+        if event == "c_call":
+            if frame.f_code.co_filename == self.filename:
+                name = api_name(arg)
+                if name is not None:
+                    self._stack.append((arg, frame.f_lineno, name, time.perf_counter(), time.thread_time()))
+        elif event == "call":
+            caller = frame.f_back
+            if caller is not None and caller.f_code.co_filename == self.filename \
+                    and str(frame.f_globals.get("__name__", "")).startswith("adsk"):
+                code = frame.f_code
+                name = getattr(code, "co_qualname", code.co_name)
+                self._stack.append((frame, caller.f_lineno, name, time.perf_counter(), time.thread_time()))
+        elif event in ("c_return", "c_exception", "return"):
+            key = arg if event != "return" else frame
+            if self._stack and self._stack[-1][0] is key:
+                _, line, name, wall_start, cpu_start = self._stack.pop()
+                stats = self._calls.get((line, name))
+                if stats is None:
+                    stats = self._calls[(line, name)] = [0, 0.0, 0.0]
+                stats[0] += 1
+                stats[1] += time.perf_counter() - wall_start
+                stats[2] += time.thread_time() - cpu_start
+    
+    # Report
+    
+    def report(self) -> Dict[str, Any]:
+        """
+        Top-N hotspots:
+            {
+                "wall_ms": float, "cpu_ms": float,
+                "lines": [{"line", "source", "hits", "wall_ms", "cpu_ms", "percent"}],
+                "calls": [{"line", "call", "count", "wall_ms", "cpu_ms", "per_call_ms"}],
+            }
+        """
+        total_wall = self._elapsed[0] or 1e-9
+        lines = sorted(self._lines.items(), key=lambda item: item[1][1], reverse=True)[:self.top_n]
+        calls = sorted(self._calls.items(), key=lambda item: item[1][1], reverse=True)[:self.top_n]
+        return {
+            "wall_ms": round(self._elapsed[0] * 1000, 3),
+            "cpu_ms": round(self._elapsed[1] * 1000, 3),
+            "lines": [
+                {
+                    "line": line,
+                    "source": self._source(line),
+                    "hits": int(hits),
+                    "wall_ms": round(wall * 1000, 3),
+                    "cpu_ms": round(cpu * 1000, 3),
+                    "percent": round(100.0 * wall / total_wall, 1),
+                }
+                for line, (hits, wall, cpu) in lines
+            ],
+            "calls": [
+                {
+                    "line": line,
+                    "call": name,
+                    "count": int(count),
+                    "wall_ms": round(wall * 1000, 3),
+                    "cpu_ms": round(cpu * 1000, 3),
+                    "per_call_ms": round(wall * 1000 / count, 4),
+                }
+                for (line, name), (count, wall, cpu) in calls
+            ],
+        }
+    
+    def _source(self, line: int) -> str:
+        if 0 < line <= len(self.source_lines):
+            return self.source_lines[line - 1].strip()[:120]
+        return ""
@@ -0,0 +1,129 @@
+"""
+Prompt Layout - Prefix-stable prompts for backend prompt caching
+"""
+
+import hashlib
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+from core.context_packer import estimate_tokens
+
+
+class StaticPrefix:
+    """
+    The part of every prompt that never changes between requests:
+    - System instructions and the output format spec
+    - Few-shot example turns
+    
+    It is compiled once (messages, flattened text, token estimate, digest) and
+    must not be modified afterwards, so the prefix sent to the backend is
+    byte-identical on every turn and the server's prompt/KV cache can reuse it.
+    """
+    
+    __slots__ = ("_messages", "text", "tokens", "digest")
+    
+    def __init__(self, system: str, examples: Sequence[Tuple[str, str]] = ()):
+        messages = [("system", system)]
+        text_parts = [system]
+        for request, response in examples:
+            messages.append(("user", request))
+            messages.append(("assistant", response))
+            text_parts.append(f"## Example Request:\n{request}\n\n## Example Response:\n{response}")
+        
+        self._messages: Tuple[Tuple[str, str], ...] = tuple(messages)
+        self.text = "\n\n".join(text_parts) + "\n\n"
+        self.tokens = estimate_tokens(self.text)
+        self.digest = hashlib.sha256(self.text.encode("utf-8")).hexdigest()[:16]
+    
+    def messages(self) -> List[Dict[str, str]]:
+        """Fresh copies of the prefix chat messages"""
+        return [{"role": role, "content": content} for role, content in self._messages]
+
+
+class ChatPrompt:
+    """
+    A prompt split into a static prefix and a volatile suffix (the live
+    context and the user request).
+    
+    Backends with chat roles send messages(); text-only backends send text().
+    Both put the prefix first, so only the suffix differs between turns.
+    """
+    
+    __slots__ = ("prefix", "suffix")
+    
+    def __init__(self, prefix: StaticPrefix, suffix: str):
+        self.prefix = prefix
+        self.suffix = suffix
+    
+    def messages(self) -> List[Dict[str, str]]:
+        """Chat messages: system, few-shot turns, then the volatile user turn"""
+        return self.prefix.messages() + [{"role": "user", "content": self.suffix}]
+    
+    def text(self) -> str:
+        """Single-string form for completion-style endpoints"""
+        return self.prefix.text + self.suffix
+    
+    @property
+    def tokens(self) -> int:
+        return self.prefix.tokens + estimate_tokens(self.suffix)
+    
+    def __str__(self) -> str:
+        return self.text()
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    """Length of the longest common prefix of two strings (binary search on slices)"""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class PrefixReuseTracker:
+    """
+    Measures how much of each prompt repeats the previous one.
+    
+    The estimate is what a prefix-caching server can skip re-evaluating:
+    the tokens of the longest common prefix with the last prompt sent.
+    """
+    
+    def __init__(self):
+        self._previous: Optional[str] = None
+        self._previous_digest: Optional[str] = None
+        self.turns = 0
+        self.prompt_tokens = 0
+        self.reused_tokens = 0
+        self.last: Dict[str, Any] = {}
+    
+    def record(self, prompt: ChatPrompt) -> Dict[str, Any]:
+        """Record a prompt about to be sent; returns the per-turn report"""
+        text = prompt.text()
+        shared = common_prefix_length(self._previous, text) if self._previous is not None else 0
+        reused = estimate_tokens(text[:shared]) if shared else 0
+        total = estimate_tokens(text)
+        
+        self.turns += 1
+        self.prompt_tokens += total
+        self.reused_tokens += reused
+        self.last = {
+            "prompt_tokens": total,
+            "prefix_tokens": prompt.prefix.tokens,
+            "reused_tokens": reused,
+            "prefix_stable": self._previous_digest in (None, prompt.prefix.digest),
+        }
+        self._previous = text
+        self._previous_digest = prompt.prefix.digest
+        return self.last
+    
+    def report(self) -> Dict[str, Any]:
+        """Totals across all recorded turns"""
+        return {
+            "turns": self.turns,
+            "prompt_tokens": self.prompt_tokens,
+            "reused_tokens": self.reused_tokens,
+            "reuse_ratio": self.reused_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+            "last": dict(self.last),
+        }
@@ -0,0 +1,251 @@
+"""
+Response Cache - Content-addressed cache of generation results
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+_UNIT_SPACING_RE = re.compile(r"(\d)\s+(mm|cm|m|in|ft|deg|rad)\b")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """
+    Normalise a user message so trivially different phrasings share a key:
+    case, whitespace, trailing punctuation and "2 mm" vs "2mm".
+    """
+    text = _WHITESPACE_RE.sub(" ", (message or "").strip().lower())
+    text = _UNIT_SPACING_RE.sub(r"\1\2", text)
+    return text.rstrip(" .!?")
+
+
+def context_fingerprint(context: Dict[str, Any]) -> str:
+    """
+    Stable hash of the parts of the captured context that affect generation.
+    Volatile details (file paths, save state, fingerprint memo order) are left out.
+    """
+    document = context.get("document") or {}
+    selection = context.get("selection") or {}
+    assembly = context.get("assembly") or {}
+    cam = context.get("cam") or {}
+    
+    relevant = {
+        "document": document.get("name"),
+        "root": document.get("root_component_name"),
+        "units": context.get("units"),
+        "workspace": context.get("workspace"),
+        "selection": [
+            entity.get("token") or [entity.get("type"), entity.get("index")]
+            for entity in selection.get("entities") or []
+        ],
+        "parameters": [
+            [p.get("name"), p.get("expression") or p.get("value")]
+            for p in context.get("parameters") or []
+        ],
+        "components": [c.get("name") for c in context.get("components") or []],
+        "assembly": [assembly.get("total_occurrences"), [i.get("path") for i in assembly.get("items") or []]],
+        "cam": [
+            [s.get("name"), s.get("operation_count"), s.get("invalid_toolpaths")]
+            for s in cam.get("setups") or []
+        ],
+    }
+    encoded = json.dumps(relevant, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(user_message: str, context: Dict[str, Any], backend: str = "",
+                   base_code: str = "") -> str:
+    """Cache key for a message against a design state, backend and (for edits) the script being edited"""
+    parts = [normalize_message(user_message), context_fingerprint(context), backend]
+    if base_code:
+        parts.append(hashlib.sha256(base_code.encode("utf-8")).hexdigest())
+    material = "\0".join(parts)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-level cache of generation results:
+    - In-memory LRU (max_entries)
+    - Optional on-disk store, one JSON file per key, trimmed oldest-first
+      when it grows past max_disk_bytes
+    
+    Entries older than ttl_seconds are treated as misses on both levels.
+    """
+    
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 86400,
+                 disk_dir: Optional[str] = None, max_disk_bytes: int = 50 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes: Optional[int] = None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+        if self.disk_dir:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+            except OSError:
+                self.disk_dir = None
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a result; returns a copy or None"""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, result = entry
+                if now - created <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return dict(result)
+                del self._memory[key]
+        
+        entry = self._read_disk(key, now)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, entry[0], entry[1])
+        return dict(entry[1])
+    
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a result in memory and on disk"""
+        created = time.time()
+        stored = dict(result)
+        with self._lock:
+            self._remember(key, created, stored)
+        self._write_disk(key, created, stored)
+    
+    def discard(self, key: str):
+        """Drop one entry from memory and disk"""
+        with self._lock:
+            self._memory.pop(key, None)
+            self._disk_bytes = None
+        if self.disk_dir:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+    
+    def clear(self):
+        """Drop every entry, including the disk store"""
+        with self._lock:
+            self._memory.clear()
+            self._disk_bytes = None
+        for path in self._disk_files():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._memory),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+    
+    def _remember(self, key: str, created: float, result: Dict[str, Any]):
+        """Insert into the memory LRU (lock held)"""
+        self._memory[key] = (created, result)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+    
+    def _read_disk(self, key: str, now: float) -> Optional[tuple]:
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            created = float(entry["created"])
+            if now - created > self.ttl_seconds:
+                os.remove(path)
+                return None
+            return created, entry["result"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def _write_disk(self, key: str, created: float, result: Dict[str, Any]):
+        if not self.disk_dir:
+            return
+        try:
+            data = json.dumps({"created": created, "result": result}).encode("utf-8")
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except (OSError, TypeError, ValueError):
+            return
+        
+        with self._lock:
+            if self._disk_bytes is not None:
+                self._disk_bytes += len(data)
+            over_budget = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._trim_disk()
+    
+    def _trim_disk(self):
+        """Delete the oldest files until the store fits max_disk_bytes"""
+        files = []
+        total = 0
+        for path in self._disk_files():
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        
+        files.sort()
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+            except OSError:
+                pass
+        
+        with self._lock:
+            self._disk_bytes = total
+    
+    def _disk_files(self):
+        if not self.disk_dir:
+            return []
+        try:
+            return [
+                os.path.join(self.disk_dir, name)
+                for name in os.listdir(self.disk_dir)
+                if name.endswith(".json")
+            ]
+        except OSError:
+            return []
@@ -0,0 +1,206 @@
+"""
+Selection Geometry - Batched geometric fingerprints for selected entities
+"""
+
+from typing import Dict, Any, List, Optional, Tuple
+
+
+# Decimal places kept for lengths/areas/vectors
+PRECISION = 4
+
+# Fusion's API reports geometry in internal units (cm, cm^2, cm^3)
+INTERNAL_UNITS = "cm"
+
+
+class SelectionFingerprinter:
+    """
+    Describes every selected entity in a single pass:
+    - Object type and entity token
+    - Bounding box
+    - Area (faces, bodies), length (edges), volume (bodies)
+    - Normal at a point on the face
+    - Owning body / component names
+    
+    Lengths, bounding boxes, areas and volumes are converted from Fusion's
+    internal cm to the document's length units (areas in units^2, volumes
+    in units^3); the units are reported with the selection.
+    
+    Fingerprints are memoised per entity token. Entities that stay selected
+    between messages are not queried again; the memo is cleared whenever the
+    design may have changed (see clear()).
+    """
+    
+    def __init__(self, max_entities: int = 200):
+        self.max_entities = max_entities
+        self._memo: Dict[str, Dict[str, Any]] = {}
+        self._units = INTERNAL_UNITS
+        self._scale = 1.0
+        self.hits = 0
+        self.misses = 0
+    
+    def clear(self):
+        """Forget all fingerprints (geometry may have changed)"""
+        self._memo = {}
+    
+    def capture(self, selection, units: str = INTERNAL_UNITS, units_manager=None) -> Dict[str, Any]:
+        """
+        Fingerprint an active selection set.
+        
+        Args:
+            selection: Active selection set
+            units: Length units to report geometry in (the document's units)
+            units_manager: The design's UnitsManager, used for the conversion
+        
+        Returns:
+            {
+                "count": int,
+                "entities": [fingerprint, ...],
+                "type_counts": {type_name: int},
+                "truncated": bool,
+                "units": str,
+            }
+        """
+        units, scale = self._length_scale(units, units_manager)
+        if (units, scale) != (self._units, self._scale):
+            # Memoised fingerprints hold values in the previous units
+            self._memo = {}
+            self._units, self._scale = units, scale
+        
+        count = selection.count if selection else 0
+        memo: Dict[str, Dict[str, Any]] = {}
+        entities = []
+        type_counts: Dict[str, int] = {}
+        
+        for i in range(count):
+            entity = selection.item(i)
+            # Selection items wrap the picked entity
+            entity = getattr(entity, "entity", entity)
+            type_name = type(entity).__name__
+            type_counts[type_name] = type_counts.get(type_name, 0) + 1
+            
+            if i >= self.max_entities:
+                continue
+            
+            token = self._entity_token(entity)
+            fingerprint = self._memo.get(token) if token else None
+            if fingerprint is None:
+                self.misses += 1
+                fingerprint = self._fingerprint(entity, type_name, token)
+            else:
+                self.hits += 1
+            if token:
+                memo[token] = fingerprint
+            
+            entities.append(dict(fingerprint, index=i))
+        
+        # Keep only entities that are still selected
+        self._memo = memo
+        return {
+            "count": count,
+            "entities": entities,
+            "type_counts": type_counts,
+            "truncated": count > self.max_entities,
+            "units": self._units,
+        }
+    
+    def _fingerprint(self, entity, type_name: str, token: Optional[str]) -> Dict[str, Any]:
+        """Query all geometric attributes of one entity"""
+        fingerprint: Dict[str, Any] = {"type": type_name}
+        if token:
+            fingerprint["token"] = token
+        
+        object_type = self._get(entity, "objectType")
+        if object_type:
+            fingerprint["object_type"] = object_type
+        
+        name = self._get(entity, "name")
+        if isinstance(name, str):
+            fingerprint["name"] = name
+        
+        bbox = self._bounding_box(entity)
+        if bbox:
+            fingerprint["bbox"] = bbox
+        
+        for attribute, power in (("area", 2), ("length", 1), ("volume", 3)):
+            value = self._get(entity, attribute)
+            if isinstance(value, (int, float)):
+                fingerprint[attribute] = round(value * self._scale ** power, PRECISION)
+        
+        if "area" in fingerprint and self._get(entity, "evaluator") is not None and "volume" not in fingerprint:
+            normal = self._face_normal(entity)
+            if normal:
+                fingerprint["normal"] = normal
+            geometry = self._get(entity, "geometry")
+            surface_type = self._get(geometry, "surfaceType") if geometry is not None else None
+            if surface_type is not None:
+                fingerprint["surface_type"] = surface_type
+        
+        if "length" in fingerprint:
+            geometry = self._get(entity, "geometry")
+            curve_type = self._get(geometry, "curveType") if geometry is not None else None
+            if curve_type is not None:
+                fingerprint["curve_type"] = curve_type
+        
+        body = self._get(entity, "body")
+        if body is not None:
+            body_name = self._get(body, "name")
+            if body_name:
+                fingerprint["body"] = body_name
+        
+        component = self._get(entity, "component")
+        if component is None and body is not None:
+            component = self._get(body, "parentComponent")
+        component_name = self._get(component, "name") if component is not None else None
+        if component_name:
+            fingerprint["component"] = component_name
+        
+        return fingerprint
+    
+    def _bounding_box(self, entity) -> Optional[List[List[float]]]:
+        """[[min x, y, z], [max x, y, z]]"""
+        bbox = self._get(entity, "boundingBox")
+        if bbox is None:
+            return None
+        try:
+            lo, hi = bbox.minPoint, bbox.maxPoint
+            return [
+                [round(v * self._scale, PRECISION) for v in (lo.x, lo.y, lo.z)],
+                [round(v * self._scale, PRECISION) for v in (hi.x, hi.y, hi.z)],
+            ]
+        except Exception:
+            return None
+    
+    def _face_normal(self, face) -> Optional[List[float]]:
+        """Normal at Fusion's representative point on the face"""
+        try:
+            ok, normal = face.evaluator.getNormalAtPoint(face.pointOnFace)
+            if not ok:
+                return None
+            return [round(normal.x, PRECISION), round(normal.y, PRECISION), round(normal.z, PRECISION)]
+        except Exception:
+            return None
+    
+    @staticmethod
+    def _length_scale(units: str, units_manager) -> Tuple[str, float]:
+        """(units, factor from cm to units); stays in cm if the conversion fails"""
+        if not units or units == INTERNAL_UNITS or units_manager is None:
+            return INTERNAL_UNITS, 1.0
+        try:
+            scale = float(units_manager.convert(1.0, INTERNAL_UNITS, units))
+        except Exception:
+            return INTERNAL_UNITS, 1.0
+        if not scale > 0:
+            return INTERNAL_UNITS, 1.0
+        return units, scale
+    
+    def _entity_token(self, entity) -> Optional[str]:
+        token = self._get(entity, "entityToken")
+        return token if isinstance(token, str) and token else None
+    
+    @staticmethod
+    def _get(obj, attribute: str):
+        """Read an attribute, treating API errors as missing"""
+        try:
+            return getattr(obj, attribute, None)
+        except Exception:
+            return None
@@ -0,0 +1,179 @@
+"""
+Context Snapshots - Versioned, event-invalidated cache for captured Fusion context
+"""
+
+import threading
+from typing import Dict, Any, List, Callable, Iterable, Optional
+
+
+# Event names delivered by context event sources
+SELECTION_CHANGED = "selection_changed"
+DOCUMENT_ACTIVATED = "document_activated"
+COMMAND_TERMINATED = "command_terminated"
+WORKSPACE_ACTIVATED = "workspace_activated"
+
+# Snapshot sections, in capture order
+SECTIONS = ("document", "units", "selection", "parameters", "components", "assembly", "cam", "workspace")
+
+# Which sections each event makes dirty
+EVENT_INVALIDATIONS = {
+    SELECTION_CHANGED: ("selection",),
+    DOCUMENT_ACTIVATED: SECTIONS,
+    COMMAND_TERMINATED: ("document", "units", "selection", "parameters", "components", "assembly", "cam"),
+    WORKSPACE_ACTIVATED: ("workspace", "cam"),
+}
+
+
+class SnapshotCache:
+    """
+    Holds one cached value per context section.
+    
+    Each section carries:
+    - A dirty flag (set by invalidation, cleared by rebuild)
+    - A version number (bumped on every rebuild)
+    
+    Cached values are shared between callers and must be treated as read-only.
+    """
+    
+    def __init__(self, sections: Iterable[str] = SECTIONS):
+        self._lock = threading.RLock()
+        self._values: Dict[str, Any] = {}
+        self._dirty: Dict[str, bool] = {}
+        self._versions: Dict[str, int] = {}
+        self.generation = 0
+        self.rebuilds = 0
+        
+        for section in sections:
+            self._dirty[section] = True
+            self._versions[section] = 0
+    
+    def get(self, section: str, builder: Callable[[], Any]) -> Any:
+        """Return the cached section value, rebuilding it only when dirty"""
+        with self._lock:
+            if not self._dirty.get(section, True) and section in self._values:
+                return self._values[section]
+            
+            value = builder()
+            self._values[section] = value
+            self._dirty[section] = False
+            self._versions[section] = self._versions.get(section, 0) + 1
+            self.rebuilds += 1
+            return value
+    
+    def invalidate(self, *sections: str):
+        """Mark the given sections dirty"""
+        with self._lock:
+            for section in sections:
+                self._dirty[section] = True
+            self.generation += 1
+    
+    def invalidate_all(self):
+        """Mark every section dirty"""
+        self.invalidate(*list(self._dirty.keys()))
+    
+    def is_dirty(self, section: str) -> bool:
+        """Check whether a section will be rebuilt on next access"""
+        with self._lock:
+            return self._dirty.get(section, True)
+    
+    def versions(self) -> Dict[str, int]:
+        """Get the current version number of every section"""
+        with self._lock:
+            return dict(self._versions)
+
+
+class ContextEventSource:
+    """
+    Delivers context invalidation events to subscribers.
+    
+    The base class is driven by hand through emit(), which is what tests and
+    offline tooling use. FusionEventSource wires the same events to Fusion.
+    """
+    
+    def __init__(self):
+        self._listeners: List[Callable[[str, Any], None]] = []
+    
+    def subscribe(self, callback: Callable[[str, Any], None]):
+        """Register a callback(event_name, args)"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+    
+    def unsubscribe(self, callback: Callable[[str, Any], None]):
+        """Remove a previously registered callback"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def emit(self, event_name: str, args: Any = None):
+        """Deliver an event to all subscribers"""
+        for callback in list(self._listeners):
+            try:
+                callback(event_name, args)
+            except Exception:
+                pass
+    
+    def start(self) -> bool:
+        """Begin delivering events. Returns False if events are unavailable."""
+        return True
+    
+    def stop(self):
+        """Stop delivering events"""
+        pass
+
+
+class FusionEventSource(ContextEventSource):
+    """
+    Event source backed by Fusion 360 application events:
+    - UserInterface.activeSelectionChanged
+    - Application.documentActivated
+    - UserInterface.commandTerminated
+    - UserInterface.workspaceActivated
+    """
+    
+    def __init__(self, app):
+        super().__init__()
+        self.app = app
+        self._connections = []
+    
+    def start(self) -> bool:
+        """Attach handlers to the Fusion events"""
+        try:
+            import adsk.core
+            
+            ui = self.app.userInterface
+            self._connect(ui.activeSelectionChanged, adsk.core.ActiveSelectionEventHandler, SELECTION_CHANGED)
+            self._connect(self.app.documentActivated, adsk.core.DocumentEventHandler, DOCUMENT_ACTIVATED)
+            self._connect(ui.commandTerminated, adsk.core.ApplicationCommandEventHandler, COMMAND_TERMINATED)
+            self._connect(ui.workspaceActivated, adsk.core.WorkspaceEventHandler, WORKSPACE_ACTIVATED)
+            return True
+        except Exception:
+            self.stop()
+            return False
+    
+    def stop(self):
+        """Detach all handlers"""
+        for event, handler in self._connections:
+            try:
+                event.remove(handler)
+            except Exception:
+                pass
+        self._connections = []
+    
+    def _connect(self, event, handler_base, event_name: str):
+        """Create a handler subclass for the event and keep it referenced"""
+        source = self
+        
+        class _Handler(handler_base):
+            def __init__(handler_self):
+                super().__init__()
+            
+            def notify(handler_self, args):
+                source.emit(event_name, args)
+        
+        handler = _Handler()
+        event.add(handler)
+        self._connections.append((event, handler))
+
+
+def sections_for_event(event_name: str) -> Optional[tuple]:
+    """Get the sections invalidated by an event, or None if it is unknown"""
+    return EVENT_INVALIDATIONS.get(event_name)
@@ -0,0 +1,154 @@
+"""
+Speculative Generation - Parallel candidates with first-valid-wins selection
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Callable, List, Optional, Sequence, Tuple
+
+from core.pipeline import CancelToken
+
+
+def check_candidate(code: str) -> List[str]:
+    """
+    Cheap static checks for a generated script.
+    
+    Returns:
+        List of problems (empty if the candidate looks runnable)
+    """
+    if not code or not code.strip():
+        return ["No code in response"]
+    try:
+        compile(code, "<candidate>", "exec")
+    except SyntaxError as e:
+        return [f"Syntax error on line {e.lineno}: {e.msg}"]
+    if "adsk" not in code and "app" not in code:
+        return ["Code doesn't use the Fusion API"]
+    return []
+
+
+class SpeculativeGenerator:
+    """
+    Requests several candidates concurrently and returns the first one that
+    passes the static checks.
+    
+    - Candidates are (backend, temperature) pairs; at most max_concurrent
+      requests are in flight, and queued candidates never start once a
+      winner is found
+    - Candidates are streamed, so losers are cancelled mid-response (their
+      connection is dropped) instead of running to completion
+    - If no candidate passes, the first completed one is returned together
+      with its problems
+    """
+    
+    def __init__(self, clients: Sequence[Any], parse: Callable[[str], Dict[str, Any]],
+                 temperatures: Sequence[Optional[float]] = (None,), candidates: int = 3,
+                 max_concurrent: int = 2, checker: Callable[[str], List[str]] = check_candidate):
+        self.parse = parse
+        self.checker = checker
+        self.max_concurrent = max(1, max_concurrent)
+        self.plan: List[Tuple[Any, Optional[float]]] = []
+        temperatures = list(temperatures) or [None]
+        for i in range(max(1, candidates)):
+            self.plan.append((clients[i % len(clients)], temperatures[i % len(temperatures)]))
+        self.last_report: Dict[str, Any] = {}
+    
+    def generate(self, prompt, parse: Optional[Callable[[str], Dict[str, Any]]] = None,
+                 cancel: Optional[CancelToken] = None) -> Dict[str, Any]:
+        """
+        Run the candidates and return the winning result.
+        
+        parse overrides the default parser; setting cancel stops all
+        candidates and raises GenerationCancelled.
+        """
+        parse = parse or self.parse
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        stop = threading.Event()
+        started = time.perf_counter()
+        completed: List[Dict[str, Any]] = []
+        errors: List[Exception] = []
+        winner: Optional[Dict[str, Any]] = None
+        
+        pool = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="candidate")
+        try:
+            futures = {
+                pool.submit(self._run_candidate, index, client, temperature, prompt, parse, stop): index
+                for index, (client, temperature) in enumerate(self.plan)
+            }
+            pending = set(futures)
+            while pending and winner is None:
+                done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+                if cancel is not None:
+                    cancel.raise_if_cancelled()
+                for future in done:
+                    try:
+                        candidate = future.result()
+                    except Exception as e:
+                        errors.append(e)
+                        continue
+                    if candidate is None:
+                        continue
+                    completed.append(candidate)
+                    if not candidate["problems"] and winner is None:
+                        winner = candidate
+        finally:
+            # Stop streams in flight and drop queued candidates without
+            # waiting for the losers to notice
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+        
+        chosen = winner or (completed[0] if completed else None)
+        self.last_report = {
+            "candidates": len(self.plan),
+            "completed": len(completed),
+            "failed": len(errors),
+            "winner": chosen["index"] if chosen else None,
+            "valid": winner is not None,
+            "elapsed": round(time.perf_counter() - started, 3),
+        }
+        if chosen is None:
+            raise errors[0] if errors else RuntimeError("No candidate completed")
+        
+        result = dict(chosen["result"])
+        result["error"] = None
+        result["candidate"] = {
+            "index": chosen["index"],
+            "backend": chosen["backend"],
+            "temperature": chosen["temperature"],
+            "elapsed": chosen["elapsed"],
+            "completed": len(completed),
+        }
+        if chosen["problems"]:
+            issues = "; ".join(chosen["problems"])
+            result["notes"] = f"{result.get('notes', '')}\nNo candidate passed the static checks: {issues}".strip()
+        return result
+    
+    def _run_candidate(self, index: int, client, temperature: Optional[float], prompt,
+                       parse: Callable[[str], Dict[str, Any]],
+                       stop: threading.Event) -> Optional[Dict[str, Any]]:
+        """Stream one candidate; returns None if stopped before it finished"""
+        if stop.is_set():
+            return None
+        started = time.perf_counter()
+        chunks = []
+        stream = client.stream(prompt, temperature=temperature)
+        try:
+            for chunk in stream:
+                if stop.is_set():
+                    return None
+                chunks.append(chunk)
+        finally:
+            # Closing an unfinished stream drops its connection
+            stream.close()
+        
+        result = parse("".join(chunks))
+        return {
+            "index": index,
+            "backend": getattr(client, "name", "unknown"),
+            "temperature": temperature,
+            "result": result,
+            "problems": self.checker(result.get("code", "")),
+            "elapsed": round(time.perf_counter() - started, 3),
+        }
@@ -0,0 +1,444 @@
+"""
+Template Engine - Indexed offline code templates filled from Fusion context
+"""
+
+import json
+import math
+import os
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+
+TEMPLATE_SUFFIX = ".tmpl"
+INDEX_FILE = ".index.json"
+INDEX_VERSION = 2
+
+# Weight of a term by the template field it came from; the single words of a
+# multi-word keyword ("mounting" of "mounting plate") count as keyword_words
+FIELD_WEIGHTS = {"keywords": 3.0, "keyword_words": 2.0, "title": 2.0, "examples": 1.0}
+
+# Numbers and units ("10", "mm", "10 mm") appear in most requests and say
+# little about which operation is wanted; they only break ties
+DIMENSION_WEIGHT = 0.1
+UNIT_WORDS = frozenset("mm cm m in ft deg".split())
+
+# Includes the generic verbs most requests start with ("make", "create", "add")
+STOPWORDS = frozenset(
+    "a add an and are as at be by can create for from i in into is it make me my of on or please "
+    "the this to up use with would you".split()
+)
+
+_HEADER_RE = re.compile(r"^#\s*([a-z_]+):\s?(.*)$")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_SLOT_RE = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+_NUMBER = r"(-?\d+(?:\.\d+)?)\s*(mm|cm|m|in|ft|deg|°)?(?![a-z0-9])"
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words without stopwords, with a plural 's' stripped"""
+    words = []
+    for word in _WORD_RE.findall(text.lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def is_dimension_term(term: str) -> bool:
+    """Whether an index term contains a number or a unit"""
+    return any(word in UNIT_WORDS or any(c.isdigit() for c in word) for word in term.split(" "))
+
+
+def index_terms(text: str) -> List[str]:
+    """Unigrams plus adjacent-word bigrams"""
+    words = tokenize(text)
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+class Slot:
+    """
+    A parameter slot in a template, declared in the header as
+    `# slot: name = default | words: a, b | param: P | ref: P | after: w | context: path`.
+    
+    Sources, in order of precedence:
+    - words:   a number next to one of the words in the message; for a
+               dimension, a number before the word needs a unit ("4 holes"
+               is a count, "5 mm hole" a size); "*" takes the first number
+               with a unit anywhere in the message
+    - after:   an identifier following one of the words ("called height")
+    - ref:     name of an existing user parameter (the code references it)
+    - param:   current expression of an existing user parameter
+    - context: dotted path into the captured context
+    - default
+    """
+    
+    __slots__ = ("name", "default", "words", "after", "ref", "param", "context")
+    
+    def __init__(self, name: str, default: str = "", words=(), after=(), ref=(), param=(), context=""):
+        self.name = name
+        self.default = default
+        self.words = tuple(words)
+        self.after = tuple(after)
+        self.ref = tuple(ref)
+        self.param = tuple(param)
+        self.context = context
+    
+    @classmethod
+    def parse(cls, spec: str) -> "Slot":
+        clauses = [c.strip() for c in spec.split("|")]
+        name, _, default = clauses[0].partition("=")
+        options: Dict[str, Any] = {}
+        for clause in clauses[1:]:
+            key, _, value = clause.partition(":")
+            key = key.strip()
+            if key == "context":
+                options[key] = value.strip()
+            elif key in ("words", "after", "ref", "param"):
+                options[key] = [v.strip() for v in value.split(",") if v.strip()]
+        return cls(name.strip(), default.strip(), **options)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {attr: getattr(self, attr) for attr in self.__slots__}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Slot":
+        return cls(**data)
+    
+    def fill(self, message: str, context: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Resolve the slot value.
+        
+        Returns:
+            (value, source) where source is "message", "parameter", "context" or "default"
+        """
+        for word in self.words:
+            value = self._number_near(message, word)
+            if value is not None:
+                return value, "message"
+        
+        for word in self.after:
+            match = re.search(rf"\b{re.escape(word)}\s+['\"]?([A-Za-z_][A-Za-z0-9_]*)", message, re.IGNORECASE)
+            if match:
+                return match.group(1), "message"
+        
+        parameters = {(p.get("name") or "").lower(): p for p in context.get("parameters") or []}
+        for name in self.ref:
+            param = parameters.get(name.lower())
+            if param:
+                return param["name"], "parameter"
+        for name in self.param:
+            param = parameters.get(name.lower())
+            if param and (param.get("expression") or param.get("value") is not None):
+                return str(param.get("expression") or param.get("value")), "parameter"
+        
+        if self.context:
+            value = self._lookup(context, self.context)
+            if value not in (None, ""):
+                return str(value), "context"
+        
+        return self.default, "default"
+    
+    def _number_near(self, message: str, word: str) -> Optional[str]:
+        """Number right after ("width 80 mm", "width of 80") or before ("80mm wide", "3 copies") a word"""
+        if word == "*":
+            for match in re.finditer(_NUMBER, message, re.IGNORECASE):
+                if match.group(2):
+                    return self._format_number(match)
+            return None
+        
+        word_re = re.escape(word)
+        after = rf"\b{word_re}\w*\s*(?:of|=|:|to|is)?\s*{_NUMBER}"
+        before = rf"{_NUMBER}\s*{word_re}"
+        # Counts read naturally with the number first ("3 copies") and take no unit
+        is_count = " " not in self.default
+        for pattern in ((before, after) if is_count else (after, before)):
+            for match in re.finditer(pattern, message, re.IGNORECASE):
+                if is_count and match.group(2):
+                    continue
+                if not is_count and pattern is before and not match.group(2):
+                    continue
+                return self._format_number(match)
+        return None
+    
+    def _format_number(self, match) -> str:
+        """Number and unit, using the default's unit when the message has none"""
+        number, unit = match.group(1), match.group(2)
+        if unit is None:
+            unit = self.default.partition(" ")[2]
+        if unit == "°":
+            unit = "deg"
+        return f"{number} {unit}" if unit else number
+    
+    @staticmethod
+    def _lookup(context: Dict[str, Any], path: str):
+        value: Any = context
+        for key in path.split("."):
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+
+class CodeTemplate:
+    """
+    One parameterised template file from the template library.
+    
+    File layout: `# key: value` header lines (title, keywords, example, step,
+    notes, slot), then the code with {{slot}} placeholders. Placeholders are
+    expected inside single-quoted string literals; values are escaped for that.
+    """
+    
+    __slots__ = ("id", "title", "keywords", "examples", "steps", "notes", "slots", "code")
+    
+    def __init__(self, id: str, title: str, keywords: List[str], examples: List[str],
+                 steps: List[str], notes: str, slots: List[Slot], code: str):
+        self.id = id
+        self.title = title
+        self.keywords = keywords
+        self.examples = examples
+        self.steps = steps
+        self.notes = notes
+        self.slots = slots
+        self.code = code
+    
+    @classmethod
+    def parse(cls, template_id: str, text: str) -> "CodeTemplate":
+        fields: Dict[str, Any] = {"title": template_id, "keywords": [], "example": [], "step": [], "notes": [], "slot": []}
+        lines = text.splitlines()
+        body_start = 0
+        for i, line in enumerate(lines):
+            match = _HEADER_RE.match(line)
+            if match is None or match.group(1) not in fields:
+                body_start = i
+                break
+            key, value = match.group(1), match.group(2).strip()
+            if key == "title":
+                fields["title"] = value
+            elif key == "keywords":
+                fields["keywords"].extend(k.strip() for k in value.split(",") if k.strip())
+            else:
+                fields[key].append(value)
+        else:
+            body_start = len(lines)
+        
+        code = "\n".join(lines[body_start:]).strip("\n") + "\n"
+        return cls(
+            template_id,
+            fields["title"],
+            fields["keywords"],
+            fields["example"],
+            fields["step"],
+            " ".join(fields["notes"]),
+            [Slot.parse(spec) for spec in fields["slot"]],
+            code,
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = {attr: getattr(self, attr) for attr in self.__slots__}
+        data["slots"] = [slot.to_dict() for slot in self.slots]
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CodeTemplate":
+        data = dict(data)
+        data["slots"] = [Slot.from_dict(slot) for slot in data["slots"]]
+        return cls(**data)
+    
+    def field_terms(self) -> Dict[str, List[str]]:
+        """Index terms per field"""
+        keywords, keyword_words = [], []
+        for keyword in self.keywords:
+            words = tokenize(keyword)
+            if len(words) == 1:
+                keywords.extend(words)
+            else:
+                keywords.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+                keyword_words.extend(words)
+        return {
+            "keywords": keywords,
+            "keyword_words": keyword_words,
+            "title": index_terms(self.title),
+            "examples": [term for example in self.examples for term in index_terms(example)],
+        }
+    
+    def render(self, message: str, context: Dict[str, Any]) -> Tuple[str, Dict[str, Dict[str, str]]]:
+        """
+        Fill the slots and substitute them into the code.
+        
+        Returns:
+            (code, {slot name: {"value": str, "source": str}})
+        """
+        values = {}
+        for slot in self.slots:
+            value, source = slot.fill(message, context)
+            values[slot.name] = {"value": value, "source": source}
+        
+        def substitute(match):
+            slot = values.get(match.group(1))
+            if slot is None:
+                return match.group(0)
+            return slot["value"].replace("\\", "\\\\").replace("'", "\\'")
+        
+        return _SLOT_RE.sub(substitute, self.code), values
+
+
+class TemplateEngine:
+    """
+    Offline code generation from a template library.
+    
+    - Templates are parsed once and an inverted index (term -> template
+      weights, over keyword/title/example unigrams and bigrams) is built at
+      startup, or loaded from the persisted index file when no template has
+      changed since it was written
+    - Numbers and units weigh DIMENSION_WEIGHT of other terms, so a
+      request is matched on what it asks for, not on its dimensions
+    - Matching only touches the postings of the message's terms, so it stays
+      well under a millisecond for libraries of hundreds of templates
+    - Slots are filled from the message and the captured Fusion context
+    """
+    
+    def __init__(self, template_dir: str, min_score: float = 4.0, persist_index: bool = True):
+        self.template_dir = template_dir
+        self.min_score = min_score
+        self.persist_index = persist_index
+        self.templates: List[CodeTemplate] = []
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self.index_loaded_from_disk = False
+        self.load()
+    
+    def load(self):
+        """Load templates and the index, rebuilding the index if templates changed"""
+        signature = self._signature()
+        if self.persist_index and self._load_index(signature):
+            self.index_loaded_from_disk = True
+            return
+        
+        self.index_loaded_from_disk = False
+        self.templates = []
+        for name, _, _ in signature:
+            try:
+                with open(os.path.join(self.template_dir, name), "r", encoding="utf-8") as f:
+                    self.templates.append(CodeTemplate.parse(name[:-len(TEMPLATE_SUFFIX)], f.read()))
+            except (OSError, UnicodeDecodeError):
+                continue
+        self._build_index()
+        if self.persist_index:
+            self._save_index(signature)
+    
+    def match(self, message: str, limit: int = 3) -> List[Tuple[CodeTemplate, float]]:
+        """Best-scoring templates for a message, highest first"""
+        scores: Dict[int, float] = {}
+        for term in set(index_terms(message)):
+            for template_index, weight in self._postings.get(term, {}).items():
+                scores[template_index] = scores.get(template_index, 0.0) + weight
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(self.templates[i], score) for i, score in ranked]
+    
+    def generate(self, message: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer a request from the best matching template.
+        
+        Returns the usual generation result (title, plan, code, notes, error)
+        plus "template", "score" and "slots".
+        """
+        matches = self.match(message)
+        if not matches or matches[0][1] < self.min_score:
+            available = ", ".join(t.title for t in self.templates) or "none"
+            return {
+                "title": "No matching template",
+                "plan": [],
+                "code": "",
+                "notes": f"Available offline templates: {available}",
+                "error": "No offline template matches this request",
+            }
+        
+        template, score = matches[0]
+        code, slots = template.render(message, context)
+        filled = ", ".join(f"{name} = {slot['value']} ({slot['source']})" for name, slot in slots.items())
+        notes = template.notes
+        if filled:
+            notes = f"{notes}\nValues used: {filled}".strip()
+        return {
+            "title": template.title,
+            "plan": list(template.steps),
+            "code": code,
+            "notes": notes,
+            "error": None,
+            "template": template.id,
+            "score": round(score, 3),
+            "slots": slots,
+        }
+    
+    def _build_index(self):
+        """Inverted index with idf-weighted field scores"""
+        term_fields: List[Dict[str, float]] = []
+        document_frequency: Dict[str, int] = {}
+        for template in self.templates:
+            weights: Dict[str, float] = {}
+            for field, terms in template.field_terms().items():
+                for term in terms:
+                    weights[term] = max(weights.get(term, 0.0), FIELD_WEIGHTS[field])
+            term_fields.append(weights)
+            for term in weights:
+                document_frequency[term] = document_frequency.get(term, 0) + 1
+        
+        count = len(self.templates)
+        postings: Dict[str, Dict[int, float]] = {}
+        for template_index, weights in enumerate(term_fields):
+            for term, weight in weights.items():
+                idf = math.log(1 + count / document_frequency[term])
+                # Bigrams are stronger evidence than single words
+                if " " in term:
+                    weight *= 1.5
+                if is_dimension_term(term):
+                    weight *= DIMENSION_WEIGHT
+                postings.setdefault(term, {})[template_index] = round(weight * idf, 4)
+        self._postings = postings
+    
+    def _signature(self) -> List[Tuple[str, int, int]]:
+        """(file name, mtime_ns, size) of every template file, sorted"""
+        entries = []
+        try:
+            with os.scandir(self.template_dir) as it:
+                for entry in it:
+                    if entry.name.endswith(TEMPLATE_SUFFIX) and not entry.name.startswith(("_", ".")) and entry.is_file():
+                        stat = entry.stat()
+                        entries.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            return []
+        return sorted(entries)
+    
+    def _index_path(self) -> str:
+        return os.path.join(self.template_dir, INDEX_FILE)
+    
+    def _load_index(self, signature: List[Tuple[str, int, int]]) -> bool:
+        try:
+            with open(self._index_path(), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != INDEX_VERSION or [tuple(s) for s in data["signature"]] != signature:
+                return False
+            self.templates = [CodeTemplate.from_dict(t) for t in data["templates"]]
+            self._postings = {
+                term: {int(i): weight for i, weight in postings.items()}
+                for term, postings in data["postings"].items()
+            }
+            return True
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+    
+    def _save_index(self, signature: List[Tuple[str, int, int]]):
+        data = {
+            "version": INDEX_VERSION,
+            "signature": signature,
+            "templates": [t.to_dict() for t in self.templates],
+            "postings": self._postings,
+        }
+        tmp_path = self._index_path() + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._index_path())
+        except OSError:
+            pass
@@ -0,0 +1,549 @@
+"""
+Validator - Static checks of generated code against the adsk symbol table
+"""
+
+import ast
+import difflib
+import json
+import os
+import re
+import time
+from typing import Dict, Any, List, Optional, Sequence, Set
+
+from core.api_index import ApiEntry, collect_entries, expand_sources, source_signature
+
+
+SYMBOL_TABLE_VERSION = 1
+API_MODULES = ("adsk.core", "adsk.fusion", "adsk.cam")
+# Functions of the adsk package itself
+ADSK_FUNCTIONS = {"doEvents", "terminate", "autoTerminate"}
+# Declared types too generic to check members against
+OPAQUE_TYPES = {"Base", "Product", "object", "Any"}
+
+UNSAFE_CALLS = {
+    "os.system": "Runs a shell command",
+    "os.remove": "Deletes files",
+    "shutil.rmtree": "Deletes directories",
+    "eval": "Evaluates arbitrary code",
+    "exec": "Executes arbitrary code",
+}
+BLOCKING_CALLS = {
+    "time.sleep": "Blocks Fusion's UI thread",
+    "input": "Waits for console input that never comes inside Fusion",
+}
+
+_PARAM_SPLIT_RE = re.compile(r",(?![^\[\(]*[\]\)])")
+
+
+def _type_name(annotation: str) -> Optional[str]:
+    """Class name from a declared type ("core.Point3D" -> Point3D); None for builtins"""
+    name = annotation.strip().strip("'\"").split("[")[0].split(".")[-1].strip()
+    if not name or name[0].islower() or name in OPAQUE_TYPES:
+        return None
+    return name
+
+
+def parse_member(kind: str, signature: str) -> list:
+    """
+    [kind, min args, max args (-1 = any), return type, [param types]] from an
+    ApiEntry signature such as "(a: T, b: U = ...) -> R" or ": T (read-only)".
+    """
+    if kind != "method":
+        declared = signature.replace("(read-only)", "").strip().lstrip(":").strip()
+        return [kind, 0, 0, _type_name(declared) if declared else None, []]
+    
+    params_text, _, returns = signature.partition("->")
+    params_text = params_text.strip()[1:-1].strip() if params_text.strip().startswith("(") else ""
+    minimum, maximum, types = 0, 0, []
+    for param in _PARAM_SPLIT_RE.split(params_text) if params_text else []:
+        param = param.strip()
+        if param.startswith("*"):
+            maximum = -1
+            continue
+        name, _, annotation = param.partition(":")
+        annotation, _, default = annotation.partition("=")
+        types.append(_type_name(annotation) if annotation else None)
+        if maximum != -1:
+            maximum += 1
+        if not default and "=" not in name:
+            minimum += 1
+    return ["method", minimum, maximum, _type_name(returns) if returns else None, types]
+
+
+class SymbolTable:
+    """
+    Classes of adsk.core / adsk.fusion / adsk.cam with their bases and members.
+    
+    A table built from Fusion's stub modules is complete, so unknown names
+    can be reported. One built from a partial JSON dump is not: it is only
+    used to check calls to members it knows.
+    """
+    
+    def __init__(self, classes: Dict[str, Dict[str, Any]], complete: bool):
+        self.classes = classes
+        self.complete = complete
+        self.modules: Dict[str, Set[str]] = {}
+        for name, info in classes.items():
+            self.modules.setdefault(info["module"], set()).add(name)
+        self._children: Dict[str, Set[str]] = {}
+        for name, info in classes.items():
+            for base in info["bases"]:
+                self._children.setdefault(base, set()).add(name)
+        self._reachable: Dict[str, Set[str]] = {}
+    
+    @classmethod
+    def from_entries(cls, entries: Sequence[ApiEntry], complete: bool) -> "SymbolTable":
+        classes: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            info = classes.setdefault(entry.class_name, {"module": entry.module, "bases": [], "members": {}})
+            if entry.kind == "class":
+                info["module"] = entry.module
+                bases = entry.signature.strip("()")
+                info["bases"] = [b.strip() for b in bases.split(",") if b.strip()]
+            else:
+                info["members"][entry.member] = parse_member(entry.kind, entry.signature)
+        return cls(classes, complete)
+    
+    def member(self, class_name: str, name: str) -> Optional[list]:
+        """Member info, looked up through the base classes"""
+        seen = set()
+        stack = [class_name]
+        while stack:
+            current = stack.pop()
+            if current in seen or current not in self.classes:
+                continue
+            seen.add(current)
+            info = self.classes[current]
+            if name in info["members"]:
+                return info["members"][name]
+            stack.extend(info["bases"])
+        return None
+    
+    def reachable_members(self, class_name: str) -> Set[str]:
+        """
+        Members of a class, its bases and all its subclasses. The API returns
+        concrete subclasses, so these are all valid on a value declared as
+        class_name.
+        """
+        if class_name in self._reachable:
+            return self._reachable[class_name]
+        family = set()
+        stack = [class_name]
+        while stack:
+            current = stack.pop()
+            if current in family:
+                continue
+            family.add(current)
+            stack.extend(self._children.get(current, ()))
+        members = set()
+        for current in family:
+            stack = [current]
+            while stack:
+                name = stack.pop()
+                info = self.classes.get(name)
+                if info is None:
+                    continue
+                members.update(info["members"])
+                stack.extend(info["bases"])
+        self._reachable[class_name] = members
+        return members
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {"complete": self.complete, "classes": self.classes}
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SymbolTable":
+        return cls(data["classes"], data["complete"])
+
+
+def load_symbol_table(sources: Sequence[str], path: str) -> Optional[SymbolTable]:
+    """
+    Load the symbol table cached at path, rebuilding it if the sources
+    changed. Only stub sources (.py) make a complete table.
+    """
+    files = expand_sources(sources)
+    if not files:
+        return None
+    signature = source_signature(sources).decode("ascii")
+    
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == SYMBOL_TABLE_VERSION and data.get("signature") == signature:
+            return SymbolTable.from_dict(data)
+    except (OSError, ValueError, KeyError):
+        pass
+    
+    complete = all(not name.endswith(".json") for name in files)
+    table = SymbolTable.from_entries(collect_entries(sources), complete)
+    data = dict(table.to_dict(), version=SYMBOL_TABLE_VERSION, signature=signature)
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+    return table
+
+
+class CodeValidator:
+    """
+    Pre-execution checks for generated scripts:
+    - Syntax errors
+    - Unknown adsk classes and members (complete symbol tables only)
+    - Wrong number of arguments to known API methods
+    - Numbers/strings passed where the API expects a ValueInput
+    - Constructing API classes directly instead of via create()/add()
+    - Blocking or unsafe calls (time.sleep, input, os.system, subprocess)
+    
+    Types are tracked through assignments from the executor globals (app,
+    design, doc), imports and declared return/property types. Anything the
+    validator can't resolve is left alone, so it only reports what it can
+    prove.
+    """
+    
+    def __init__(self, symbols: Optional[SymbolTable]):
+        self.symbols = symbols
+    
+    def validate(self, code: str) -> Dict[str, Any]:
+        """
+        Returns:
+            {
+                "valid": bool,          # no error-severity issues
+                "issues": [{"line", "col", "severity", "code", "message"}],
+                "elapsed_ms": float,
+            }
+        """
+        started = time.perf_counter()
+        self._issues: List[Dict[str, Any]] = []
+        try:
+            tree = ast.parse(code or "")
+        except SyntaxError as e:
+            self._report(e, "error", "syntax", f"Syntax error: {e.msg}", line=e.lineno or 0, col=e.offset or 0)
+        else:
+            self._visit_block(tree.body, self._initial_env())
+        
+        issues = sorted(self._issues, key=lambda issue: (issue["line"], issue["col"]))
+        return {
+            "valid": not any(issue["severity"] == "error" for issue in issues),
+            "issues": issues,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+        }
+    
+    def _initial_env(self) -> Dict[str, Any]:
+        """Names the executor puts in the script's globals"""
+        return {
+            "adsk": ("module", "adsk"),
+            "app": ("instance", "Application"),
+            "doc": ("instance", "Document"),
+            "design": ("instance", "Design"),
+        }
+    
+    # Statements
+    
+    def _visit_block(self, body: List[ast.stmt], env: Dict[str, Any]):
+        for stmt in body:
+            self._visit_stmt(stmt, env)
+    
+    def _visit_stmt(self, stmt: ast.stmt, env: Dict[str, Any]):
+        if isinstance(stmt, ast.Import):
+            for alias in stmt.names:
+                self._bind_import(alias.name, alias.asname, env, stmt)
+        elif isinstance(stmt, ast.ImportFrom):
+            module = stmt.module or ""
+            for alias in stmt.names:
+                self._bind_from_import(module, alias.name, alias.asname or alias.name, env, stmt)
+        elif isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            for decorator in stmt.decorator_list:
+                self._infer(decorator, env)
+            local = dict(env)
+            for arg in self._arguments(stmt.args):
+                local[arg] = None
+            env[stmt.name] = None
+            self._visit_block(stmt.body, local)
+        elif isinstance(stmt, ast.ClassDef):
+            env[stmt.name] = None
+            self._visit_block(stmt.body, dict(env))
+        elif isinstance(stmt, ast.Assign):
+            value = self._infer(stmt.value, env)
+            for target in stmt.targets:
+                self._bind(target, value, env)
+                if isinstance(target, ast.Attribute):
+                    self._check_value_input_assignment(target, stmt.value, env)
+        elif isinstance(stmt, ast.AnnAssign):
+            value = self._infer(stmt.value, env) if stmt.value is not None else None
+            self._bind(stmt.target, value, env)
+        elif isinstance(stmt, ast.AugAssign):
+            self._infer(stmt.value, env)
+            self._infer(stmt.target, env)
+        elif isinstance(stmt, (ast.For, ast.AsyncFor)):
+            self._infer(stmt.iter, env)
+            self._bind(stmt.target, None, env)
+            self._visit_block(stmt.body, env)
+            self._visit_block(stmt.orelse, env)
+        elif isinstance(stmt, ast.While):
+            self._infer(stmt.test, env)
+            if isinstance(stmt.test, ast.Constant) and stmt.test.value and not self._has_break(stmt.body):
+                self._report(stmt, "warning", "infinite-loop", "while True loop without break will hang Fusion")
+            self._visit_block(stmt.body, env)
+            self._visit_block(stmt.orelse, env)
+        elif isinstance(stmt, (ast.With, ast.AsyncWith)):
+            for item in stmt.items:
+                self._infer(item.context_expr, env)
+                if item.optional_vars is not None:
+                    self._bind(item.optional_vars, None, env)
+            self._visit_block(stmt.body, env)
+        elif isinstance(stmt, ast.Try):
+            self._visit_block(stmt.body, env)
+            for handler in stmt.handlers:
+                if handler.type is not None:
+                    self._infer(handler.type, env)
+                if handler.name:
+                    env[handler.name] = None
+                self._visit_block(handler.body, env)
+            self._visit_block(stmt.orelse, env)
+            self._visit_block(stmt.finalbody, env)
+        elif isinstance(stmt, ast.If):
+            self._infer(stmt.test, env)
+            self._visit_block(stmt.body, env)
+            self._visit_block(stmt.orelse, env)
+        else:
+            for child in ast.iter_child_nodes(stmt):
+                if isinstance(child, ast.expr):
+                    self._infer(child, env)
+                elif isinstance(child, ast.stmt):
+                    self._visit_stmt(child, env)
+    
+    def _bind_import(self, name: str, asname: Optional[str], env: Dict[str, Any], node: ast.AST):
+        if name == "subprocess" or name.startswith("subprocess."):
+            self._report(node, "warning", "unsafe-call", "subprocess can run arbitrary programs")
+        if asname:
+            env[asname] = self._module_ref(name, node)
+        else:
+            root = name.split(".")[0]
+            env[root] = self._module_ref(root, node)
+            if name != root:
+                self._module_ref(name, node)
+    
+    def _bind_from_import(self, module: str, name: str, bound: str, env: Dict[str, Any], node: ast.AST):
+        if module == "subprocess":
+            self._report(node, "warning", "unsafe-call", "subprocess can run arbitrary programs")
+        if module == "adsk":
+            env[bound] = self._module_ref(f"adsk.{name}", node)
+        elif module in API_MODULES:
+            env[bound] = self._class_ref(module, name, node)
+        else:
+            env[bound] = ("py", f"{module}.{name}")
+    
+    def _module_ref(self, name: str, node: ast.AST):
+        if name == "adsk" or name in API_MODULES:
+            return ("module", name)
+        if name.startswith("adsk.") and self.symbols and self.symbols.complete:
+            self._report(node, "error", "unknown-module", f"Unknown API module '{name}'")
+            return None
+        return ("py", name)
+    
+    def _class_ref(self, module: str, name: str, node: ast.AST):
+        symbols = self.symbols
+        if symbols and name in symbols.modules.get(module, ()):
+            return ("class", name)
+        if symbols and symbols.complete and module in symbols.modules:
+            self._unknown(node, module, name, symbols.modules[module], "unknown-class")
+        return None
+    
+    def _bind(self, target: ast.expr, value, env: Dict[str, Any]):
+        if isinstance(target, ast.Name):
+            env[target.id] = value
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            for element in target.elts:
+                self._bind(element.value if isinstance(element, ast.Starred) else element, None, env)
+        elif isinstance(target, ast.Attribute):
+            self._infer(target, env)
+        elif isinstance(target, ast.Subscript):
+            self._infer(target.value, env)
+            self._infer(target.slice, env)
+    
+    # Expressions
+    
+    def _infer(self, node: Optional[ast.expr], env: Dict[str, Any]):
+        """Type of an expression (None if unknown), reporting problems on the way"""
+        if node is None:
+            return None
+        if isinstance(node, ast.Name):
+            return env.get(node.id)
+        if isinstance(node, ast.Attribute):
+            return self._attribute(node, env)
+        if isinstance(node, ast.Call):
+            return self._call(node, env)
+        if isinstance(node, (ast.ListComp, ast.SetComp, ast.GeneratorExp, ast.DictComp)):
+            local = dict(env)
+            for generator in node.generators:
+                self._infer(generator.iter, local)
+                self._bind(generator.target, None, local)
+                for condition in generator.ifs:
+                    self._infer(condition, local)
+            for child in ("elt", "key", "value"):
+                self._infer(getattr(node, child, None), local)
+            return None
+        if isinstance(node, ast.Lambda):
+            local = dict(env)
+            for arg in self._arguments(node.args):
+                local[arg] = None
+            self._infer(node.body, local)
+            return None
+        if isinstance(node, ast.NamedExpr):
+            value = self._infer(node.value, env)
+            env[node.target.id] = value
+            return value
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, ast.expr):
+                self._infer(child, env)
+        return None
+    
+    def _attribute(self, node: ast.Attribute, env: Dict[str, Any]):
+        base = self._infer(node.value, env)
+        if base is None:
+            return None
+        kind, name = base[0], base[1]
+        symbols = self.symbols
+        
+        if kind == "py":
+            return ("py", f"{name}.{node.attr}")
+        if kind == "module":
+            qualified = f"{name}.{node.attr}"
+            if qualified in API_MODULES:
+                return ("module", qualified)
+            if name == "adsk":
+                if node.attr not in ADSK_FUNCTIONS and symbols and symbols.complete:
+                    self._report(node, "error", "unknown-module", f"Unknown API module '{qualified}'")
+                return None
+            return self._class_ref(name, node.attr, node)
+        if symbols is None or kind not in ("class", "instance"):
+            return None
+        
+        member = symbols.member(name, node.attr)
+        if member is None:
+            if symbols.complete and name in symbols.classes and node.attr not in symbols.reachable_members(name):
+                self._unknown(node, name, node.attr, symbols.reachable_members(name), "unknown-member")
+            return None
+        if member[0] == "method":
+            return ("method", name, node.attr, member)
+        if member[0] == "property" and kind == "instance" and member[3]:
+            return ("instance", member[3])
+        return None
+    
+    def _call(self, node: ast.Call, env: Dict[str, Any]):
+        func = self._infer(node.func, env)
+        for arg in node.args:
+            self._infer(arg.value if isinstance(arg, ast.Starred) else arg, env)
+        for keyword in node.keywords:
+            self._infer(keyword.value, env)
+        
+        if func is None:
+            if isinstance(node.func, ast.Name) and node.func.id not in env:
+                self._check_builtin_call(node.func.id, node)
+            return None
+        if func[0] == "py":
+            self._check_builtin_call(func[1], node)
+            return None
+        if func[0] == "class":
+            self._report(node, "error", "direct-construction",
+                         f"{func[1]} can't be constructed directly; use its create()/add() or createInput() API")
+            return None
+        if func[0] != "method":
+            return None
+        
+        _, owner, method, member = func
+        _, minimum, maximum, returns, types = member
+        self._check_arity(node, f"{owner}.{method}", minimum, maximum)
+        for i, arg in enumerate(node.args):
+            if i < len(types) and types[i] == "ValueInput" and self._is_plain_literal(arg):
+                self._report(arg, "error", "value-input",
+                             f"{owner}.{method} expects a ValueInput for argument {i + 1}; "
+                             f"wrap it with adsk.core.ValueInput.{self._value_input_factory(arg)}()")
+        return ("instance", returns) if returns else None
+    
+    def _check_value_input_assignment(self, target: ast.Attribute, value: ast.expr, env: Dict[str, Any]):
+        """shellInput.insideThickness = 2 instead of a ValueInput"""
+        if not self._is_plain_literal(value) or self.symbols is None:
+            return
+        owner = self._infer(target.value, env)
+        if owner is None or owner[0] != "instance":
+            return
+        member = self.symbols.member(owner[1], target.attr)
+        if member is not None and member[0] == "property" and member[3] == "ValueInput":
+            self._report(value, "error", "value-input",
+                         f"{owner[1]}.{target.attr} expects a ValueInput; "
+                         f"wrap it with adsk.core.ValueInput.{self._value_input_factory(value)}()")
+    
+    def _check_arity(self, node: ast.Call, name: str, minimum: int, maximum: int):
+        if any(isinstance(arg, ast.Starred) for arg in node.args) or any(k.arg is None for k in node.keywords):
+            return
+        given = len(node.args) + len(node.keywords)
+        if given < minimum or (maximum >= 0 and given > maximum):
+            expected = str(minimum) if minimum == maximum else (
+                f"{minimum}+" if maximum < 0 else f"{minimum}-{maximum}")
+            self._report(node, "error", "arity", f"{name}() takes {expected} argument(s), {given} given")
+    
+    def _check_builtin_call(self, name: str, node: ast.Call):
+        if name in BLOCKING_CALLS:
+            self._report(node, "warning", "blocking-call", f"{name}(): {BLOCKING_CALLS[name]}")
+        elif name in UNSAFE_CALLS:
+            self._report(node, "warning", "unsafe-call", f"{name}(): {UNSAFE_CALLS[name]}")
+    
+    # Helpers
+    
+    def _unknown(self, node: ast.AST, owner: str, name: str, candidates, code: str):
+        message = f"{owner} has no attribute '{name}'"
+        close = difflib.get_close_matches(name, list(candidates), n=1)
+        if close:
+            message += f" (did you mean '{close[0]}'?)"
+        self._report(node, "error", code, message)
+    
+    def _report(self, node, severity: str, code: str, message: str,
+                line: Optional[int] = None, col: Optional[int] = None):
+        self._issues.append({
+            "line": line if line is not None else getattr(node, "lineno", 0),
+            "col": col if col is not None else getattr(node, "col_offset", 0),
+            "severity": severity,
+            "code": code,
+            "message": message,
+        })
+    
+    @staticmethod
+    def _is_plain_literal(node: ast.expr) -> bool:
+        """A number or string literal (including negative numbers)"""
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            node = node.operand
+        return isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str)) \
+            and not isinstance(node.value, bool)
+    
+    @staticmethod
+    def _value_input_factory(node: ast.expr) -> str:
+        is_string = isinstance(node, ast.Constant) and isinstance(node.value, str)
+        return "createByString" if is_string else "createByReal"
+    
+    @staticmethod
+    def _arguments(args: ast.arguments) -> List[str]:
+        names = [a.arg for a in args.posonlyargs + args.args + args.kwonlyargs]
+        if args.vararg:
+            names.append(args.vararg.arg)
+        if args.kwarg:
+            names.append(args.kwarg.arg)
+        return names
+    
+    @staticmethod
+    def _has_break(body: List[ast.stmt]) -> bool:
+        """break/return in the loop body (not inside nested loops or functions)"""
+        stack = list(body)
+        while stack:
+            node = stack.pop()
+            if isinstance(node, (ast.Break, ast.Return)):
+                return True
+            if isinstance(node, (ast.For, ast.While, ast.AsyncFor, ast.FunctionDef,
+                                 ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+                continue
+            stack.extend(ast.iter_child_nodes(node))
+        return False
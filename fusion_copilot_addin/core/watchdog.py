@@ -0,0 +1,135 @@
+"""
+Watchdog - Enforces the execution timeout of generated scripts
+"""
+
+import sys
+import threading
+from typing import Optional
+
+try:
+    import ctypes
+    _set_async_exc = ctypes.pythonapi.PyThreadState_SetAsyncExc
+except (ImportError, AttributeError):
+    _set_async_exc = None
+
+
+class ExecutionTimeout(BaseException):
+    """
+    Raised inside a script that ran past its deadline. A BaseException, like
+    KeyboardInterrupt, so generated `except Exception:` blocks don't swallow it.
+    """
+
+
+def _flush():
+    """A call the interpreter can deliver a pending interrupt on"""
+
+
+class Watchdog:
+    """
+    Interrupts a script that runs longer than its timeout:
+    - "interrupt" mode: a timer thread asks the interpreter to raise
+      ExecutionTimeout in the executing thread; it is delivered at the
+      interpreter's next periodic check, so normal runs pay only for
+      starting the timer
+    - "trace" mode: a line tracer on the script's own frames checks a flag
+      set by the timer and raises on the next script line. Used when
+      interrupts aren't available; costs a call per executed line
+    - CPython drops a tracer that raises, so if the script swallows the
+      timeout (bare except), it is raised again as an interrupt every
+      recheck seconds until the script gives up
+    - Code blocked inside a single API call is interrupted when that call
+      returns
+    """
+    
+    def __init__(self, timeout: float, filename: str, mode: str = "interrupt", recheck: float = 1.0):
+        self.timeout = timeout
+        self.filename = filename
+        self.mode = "trace" if mode == "trace" or _set_async_exc is None else "interrupt"
+        self.recheck = recheck
+        self.expired = False
+        self._thread_id: Optional[int] = None
+        self._done = False
+        self._lock = threading.Lock()
+        # Held while the script runs; releasing it wakes the timer. A plain
+        # lock because an interrupt can't leave it half-updated, unlike an Event
+        self._gate = threading.Lock()
+        self._timer: Optional[threading.Thread] = None
+        self._tracing = False
+    
+    def __enter__(self):
+        if not self.timeout or self.timeout <= 0:
+            return self
+        self._thread_id = threading.get_ident()
+        if self.mode == "trace":
+            if sys.gettrace() is None:
+                sys.settrace(self._trace)
+                self._tracing = True
+            elif _set_async_exc is not None:
+                # Someone else (profiler, debugger) owns the tracer
+                self.mode = "interrupt"
+            else:
+                return self
+        self._gate.acquire()
+        self._timer = threading.Thread(target=self._run, name="copilot-watchdog", daemon=True)
+        self._timer.start()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        # An interrupt raised just before the timer stopped can still be
+        # pending; keep going until one lands here or none is left
+        while True:
+            try:
+                self._stop()
+                _flush()
+                break
+            except ExecutionTimeout:
+                continue
+        return False
+    
+    def _stop(self):
+        if self._timer is None:
+            return
+        with self._lock:
+            if not self._done:
+                self._done = True
+                self._gate.release()
+        if self._tracing:
+            sys.settrace(None)
+            self._tracing = False
+    
+    def _run(self):
+        if self._gate.acquire(timeout=self.timeout):
+            return
+        self.expired = True
+        # In trace mode the tracer strikes first; interrupts follow only if it was swallowed
+        strike = self.mode == "interrupt"
+        while True:
+            with self._lock:
+                if self._done:
+                    return
+                if strike and _set_async_exc is not None:
+                    _set_async_exc(ctypes.c_ulong(self._thread_id), ctypes.py_object(ExecutionTimeout))
+            strike = True
+            if self._gate.acquire(timeout=self.recheck):
+                return
+    
+    # Trace mode
+    
+    def _trace(self, frame, event, arg):
+        if frame.f_code.co_filename != self.filename:
+            return None
+        return self._check
+    
+    def _check(self, frame, event, arg):
+        if self.expired and event == "line":
+            raise ExecutionTimeout()
+        return self._check
+    
+    def stopped_at(self, tb) -> Optional[int]:
+        """Script line the timeout interrupted, from the exception's traceback"""
+        line = None
+        while tb is not None:
+            if tb.tb_frame.f_code.co_filename == self.filename:
+                line = tb.tb_lineno
+            tb = tb.tb_next
+        return line
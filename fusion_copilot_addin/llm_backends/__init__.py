@@ -0,0 +1,25 @@
+"""LLM backends for code generation"""
+
+from typing import Optional
+
+from llm_backends.base import LLMBackend
+from llm_backends.http_pool import LLMError
+
+
+def create_backend(name: Optional[str] = None) -> Optional[LLMBackend]:
+    """
+    Create the backend configured in MODEL_CONFIG.
+    Returns None for backends that don't talk to a model server.
+    """
+    from config import MODEL_CONFIG
+    
+    name = name or MODEL_CONFIG.get("default_backend", "openai")
+    settings = MODEL_CONFIG.get(name, {})
+    
+    if name == "openai":
+        from llm_backends.openai_backend import OpenAIBackend
+        return OpenAIBackend(settings)
+    if name == "local":
+        from llm_backends.local_backend import LocalBackend
+        return LocalBackend(settings)
+    return None
@@ -0,0 +1,78 @@
+"""
+LLM Backend - Common interface for model servers
+"""
+
+from typing import Dict, Any, Iterator, List, Optional
+
+from llm_backends.http_pool import HTTPConnectionPool, RetryPolicy
+
+
+class LLMBackend:
+    """
+    Base class for HTTP model backends.
+    
+    Each backend owns one keep-alive connection pool, so repeated chat turns
+    reuse the same TCP/TLS connection. Settings come from the backend's
+    MODEL_CONFIG entry.
+    
+    Prompts are either plain strings or ChatPrompt objects (static prefix +
+    volatile suffix, see core.prompt_layout). Backends that understand chat
+    roles send the prompt as messages; others send its flattened text.
+    """
+    
+    name = "base"
+    
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.model = settings.get("model")
+        self.temperature = settings.get("temperature", 0.7)
+        self.max_tokens = settings.get("max_tokens", 2048)
+        self.timeout = settings.get("timeout_seconds", 60)
+        # Token usage of the last completed request, as reported by the server
+        self.last_usage: Optional[Dict[str, Any]] = None
+        self.pool = HTTPConnectionPool(
+            settings["api_endpoint"],
+            max_connections=settings.get("max_connections", 4),
+            connect_timeout=settings.get("connect_timeout_seconds", 5),
+            read_timeout=self.timeout,
+            retry=RetryPolicy(
+                max_retries=settings.get("max_retries", 3),
+                base_delay=settings.get("retry_base_delay", 0.5),
+                max_delay=settings.get("retry_max_delay", 8.0),
+            ),
+        )
+    
+    def generate(self, prompt, temperature: Optional[float] = None,
+                 max_tokens: Optional[int] = None) -> str:
+        """Send a prompt and return the completion text"""
+        raise NotImplementedError
+    
+    def stream(self, prompt, temperature: Optional[float] = None,
+               max_tokens: Optional[int] = None) -> Iterator[str]:
+        """
+        Yield the completion text in pieces as the server produces them.
+        Backends without streaming support yield the whole completion once.
+        """
+        yield self.generate(prompt, temperature, max_tokens)
+    
+    def close(self):
+        """Release pooled connections"""
+        self.pool.close()
+    
+    @staticmethod
+    def _as_messages(prompt) -> List[Dict[str, str]]:
+        """Chat messages for a prompt (a plain string becomes one user message)"""
+        if isinstance(prompt, str):
+            return [{"role": "user", "content": prompt}]
+        return prompt.messages()
+    
+    @staticmethod
+    def _as_text(prompt) -> str:
+        """Single-string form of a prompt"""
+        return prompt if isinstance(prompt, str) else prompt.text()
+    
+    def _temperature(self, temperature: Optional[float]) -> float:
+        return self.temperature if temperature is None else temperature
+    
+    def _max_tokens(self, max_tokens: Optional[int]) -> int:
+        return self.max_tokens if max_tokens is None else max_tokens
@@ -0,0 +1,328 @@
+"""
+HTTP Pool - Keep-alive connection pooling and retry for LLM backends
+"""
+
+import http.client
+import json
+import random
+import socket
+import threading
+import time
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+# Status codes worth retrying (rate limits and transient server errors)
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# Errors that mean a pooled keep-alive connection went stale
+_STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.CannotSendRequest,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+
+class _ConnectError(OSError):
+    """Opening a connection (TCP connect or TLS handshake) failed"""
+
+
+# Failures retried with backoff. Anything else, notably a read timeout once
+# the request was sent, means the server is slow or busy, and retrying
+# would only multiply the wait.
+_RETRYABLE_ERRORS = (_ConnectError,) + _STALE_CONNECTION_ERRORS
+
+
+class LLMError(Exception):
+    """Raised when a backend request fails"""
+    
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+    
+    def __init__(self, max_retries: int = 3, base_delay: float = 0.5, max_delay: float = 8.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+    
+    def delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Seconds to wait before retry number `attempt` (0-based)"""
+        if retry_after is not None:
+            return min(self.max_delay, max(0.0, retry_after))
+        cap = min(self.max_delay, self.base_delay * (2 ** attempt))
+        return random.uniform(0, cap)
+
+
+class HTTPConnectionPool:
+    """
+    Pool of persistent HTTP/1.1 connections to one endpoint.
+    
+    - Idle connections are reused (most recently used first), so repeated
+      chat turns skip TCP/TLS setup
+    - A semaphore bounds the number of concurrent requests
+    - A reused connection that turns out to be stale is replaced once
+      without counting as a retry
+    - Connect failures, stale connections and retryable statuses are
+      retried with backoff; a read timeout is not
+    """
+    
+    def __init__(self, endpoint: str, max_connections: int = 4,
+                 connect_timeout: float = 5.0, read_timeout: float = 60.0,
+                 retry: Optional[RetryPolicy] = None):
+        parts = urlsplit(endpoint)
+        if parts.scheme not in ("http", "https"):
+            raise ValueError(f"Unsupported endpoint scheme: {endpoint}")
+        
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.base_path = parts.path.rstrip("/")
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retry = retry or RetryPolicy()
+        
+        self._idle: List[http.client.HTTPConnection] = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_connections)
+        self._closed = False
+        self.connections_created = 0
+        self.requests_sent = 0
+    
+    def request(self, method: str, path: str, body: Optional[bytes] = None,
+                headers: Optional[Dict[str, str]] = None,
+                timeout: Optional[float] = None) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Send a request, retrying transient failures with jittered backoff.
+        
+        Returns:
+            (status, headers, body)
+        """
+        attempt = 0
+        while True:
+            try:
+                status, response_headers, data = self._send_once(method, path, body, headers, timeout)
+            except _RETRYABLE_ERRORS as e:
+                if attempt >= self.retry.max_retries:
+                    raise LLMError(f"Request to {self.host} failed: {e}", retryable=True) from e
+                time.sleep(self.retry.delay(attempt))
+                attempt += 1
+                continue
+            except (socket.timeout, OSError, http.client.HTTPException) as e:
+                raise LLMError(f"Request to {self.host} failed: {e}") from e
+            
+            if status in RETRY_STATUSES and attempt < self.retry.max_retries:
+                time.sleep(self.retry.delay(attempt, self._retry_after(response_headers)))
+                attempt += 1
+                continue
+            
+            return status, response_headers, data
+    
+    def request_json(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None,
+                     headers: Optional[Dict[str, str]] = None,
+                     timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send a JSON request and decode the JSON response"""
+        all_headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        if headers:
+            all_headers.update(headers)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        
+        status, _, data = self.request(method, path, body, all_headers, timeout)
+        if status >= 400:
+            raise LLMError(
+                f"{self.host} returned HTTP {status}: {data[:500].decode('utf-8', 'replace')}",
+                status=status,
+                retryable=status in RETRY_STATUSES,
+            )
+        try:
+            return json.loads(data.decode("utf-8"))
+        except ValueError as e:
+            raise LLMError(f"Invalid JSON from {self.host}: {e}", status=status) from e
+    
+    def stream_lines(self, method: str, path: str, payload: Dict[str, Any],
+                     headers: Optional[Dict[str, str]] = None,
+                     timeout: Optional[float] = None) -> Iterator[bytes]:
+        """
+        Send a JSON request and yield the response body line by line as it
+        arrives (server-sent events or NDJSON).
+        
+        Failures are only retried before the first line is delivered. Closing
+        the generator early drops the connection instead of pooling it.
+        """
+        all_headers = {"Connection": "keep-alive", "Content-Type": "application/json"}
+        if headers:
+            all_headers.update(headers)
+        body = json.dumps(payload).encode("utf-8")
+        full_path = self.base_path + path
+        read_timeout = timeout or self.read_timeout
+        
+        attempt = 0
+        while True:
+            self._slots.acquire()
+            conn, reused = self._acquire()
+            try:
+                conn, response = self._start(conn, reused, method, full_path, body, all_headers, read_timeout)
+            except (socket.timeout, OSError, http.client.HTTPException) as e:
+                conn.close()
+                self._slots.release()
+                if not isinstance(e, _RETRYABLE_ERRORS):
+                    raise LLMError(f"Request to {self.host} failed: {e}") from e
+                if attempt >= self.retry.max_retries:
+                    raise LLMError(f"Request to {self.host} failed: {e}", retryable=True) from e
+                time.sleep(self.retry.delay(attempt))
+                attempt += 1
+                continue
+            
+            with self._lock:
+                self.requests_sent += 1
+            if response.status < 400:
+                break
+            
+            data = response.read()
+            conn.close()
+            self._slots.release()
+            response_headers = {k.lower(): v for k, v in response.getheaders()}
+            if response.status in RETRY_STATUSES and attempt < self.retry.max_retries:
+                time.sleep(self.retry.delay(attempt, self._retry_after(response_headers)))
+                attempt += 1
+                continue
+            raise LLMError(
+                f"{self.host} returned HTTP {response.status}: {data[:500].decode('utf-8', 'replace')}",
+                status=response.status,
+                retryable=response.status in RETRY_STATUSES,
+            )
+        
+        completed = False
+        try:
+            while True:
+                line = response.readline()
+                if not line:
+                    break
+                yield line
+            completed = True
+        finally:
+            if completed and not response.will_close:
+                self._release(conn)
+            else:
+                conn.close()
+            self._slots.release()
+    
+    def close(self):
+        """Close all idle connections"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+    
+    def stats(self) -> Dict[str, int]:
+        """Connection reuse statistics"""
+        with self._lock:
+            return {
+                "connections_created": self.connections_created,
+                "requests_sent": self.requests_sent,
+                "idle_connections": len(self._idle),
+            }
+    
+    def _send_once(self, method: str, path: str, body: Optional[bytes],
+                   headers: Optional[Dict[str, str]], timeout: Optional[float]):
+        """One request on a pooled connection (replacing it once if stale)"""
+        full_path = self.base_path + path
+        request_headers = {"Connection": "keep-alive"}
+        if headers:
+            request_headers.update(headers)
+        
+        read_timeout = timeout or self.read_timeout
+        
+        with self._slots:
+            conn, reused = self._acquire()
+            try:
+                conn, response = self._start(conn, reused, method, full_path, body, request_headers, read_timeout)
+                data = response.read()
+            except Exception:
+                conn.close()
+                raise
+            
+            with self._lock:
+                self.requests_sent += 1
+            response_headers = {k.lower(): v for k, v in response.getheaders()}
+            if response.will_close:
+                conn.close()
+            else:
+                self._release(conn)
+            return response.status, response_headers, data
+    
+    def _start(self, conn, reused: bool, method: str, path: str, body: Optional[bytes],
+               headers: Dict[str, str], read_timeout: float):
+        """
+        Send a request and read the status line, replacing a stale pooled
+        connection once.
+        
+        Returns:
+            (connection actually used, response)
+        """
+        try:
+            return conn, self._exchange(conn, method, path, body, headers, read_timeout)
+        except _STALE_CONNECTION_ERRORS:
+            if not reused:
+                raise
+            conn.close()
+            conn = self._new_connection()
+            try:
+                return conn, self._exchange(conn, method, path, body, headers, read_timeout)
+            except Exception:
+                # The caller only holds the stale connection, so close the replacement here
+                conn.close()
+                raise
+    
+    def _exchange(self, conn, method, path, body, headers, read_timeout: float):
+        """Send one request and return the response with headers read"""
+        if conn.sock is None:
+            # Connects with the pool's connect timeout
+            try:
+                conn.connect()
+            except OSError as e:
+                raise _ConnectError(f"Could not connect to {self.host}:{self.port}: {e}") from e
+            conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn.sock.settimeout(read_timeout)
+        conn.request(method, path, body=body, headers=headers)
+        return conn.getresponse()
+    
+    def _acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """Get an idle connection or open a new one"""
+        with self._lock:
+            if self._idle:
+                return self._idle.pop(), True
+        return self._new_connection(), False
+    
+    def _release(self, conn: http.client.HTTPConnection):
+        """Return a connection to the idle list"""
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_connections:
+                self._idle.append(conn)
+                return
+        conn.close()
+    
+    def _new_connection(self) -> http.client.HTTPConnection:
+        with self._lock:
+            self.connections_created += 1
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=self.connect_timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.connect_timeout)
+    
+    @staticmethod
+    def _retry_after(headers: Dict[str, str]) -> Optional[float]:
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return None
@@ -0,0 +1,91 @@
+"""
+Local Backend - Ollama server
+"""
+
+import json
+from typing import Dict, Any, Iterator, Optional
+
+from llm_backends.base import LLMBackend
+from llm_backends.http_pool import LLMError
+
+
+class LocalBackend(LLMBackend):
+    """
+    Backend for a local Ollama server.
+    
+    Chat prompts go to /api/chat so the static prefix is templated the same
+    way every turn and Ollama can reuse its KV cache; plain strings go to
+    /api/generate. keep_alive keeps the model (and its cache) loaded between
+    turns.
+    """
+    
+    name = "local"
+    
+    def __init__(self, settings: Dict[str, Any]):
+        super().__init__(settings)
+        self.keep_alive = settings.get("keep_alive", "30m")
+    
+    def generate(self, prompt, temperature: Optional[float] = None,
+                 max_tokens: Optional[int] = None) -> str:
+        """Send a prompt and wait for the whole completion"""
+        path, payload = self._request(prompt, temperature, max_tokens, stream=False)
+        response = self.pool.request_json("POST", path, payload)
+        self._record_usage(response)
+        text = self._content(response)
+        if text is None:
+            raise LLMError(f"Unexpected Ollama response: {response.get('error', response)}")
+        return text
+    
+    def stream(self, prompt, temperature: Optional[float] = None,
+               max_tokens: Optional[int] = None) -> Iterator[str]:
+        """Stream newline-delimited JSON chunks"""
+        path, payload = self._request(prompt, temperature, max_tokens, stream=True)
+        for line in self.pool.stream_lines("POST", path, payload):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                chunk = json.loads(line)
+            except ValueError:
+                continue
+            if chunk.get("error"):
+                raise LLMError(f"Ollama stream error: {chunk['error']}")
+            if chunk.get("done"):
+                self._record_usage(chunk)
+            text = self._content(chunk)
+            if text:
+                yield text
+    
+    def _request(self, prompt, temperature: Optional[float], max_tokens: Optional[int],
+                 stream: bool):
+        """Endpoint path and payload for a prompt"""
+        payload: Dict[str, Any] = {
+            "model": self.model,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": {
+                "temperature": self._temperature(temperature),
+                "num_predict": self._max_tokens(max_tokens),
+            },
+        }
+        if isinstance(prompt, str):
+            payload["prompt"] = prompt
+            return "/api/generate", payload
+        payload["messages"] = self._as_messages(prompt)
+        return "/api/chat", payload
+    
+    def _record_usage(self, response: Dict[str, Any]):
+        """prompt_eval_count only counts tokens Ollama had to evaluate (not cached)"""
+        if "prompt_eval_count" in response or "eval_count" in response:
+            self.last_usage = {
+                "prompt_eval_count": response.get("prompt_eval_count"),
+                "completion_tokens": response.get("eval_count"),
+            }
+    
+    @staticmethod
+    def _content(response: Dict[str, Any]) -> Optional[str]:
+        """Text of a /api/chat or /api/generate response"""
+        message = response.get("message")
+        if isinstance(message, dict):
+            return message.get("content", "")
+        return response.get("response")
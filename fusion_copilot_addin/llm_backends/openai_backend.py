@@ -0,0 +1,84 @@
+"""
+OpenAI Backend - Chat completions API
+"""
+
+import json
+import os
+from typing import Dict, Any, Iterator, Optional
+
+from llm_backends.base import LLMBackend
+from llm_backends.http_pool import LLMError
+
+
+class OpenAIBackend(LLMBackend):
+    """Backend for OpenAI-compatible /chat/completions endpoints"""
+    
+    name = "openai"
+    
+    def __init__(self, settings: Dict[str, Any]):
+        super().__init__(settings)
+        self.api_key = settings.get("api_key") or os.environ.get("OPENAI_API_KEY")
+    
+    def generate(self, prompt, temperature: Optional[float] = None,
+                 max_tokens: Optional[int] = None) -> str:
+        """Send a prompt as chat messages"""
+        payload = {
+            "model": self.model,
+            "messages": self._as_messages(prompt),
+            "temperature": self._temperature(temperature),
+            "max_tokens": self._max_tokens(max_tokens),
+        }
+        response = self.pool.request_json("POST", "/chat/completions", payload, self._headers())
+        self._record_usage(response.get("usage"))
+        try:
+            return response["choices"][0]["message"]["content"] or ""
+        except (KeyError, IndexError, TypeError) as e:
+            raise LLMError(f"Unexpected OpenAI response: {e}") from e
+    
+    def stream(self, prompt, temperature: Optional[float] = None,
+               max_tokens: Optional[int] = None) -> Iterator[str]:
+        """Stream content deltas from server-sent events"""
+        payload = {
+            "model": self.model,
+            "messages": self._as_messages(prompt),
+            "temperature": self._temperature(temperature),
+            "max_tokens": self._max_tokens(max_tokens),
+            "stream": True,
+        }
+        headers = dict(self._headers(), Accept="text/event-stream")
+        for line in self.pool.stream_lines("POST", "/chat/completions", payload, headers):
+            line = line.strip()
+            if not line.startswith(b"data:"):
+                continue
+            data = line[5:].strip()
+            if data == b"[DONE]":
+                # Keep reading to the end so the connection can be pooled
+                continue
+            try:
+                event = json.loads(data)
+            except ValueError:
+                continue
+            if event.get("error"):
+                raise LLMError(f"OpenAI stream error: {event['error']}")
+            if event.get("usage"):
+                self._record_usage(event["usage"])
+            for choice in event.get("choices") or []:
+                content = (choice.get("delta") or {}).get("content")
+                if content:
+                    yield content
+    
+    def _record_usage(self, usage: Optional[Dict[str, Any]]):
+        """Keep prompt/cached token counts (cached = served from the prompt cache)"""
+        if not usage:
+            return
+        details = usage.get("prompt_tokens_details") or {}
+        self.last_usage = {
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "cached_tokens": details.get("cached_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens"),
+        }
+    
+    def _headers(self) -> Dict[str, str]:
+        if not self.api_key:
+            raise LLMError("No OpenAI API key configured (MODEL_CONFIG['openai']['api_key'] or OPENAI_API_KEY)")
+        return {"Authorization": f"Bearer {self.api_key}"}
@@ -14,6 +14,9 @@ from pathlib import Path
 from core.orchestrator import Orchestrator
 from core.context import ContextCapture
 from core.executor import CodeExecutor
+from core.pipeline import GenerationPipeline, MainThreadDispatcher
+from scripts.sandbox_runner import SandboxRunner
+from config import BENCHMARK_CONFIG
 
 # Global variables
 app = None
@@ -22,20 +25,30 @@ handlers = []
 orchestrator = None
 context_capture = None
 executor = None
+dispatcher = None
+pipeline = None
+api_recorder = None
 
 
 def run(context):
     """Main entry point for the add-in"""
     try:
-        global app, ui, handlers, orchestrator, context_capture, executor
+        global app, ui, handlers, orchestrator, context_capture, executor, dispatcher, api_recorder
         
         app = adsk.core.Application.get()
         ui = app.userInterface
         
-        # Initialize core components
+        if BENCHMARK_CONFIG["record_api_trace"]:
+            # Records API calls made on this (Fusion's main) thread until stop()
+            from core.api_trace import ApiRecorder
+            api_recorder = ApiRecorder(BENCHMARK_CONFIG["max_events"], BENCHMARK_CONFIG["samples_per_call"])
+            api_recorder.start()
+        
+        # Initialize core components (created here, on Fusion's main thread)
+        dispatcher = MainThreadDispatcher(app)
         context_capture = ContextCapture(app)
         executor = CodeExecutor(app)
-        orchestrator = Orchestrator(app, context_capture, executor)
+        orchestrator = Orchestrator(app, context_capture, executor, dispatcher)
         
         # Create UI palette
         _create_palette(ui, orchestrator)
@@ -51,6 +64,7 @@ def run(context):
 
 def _create_palette(ui, orchestrator):
     """Create the docked chat palette"""
+    global pipeline
     try:
         # Get the palette resources path
         addin_path = os.path.dirname(os.path.abspath(__file__))
@@ -67,10 +81,53 @@ def _create_palette(ui, orchestrator):
         # Store orchestrator reference for palette communication
         palette.orchestrator = orchestrator
         
+        # Chat requests run on a worker thread; results are posted back to the palette
+        pipeline = GenerationPipeline(orchestrator, dispatcher, palette.sendInfoToHTML)
+        
+        # Route chat messages from panel.js to the pipeline
+        html_handler = _PaletteMessageHandler(palette, pipeline)
+        palette.incomingFromHTML.add(html_handler)
+        handlers.append(html_handler)
+        
     except Exception as e:
         ui.messageBox(f"Error creating palette: {str(e)}")
 
 
+class _PaletteMessageHandler(adsk.core.HTMLEventHandler):
+    """Handles messages sent from panel.js via adsk.fusionSendData()"""
+    
+    def __init__(self, palette, pipeline):
+        super().__init__()
+        self.palette = palette
+        self.pipeline = pipeline
+    
+    def notify(self, args):
+        try:
+            html_args = adsk.core.HTMLEventArgs.cast(args)
+            data = json.loads(html_args.data) if html_args.data else {}
+            
+            if html_args.action == "sendMessage":
+                # Returns immediately; streamEvent/generationResult messages follow
+                self.pipeline.submit(data.get("message", ""), data.get("requestId"), bool(data.get("force")))
+            elif html_args.action == "cancelGeneration":
+                self.pipeline.cancel(data.get("requestId"))
+            elif html_args.action == "executeCode":
+                # HTML events arrive on the main thread, so the script can touch the design
+                # Output is streamed to the panel as the script prints it
+                result = self.palette.orchestrator.execute_code(
+                    data.get("code", ""), data.get("profile"),
+                    on_output=lambda chunk: self.palette.sendInfoToHTML("executionOutput", json.dumps(chunk)))
+                self.palette.sendInfoToHTML("executionResult", json.dumps(result, default=str))
+            
+            html_args.returnData = "OK"
+        except Exception:
+            if ui:
+                ui.messageBox(f"Error handling panel message:\n{traceback.format_exc()}")
+    
+    def disconnect(self):
+        self.palette.incomingFromHTML.remove(self)
+
+
 def _register_commands(ui, orchestrator):
     """Register command buttons and hotkeys"""
     try:
@@ -88,6 +145,26 @@ def stop(context):
         global handlers
         for handler in handlers:
             handler.disconnect()
+        
+        if pipeline:
+            pipeline.close()
+        
+        if dispatcher:
+            dispatcher.close()
+        
+        if context_capture:
+            context_capture.close()
+        
+        if orchestrator:
+            orchestrator.close()
+        
+        SandboxRunner.shutdown()
+        
+        if api_recorder:
+            api_recorder.stop()
+            trace_file = BENCHMARK_CONFIG["trace_file"] or os.path.join(
+                os.path.dirname(os.path.abspath(__file__)), "api_trace.json")
+            api_recorder.save(trace_file)
     except Exception as e:
         if ui:
             ui.messageBox(f"Error stopping add-in: {str(e)}")
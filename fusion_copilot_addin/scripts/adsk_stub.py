@@ -0,0 +1,84 @@
+"""
+adsk Stub - Permissive stand-in for the Fusion API outside Fusion
+"""
+
+import sys
+import types
+from typing import Any
+
+
+class StubObject:
+    """
+    Accepts any API use: attributes and calls return further stubs,
+    collections are empty, numbers convert to 0. Enough for generated
+    scripts to run end-to-end so plain Python errors surface.
+    """
+    
+    __slots__ = ("_path",)
+    
+    def __init__(self, path: str = "adsk"):
+        object.__setattr__(self, "_path", path)
+    
+    def __getattr__(self, name: str) -> "StubObject":
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        return StubObject(f"{self._path}.{name}")
+    
+    def __setattr__(self, name: str, value: Any):
+        pass
+    
+    def __call__(self, *args, **kwargs) -> "StubObject":
+        return StubObject(f"{self._path}()")
+    
+    def __getitem__(self, key) -> "StubObject":
+        return StubObject(f"{self._path}[{key!r}]")
+    
+    def __iter__(self):
+        return iter(())
+    
+    def __len__(self) -> int:
+        return 0
+    
+    def __bool__(self) -> bool:
+        return True
+    
+    def __int__(self) -> int:
+        return 0
+    
+    def __float__(self) -> float:
+        return 0.0
+    
+    def __index__(self) -> int:
+        return 0
+    
+    def __repr__(self) -> str:
+        return f"<stub {self._path}>"
+
+
+class _StubModule(types.ModuleType):
+    def __getattr__(self, name: str) -> StubObject:
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        return StubObject(f"{self.__name__}.{name}")
+
+
+def install(force: bool = False) -> bool:
+    """
+    Register stub adsk, adsk.core, adsk.fusion and adsk.cam modules unless
+    the real API is importable (or force). Returns True if installed.
+    """
+    if not force:
+        try:
+            import adsk.core  # noqa: F401
+            return False
+        except ImportError:
+            pass
+    
+    root = _StubModule("adsk")
+    root.__path__ = []  # A package, so "import adsk.core" works
+    sys.modules["adsk"] = root
+    for name in ("core", "fusion", "cam"):
+        module = _StubModule(f"adsk.{name}")
+        setattr(root, name, module)
+        sys.modules[f"adsk.{name}"] = module
+    return True
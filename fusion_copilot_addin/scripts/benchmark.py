@@ -0,0 +1,186 @@
+"""
+Benchmark - Load-tests context capture, execution and the orchestrator
+offline, against the fake adsk object model
+
+Run as: python scripts/benchmark.py [--trace api_trace.json] [--parameters 2000]
+        [--occurrences 5000] [--runs 20] [--json]
+
+With --trace, every API call is charged a latency drawn from a trace
+recorded in Fusion (BENCHMARK_CONFIG["record_api_trace"]), so the numbers
+approximate a live session; without it they show the add-in's own cost.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import fake_adsk  # noqa: E402
+from scripts.fake_adsk.synthetic import build_application  # noqa: E402
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+CHAT_MESSAGE = "make a bracket 100 mm wide, 50 mm high and 10 mm thick"
+
+
+def _template(template: str, **slots: str) -> str:
+    with open(os.path.join(TEMPLATE_DIR, f"{template}.tmpl"), "r", encoding="utf-8") as f:
+        code = f.read()
+    for slot, value in slots.items():
+        code = code.replace("{{" + slot + "}}", value)
+    return code
+
+
+def _measure(fn: Callable[[int], Any], runs: int, latency) -> Dict[str, Any]:
+    """Time runs calls of fn(i) after one warm-up call"""
+    fn(-1)
+    calls_before = sum(latency.calls.values()) if latency else 0
+    samples: List[float] = []
+    for i in range(runs):
+        started = time.perf_counter()
+        fn(i)
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    result = {
+        "runs": runs,
+        "min_ms": round(samples[0] * 1000, 3),
+        "median_ms": round(statistics.median(samples) * 1000, 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 3),
+        "max_ms": round(samples[-1] * 1000, 3),
+    }
+    if latency:
+        result["api_calls_per_run"] = round((sum(latency.calls.values()) - calls_before) / runs, 1)
+    return result
+
+
+def run_benchmarks(args) -> Dict[str, Any]:
+    from config import API_INDEX_CONFIG, CACHE_CONFIG, MODEL_CONFIG, VALIDATION_CONFIG
+    from core.api_trace import LatencyModel, load_trace
+    
+    # Offline generation, and every chat run does the full work
+    MODEL_CONFIG["default_backend"] = "offline"
+    CACHE_CONFIG["enabled"] = False
+    # The API index and symbol table come from the bundled reference, built in a
+    # scratch folder so the add-in's .cache (possibly built from Fusion's stubs) is left alone
+    cache_dir = tempfile.mkdtemp(prefix="copilot-benchmark-")
+    API_INDEX_CONFIG["sources"] = [os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_reference.json")]
+    API_INDEX_CONFIG["index_path"] = os.path.join(cache_dir, "api_index.bin")
+    VALIDATION_CONFIG["symbols_path"] = os.path.join(cache_dir, "api_symbols.json")
+    
+    started = time.perf_counter()
+    app = fake_adsk.install(build_application(
+        parameters=args.parameters, occurrences=args.occurrences, depth=args.depth,
+        bodies=args.bodies, selected=args.selected, seed=args.seed,
+    ))
+    build_seconds = time.perf_counter() - started
+    
+    latency = None
+    if args.trace:
+        latency = LatencyModel.from_trace(load_trace(args.trace), scale=args.scale, seed=args.seed)
+        fake_adsk.set_latency(latency)
+    
+    from core.context import ContextCapture
+    from core.executor import CodeExecutor
+    from core.orchestrator import Orchestrator
+    
+    context = ContextCapture(app)
+    executor = CodeExecutor(app)
+    orchestrator = Orchestrator(app, context, executor)
+    bracket = _template("parametric_bracket", width="100 mm", height="50 mm", thickness="10 mm")
+    
+    def set_parameter(i: int):
+        code = _template("user_parameter", name="BenchParameter", value=f"{i + 2} mm", units="mm")
+        result = executor.run_code(code)
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+    
+    def build_bracket(i: int):
+        result = executor.run_code(bracket, defer_compute=args.defer_compute)
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+    
+    benchmarks = {
+        "context_cold": lambda i: context.get_runtime_context(force_refresh=True),
+        "context_warm": lambda i: context.get_runtime_context(),
+        "execute_parameter": set_parameter,
+        "execute_bracket": build_bracket,
+        "chat_message": lambda i: orchestrator.process_chat_message(CHAT_MESSAGE),
+    }
+    if args.only:
+        benchmarks = {name: fn for name, fn in benchmarks.items() if name in args.only}
+    
+    results = {name: _measure(fn, args.runs, latency) for name, fn in benchmarks.items()}
+    design = app.activeProduct
+    report = {
+        "design": {
+            "parameters": args.parameters,
+            "occurrences": args.occurrences,
+            "bodies": args.bodies,
+            "selected": args.selected,
+            "build_seconds": round(build_seconds, 3),
+            "timeline_after": design.timeline.count,
+            "recomputes": design.computes,
+        },
+        "benchmarks": results,
+    }
+    if latency is not None:
+        report["latency"] = latency.summary()
+    context.close()
+    orchestrator.close()
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trace", help="API trace recorded in Fusion, for replayed latencies")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply replayed latencies")
+    parser.add_argument("--parameters", type=int, default=500)
+    parser.add_argument("--occurrences", type=int, default=1000)
+    parser.add_argument("--depth", type=int, default=3, help="Occurrence tree depth")
+    parser.add_argument("--bodies", type=int, default=20)
+    parser.add_argument("--selected", type=int, default=10, help="Faces/edges in the active selection")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--defer-compute", action="store_true", help="Run scripts with deferred compute")
+    parser.add_argument("--only", nargs="*", help="Benchmarks to run (default: all)")
+    parser.add_argument("--record", help="Also record the API calls made to this trace file")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+    
+    recorder = None
+    if args.record:
+        from core.api_trace import ApiRecorder
+        recorder = ApiRecorder()
+        recorder.start()
+    try:
+        report = run_benchmarks(args)
+    finally:
+        if recorder is not None:
+            recorder.stop()
+            recorder.save(args.record)
+    
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    
+    design = report["design"]
+    print(f"Design: {design['parameters']} parameters, {design['occurrences']} occurrences, "
+          f"{design['bodies']} bodies (built in {design['build_seconds']} s)")
+    print(f"{'benchmark':<20}{'min ms':>10}{'median ms':>12}{'p95 ms':>10}{'max ms':>10}")
+    for name, stats in report["benchmarks"].items():
+        print(f"{name:<20}{stats['min_ms']:>10}{stats['median_ms']:>12}{stats['p95_ms']:>10}{stats['max_ms']:>10}")
+    if "latency" in report:
+        latency = report["latency"]
+        print(f"Replayed {latency['calls']} API calls, {latency['charged_seconds']} s of latency")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
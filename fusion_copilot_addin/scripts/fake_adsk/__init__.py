@@ -0,0 +1,69 @@
+"""
+Fake adsk - Offline Fusion API object model for benchmarks and load tests
+
+Unlike scripts/adsk_stub.py, which accepts any use, this is a small but
+faithful model of the parts of adsk.core / adsk.fusion / adsk.cam the
+add-in and its templates use: documents, user parameters with expression
+evaluation, the timeline, components and occurrences, sketches,
+extrude/fillet/chamfer features, box B-Rep bodies, selections and events.
+Anything else raises AttributeError, as a missing API would.
+
+Every API member charges the latency a LatencyModel (core/api_trace.py)
+replays for it, so recorded Fusion timings can be reproduced offline.
+"""
+
+import sys
+from typing import Optional
+
+from . import cam, core, fusion
+from ._api import state
+from .synthetic import build_application
+
+
+# Not the real API: find_stub_sources() must not index these modules as stubs
+__fake__ = True
+
+_MODULES = (("adsk.core", core), ("adsk.fusion", fusion), ("adsk.cam", cam))
+
+
+def install(app: Optional[core.Application] = None) -> core.Application:
+    """
+    Register the fake as adsk, adsk.core, adsk.fusion and adsk.cam, with
+    app (default: a session with one empty design) as Application.get().
+    """
+    package = sys.modules[__name__]
+    sys.modules["adsk"] = package
+    for name, module in _MODULES:
+        # Named like the real modules, so ScriptProfiler and ApiRecorder see API calls
+        module.__name__ = name
+        sys.modules[name] = module
+    if app is None:
+        app = new_application()
+    core.Application._instance = app
+    return app
+
+
+def uninstall():
+    """Remove the fake from sys.modules"""
+    package = sys.modules[__name__]
+    if sys.modules.get("adsk") is package:
+        del sys.modules["adsk"]
+    for name, module in _MODULES:
+        if sys.modules.get(name) is module:
+            del sys.modules[name]
+        module.__name__ = f"{__name__}.{name.rsplit('.', 1)[-1]}"
+    core.Application._instance = None
+
+
+def new_application(document_name: str = "Untitled") -> core.Application:
+    """A session with one active, empty design"""
+    return build_application(name=document_name)
+
+
+def set_latency(model) -> None:
+    """Replay latencies from a LatencyModel (None: API calls cost nothing extra)"""
+    state.latency = model
+
+
+def get_latency():
+    return state.latency
@@ -0,0 +1,141 @@
+"""
+Fake API plumbing - Latency charging for fake adsk classes
+"""
+
+import functools
+import itertools
+import sys
+import types
+from typing import Any, Callable, Optional
+
+
+class _State:
+    """Process-wide replay settings (see fake_adsk.set_latency)"""
+    
+    latency = None  # LatencyModel or None
+
+
+state = _State()
+_tokens = itertools.count(1)
+
+
+def new_token(kind: str) -> str:
+    """Unique, stable entityToken"""
+    return f"fake:{kind}:{next(_tokens)}"
+
+
+def _charged(func: Callable, name: str, module_globals: dict) -> Callable:
+    """
+    Wrap func so calling it first charges the replayed latency of name.
+    The wrapper is rebuilt in the fake module's globals and named after the
+    API member, so ScriptProfiler and ApiRecorder see it as the adsk call.
+    """
+    settings = state  # A closure variable: the rebuilt function doesn't see this module's globals
+    
+    def charged(*args, **kwargs):
+        model = settings.latency
+        if model is not None:
+            model.delay(name)
+        return func(*args, **kwargs)
+    
+    code = charged.__code__
+    try:
+        code = code.replace(co_name=func.__name__, co_qualname=name)
+    except TypeError:  # co_qualname is new in Python 3.11
+        code = code.replace(co_name=func.__name__)
+    wrapper = types.FunctionType(code, module_globals, func.__name__, None, charged.__closure__)
+    return functools.update_wrapper(wrapper, func)
+
+
+def api_class(cls):
+    """
+    Class decorator for fake API classes: public methods, static methods and
+    properties charge their replayed latency ("Class.member", setters
+    "Class.member =", matching the names profiler.api_name gives SWIG calls).
+    Members inherited from another fake API class keep that class's name.
+    """
+    module_globals = sys.modules[cls.__module__].__dict__
+    # Members of the shared bases below are charged under each class's own name
+    members = {}
+    for klass in cls.__mro__:
+        for attr, value in vars(klass).items():
+            if attr not in members:
+                members[attr] = (klass, value)
+    for attr, (klass, value) in members.items():
+        if attr.startswith("_") or (klass is not cls and klass.__module__ != __name__):
+            continue
+        name = f"{cls.__name__}.{attr}"
+        if isinstance(value, property):
+            fset: Optional[Callable] = None
+            if value.fset is not None:
+                fset = _charged(value.fset, f"{name} =", module_globals)
+            setattr(cls, attr, property(_charged(value.fget, name, module_globals), fset, doc=value.__doc__))
+        elif isinstance(value, staticmethod):
+            setattr(cls, attr, staticmethod(_charged(value.__func__, name, module_globals)))
+        elif isinstance(value, classmethod):
+            setattr(cls, attr, classmethod(_charged(value.__func__, name, module_globals)))
+        elif isinstance(value, types.FunctionType):
+            setattr(cls, attr, _charged(value, name, module_globals))
+    return cls
+
+
+class Base:
+    """Common members of every API object"""
+    
+    def __init__(self):
+        self._token = new_token(type(self).__name__)
+    
+    @property
+    def objectType(self) -> str:
+        module = type(self).__module__.rsplit(".", 1)[-1]
+        return f"adsk::{module}::{type(self).__name__}"
+    
+    @property
+    def isValid(self) -> bool:
+        return True
+    
+    @property
+    def entityToken(self) -> str:
+        return self._token
+    
+    @classmethod
+    def classType(cls) -> str:
+        module = cls.__module__.rsplit(".", 1)[-1]
+        return f"adsk::{module}::{cls.__name__}"
+    
+    @classmethod
+    def cast(cls, obj: Any):
+        """The object if it is one of these, else None (like the SWIG casts)"""
+        return obj if isinstance(obj, cls) else None
+
+
+class Collection(Base):
+    """Indexed API collection (count/item), also iterable like the real ones"""
+    
+    def __init__(self, items=None):
+        super().__init__()
+        self._items = list(items or [])
+    
+    @property
+    def count(self) -> int:
+        return len(self._items)
+    
+    def item(self, index: int):
+        if 0 <= index < len(self._items):
+            return self._items[index]
+        return None
+    
+    def itemByName(self, name: str):
+        for item in self._items:
+            if getattr(item, "_name", None) == name:
+                return item
+        return None
+    
+    def __iter__(self):
+        return iter(list(self._items))
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __getitem__(self, index: int):
+        return self._items[index]
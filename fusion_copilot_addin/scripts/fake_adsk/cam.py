@@ -0,0 +1,40 @@
+"""
+Fake adsk.cam - CAM product with (empty) setups
+"""
+
+from ._api import Collection, api_class
+from .core import Product
+
+
+CAM_PRODUCT_TYPE = "CAMProductType"
+
+
+class OperationTypes:
+    MillingOperation = 0
+    TurningOperation = 1
+    JetOperation = 2
+
+
+@api_class
+class Setups(Collection):
+    pass
+
+
+@api_class
+class OperationList(Collection):
+    pass
+
+
+@api_class
+class CAM(Product):
+    def __init__(self):
+        super().__init__(CAM_PRODUCT_TYPE)
+        self._setups = Setups()
+    
+    @property
+    def setups(self) -> Setups:
+        return self._setups
+    
+    @property
+    def allOperations(self) -> OperationList:
+        return OperationList()
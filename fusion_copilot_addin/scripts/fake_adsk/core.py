@@ -0,0 +1,632 @@
+"""
+Fake adsk.core - Application, UI, events and geometry value types
+"""
+
+import math
+from typing import Any, List, Optional
+
+from ._api import Base, Collection, api_class
+
+
+# Enums (values as in the real API)
+
+class DocumentTypes:
+    FusionDesignDocumentType = 0
+
+
+class MessageBoxButtonTypes:
+    OKButtonType = 0
+    OKCancelButtonType = 1
+    YesNoButtonType = 3
+
+
+class DialogResults:
+    DialogError = -1
+    DialogOK = 0
+    DialogCancel = 1
+    DialogYes = 2
+    DialogNo = 3
+
+
+class ValueTypes:
+    RealValueType = 0
+    StringValueType = 2
+
+
+class SurfaceTypes:
+    PlaneSurfaceType = 0
+    CylinderSurfaceType = 1
+
+
+class Curve3DTypes:
+    Line3DCurveType = 0
+
+
+# Events
+
+@api_class
+class Event(Base):
+    """An event handlers are added to; fired synchronously on the calling thread"""
+    
+    def __init__(self, name: str):
+        super().__init__()
+        self._name = name
+        self._handlers: List[Any] = []
+    
+    @property
+    def name(self) -> str:
+        return self._name
+    
+    def add(self, handler) -> bool:
+        if handler in self._handlers:
+            return False
+        self._handlers.append(handler)
+        return True
+    
+    def remove(self, handler) -> bool:
+        if handler not in self._handlers:
+            return False
+        self._handlers.remove(handler)
+        return True
+    
+    def _fire(self, args=None):
+        for handler in list(self._handlers):
+            handler.notify(args)
+
+
+class _EventHandler:
+    def __init__(self):
+        pass
+    
+    def notify(self, args):
+        pass
+
+
+class ActiveSelectionEventHandler(_EventHandler):
+    pass
+
+
+class DocumentEventHandler(_EventHandler):
+    pass
+
+
+class ApplicationCommandEventHandler(_EventHandler):
+    pass
+
+
+class WorkspaceEventHandler(_EventHandler):
+    pass
+
+
+class HTMLEventHandler(_EventHandler):
+    pass
+
+
+class CustomEventHandler(_EventHandler):
+    pass
+
+
+class CommandCreatedEventHandler(_EventHandler):
+    pass
+
+
+class CommandEventHandler(_EventHandler):
+    pass
+
+
+@api_class
+class EventArgs(Base):
+    def __init__(self, firing_event: Optional[Event] = None, **values):
+        super().__init__()
+        self._firing_event = firing_event
+        self.__dict__.update(values)
+    
+    @property
+    def firingEvent(self) -> Optional[Event]:
+        return self._firing_event
+
+
+@api_class
+class HTMLEventArgs(EventArgs):
+    def __init__(self, action: str, data: str = "", firing_event: Optional[Event] = None):
+        super().__init__(firing_event)
+        self._action = action
+        self._data = data
+        self.returnData = ""
+    
+    @property
+    def action(self) -> str:
+        return self._action
+    
+    @property
+    def data(self) -> str:
+        return self._data
+
+
+@api_class
+class CustomEventArgs(EventArgs):
+    def __init__(self, additional_info: str = "", firing_event: Optional[Event] = None):
+        super().__init__(firing_event)
+        self._info = additional_info
+    
+    @property
+    def additionalInfo(self) -> str:
+        return self._info
+
+
+# Geometry value types
+
+@api_class
+class Point3D(Base):
+    def __init__(self, x: float = 0.0, y: float = 0.0, z: float = 0.0):
+        super().__init__()
+        self._xyz = [float(x), float(y), float(z)]
+    
+    @staticmethod
+    def create(x: float = 0.0, y: float = 0.0, z: float = 0.0) -> "Point3D":
+        return Point3D(x, y, z)
+    
+    @property
+    def x(self) -> float:
+        return self._xyz[0]
+    
+    @x.setter
+    def x(self, value: float):
+        self._xyz[0] = float(value)
+    
+    @property
+    def y(self) -> float:
+        return self._xyz[1]
+    
+    @y.setter
+    def y(self, value: float):
+        self._xyz[1] = float(value)
+    
+    @property
+    def z(self) -> float:
+        return self._xyz[2]
+    
+    @z.setter
+    def z(self, value: float):
+        self._xyz[2] = float(value)
+    
+    def asArray(self) -> tuple:
+        return tuple(self._xyz)
+    
+    def copy(self) -> "Point3D":
+        return Point3D(*self._xyz)
+    
+    def distanceTo(self, other: "Point3D") -> float:
+        return math.dist(self._xyz, other._xyz)
+    
+    def isEqualTo(self, other: "Point3D") -> bool:
+        return math.dist(self._xyz, other._xyz) < 1e-9
+
+
+@api_class
+class Vector3D(Base):
+    def __init__(self, x: float = 0.0, y: float = 0.0, z: float = 0.0):
+        super().__init__()
+        self._xyz = [float(x), float(y), float(z)]
+    
+    @staticmethod
+    def create(x: float = 0.0, y: float = 0.0, z: float = 0.0) -> "Vector3D":
+        return Vector3D(x, y, z)
+    
+    @property
+    def x(self) -> float:
+        return self._xyz[0]
+    
+    @property
+    def y(self) -> float:
+        return self._xyz[1]
+    
+    @property
+    def z(self) -> float:
+        return self._xyz[2]
+    
+    @property
+    def length(self) -> float:
+        return math.hypot(*self._xyz)
+    
+    def asArray(self) -> tuple:
+        return tuple(self._xyz)
+    
+    def normalize(self) -> bool:
+        length = math.hypot(*self._xyz)
+        if length == 0:
+            return False
+        self._xyz = [value / length for value in self._xyz]
+        return True
+
+
+@api_class
+class Matrix3D(Base):
+    def __init__(self):
+        super().__init__()
+        self._translation = [0.0, 0.0, 0.0]
+    
+    @staticmethod
+    def create() -> "Matrix3D":
+        return Matrix3D()
+    
+    @property
+    def translation(self) -> Vector3D:
+        return Vector3D(*self._translation)
+    
+    @translation.setter
+    def translation(self, value: Vector3D):
+        self._translation = list(value._xyz)
+    
+    def asArray(self) -> tuple:
+        x, y, z = self._translation
+        return (1.0, 0.0, 0.0, x, 0.0, 1.0, 0.0, y, 0.0, 0.0, 1.0, z, 0.0, 0.0, 0.0, 1.0)
+
+
+@api_class
+class BoundingBox3D(Base):
+    def __init__(self, min_point: Point3D, max_point: Point3D):
+        super().__init__()
+        self._min = min_point
+        self._max = max_point
+    
+    @staticmethod
+    def create(minPoint: Point3D, maxPoint: Point3D) -> "BoundingBox3D":
+        return BoundingBox3D(Point3D(*minPoint._xyz), Point3D(*maxPoint._xyz))
+    
+    @property
+    def minPoint(self) -> Point3D:
+        return Point3D(*self._min._xyz)
+    
+    @property
+    def maxPoint(self) -> Point3D:
+        return Point3D(*self._max._xyz)
+    
+    def contains(self, point: Point3D) -> bool:
+        return all(low <= value <= high for low, value, high
+                   in zip(self._min._xyz, point._xyz, self._max._xyz))
+
+
+@api_class
+class ValueInput(Base):
+    def __init__(self, real: Optional[float] = None, text: Optional[str] = None):
+        super().__init__()
+        self._real = real
+        self._text = text
+    
+    @staticmethod
+    def createByReal(realValue: float) -> "ValueInput":
+        return ValueInput(real=float(realValue))
+    
+    @staticmethod
+    def createByString(stringValue: str) -> "ValueInput":
+        return ValueInput(text=str(stringValue))
+    
+    @property
+    def valueType(self) -> int:
+        return ValueTypes.RealValueType if self._text is None else ValueTypes.StringValueType
+    
+    @property
+    def realValue(self) -> float:
+        return self._real if self._real is not None else 0.0
+    
+    @property
+    def stringValue(self) -> str:
+        return self._text if self._text is not None else ""
+
+
+@api_class
+class ObjectCollection(Collection):
+    @staticmethod
+    def create() -> "ObjectCollection":
+        return ObjectCollection()
+    
+    def add(self, item) -> bool:
+        self._items.append(item)
+        return True
+    
+    def clear(self) -> bool:
+        self._items.clear()
+        return True
+    
+    def find(self, item) -> int:
+        return self._items.index(item) if item in self._items else -1
+
+
+# User interface
+
+@api_class
+class Workspace(Base):
+    def __init__(self, workspace_id: str, name: str, ui: "UserInterface"):
+        super().__init__()
+        self._id = workspace_id
+        self._name = name
+        self._ui = ui
+    
+    @property
+    def id(self) -> str:
+        return self._id
+    
+    @property
+    def name(self) -> str:
+        return self._name
+    
+    def activate(self) -> bool:
+        self._ui._active_workspace = self
+        self._ui.workspaceActivated._fire(EventArgs(self._ui.workspaceActivated, workspace=self))
+        return True
+
+
+@api_class
+class Workspaces(Collection):
+    def itemById(self, workspace_id: str) -> Optional[Workspace]:
+        for workspace in self._items:
+            if workspace._id == workspace_id:
+                return workspace
+        return None
+
+
+@api_class
+class Selection(Base):
+    def __init__(self, entity, point: Optional[Point3D] = None):
+        super().__init__()
+        self._entity = entity
+        self._point = point or Point3D()
+    
+    @property
+    def entity(self):
+        return self._entity
+    
+    @property
+    def point(self) -> Point3D:
+        return self._point
+
+
+@api_class
+class Selections(Collection):
+    def __init__(self, ui: "UserInterface"):
+        super().__init__()
+        self._ui = ui
+    
+    def add(self, entity) -> bool:
+        self._items.append(Selection(entity))
+        self._ui._selection_changed()
+        return True
+    
+    def clear(self) -> bool:
+        self._items.clear()
+        self._ui._selection_changed()
+        return True
+    
+    def removeByIndex(self, index: int) -> bool:
+        if not 0 <= index < len(self._items):
+            return False
+        del self._items[index]
+        self._ui._selection_changed()
+        return True
+
+
+@api_class
+class Palette(Base):
+    def __init__(self, palette_id: str, name: str, html_path: str, is_visible: bool):
+        super().__init__()
+        self._id = palette_id
+        self._name = name
+        self.htmlFileURL = html_path
+        self.isVisible = is_visible
+        self.incomingFromHTML = Event("incomingFromHTML")
+        self.closed = Event("closed")
+        self.sent: List[tuple] = []  # (action, data) sent to the page, for inspection
+    
+    @property
+    def id(self) -> str:
+        return self._id
+    
+    @property
+    def name(self) -> str:
+        return self._name
+    
+    def sendInfoToHTML(self, action: str, data: str) -> str:
+        self.sent.append((action, data))
+        return "OK"
+    
+    def deleteMe(self) -> bool:
+        return True
+
+
+@api_class
+class Palettes(Collection):
+    def add(self, id: str, name: str, htmlPath: str, isVisible: bool = True, *args, **kwargs) -> Palette:
+        palette = Palette(id, name, htmlPath, isVisible)
+        self._items.append(palette)
+        return palette
+    
+    def itemById(self, palette_id: str) -> Optional[Palette]:
+        for palette in self._items:
+            if palette._id == palette_id:
+                return palette
+        return None
+
+
+@api_class
+class UserInterface(Base):
+    def __init__(self, app: "Application"):
+        super().__init__()
+        self._app = app
+        self._selections = Selections(self)
+        self._workspaces = Workspaces([
+            Workspace("FusionSolidEnvironment", "Design", self),
+            Workspace("CAMEnvironment", "Manufacture", self),
+        ])
+        self._active_workspace = self._workspaces.item(0)
+        self._palettes = Palettes()
+        self.activeSelectionChanged = Event("activeSelectionChanged")
+        self.commandTerminated = Event("commandTerminated")
+        self.workspaceActivated = Event("workspaceActivated")
+        self.messages: List[str] = []  # messageBox texts, for inspection
+    
+    @property
+    def activeSelections(self) -> Selections:
+        return self._selections
+    
+    @property
+    def activeWorkspace(self) -> Workspace:
+        return self._active_workspace
+    
+    @property
+    def workspaces(self) -> Workspaces:
+        return self._workspaces
+    
+    @property
+    def palettes(self) -> Palettes:
+        return self._palettes
+    
+    def messageBox(self, text: str, title: str = "", buttons: int = 0, icon: int = 0) -> int:
+        self.messages.append(str(text))
+        return DialogResults.DialogOK
+    
+    def _selection_changed(self):
+        self.activeSelectionChanged._fire(EventArgs(self.activeSelectionChanged))
+
+
+# Application and documents
+
+@api_class
+class Product(Base):
+    def __init__(self, product_type: str):
+        super().__init__()
+        self._product_type = product_type
+    
+    @property
+    def productType(self) -> str:
+        return self._product_type
+
+
+@api_class
+class Products(Collection):
+    def itemByProductType(self, productType: str) -> Optional[Product]:
+        for product in self._items:
+            if product._product_type == productType:
+                return product
+        return None
+
+
+@api_class
+class Document(Base):
+    def __init__(self, app: "Application", name: str):
+        super().__init__()
+        self._app = app
+        self._name = name
+        self._products = Products()
+        self.isModified = False
+    
+    @property
+    def name(self) -> str:
+        return self._name
+    
+    @name.setter
+    def name(self, value: str):
+        self._name = value
+    
+    @property
+    def dataFile(self):
+        return None  # Offline documents are never saved to the cloud
+    
+    @property
+    def products(self) -> Products:
+        return self._products
+    
+    @property
+    def isActive(self) -> bool:
+        return self._app._active_document is self
+    
+    def activate(self) -> bool:
+        self._app._activate(self)
+        return True
+    
+    def close(self, saveChanges: bool = False) -> bool:
+        self._app._close(self)
+        return True
+
+
+@api_class
+class Documents(Collection):
+    def __init__(self, app: "Application"):
+        super().__init__()
+        self._app = app
+    
+    def add(self, documentType: int = DocumentTypes.FusionDesignDocumentType, visible: bool = True):
+        from .fusion import FusionDocument
+        
+        document = FusionDocument(self._app, f"Untitled({len(self._items) + 1})")
+        self._items.append(document)
+        self._app._activate(document)
+        return document
+
+
+@api_class
+class Application(Base):
+    """The fake session; Application.get() returns the installed one"""
+    
+    _instance: Optional["Application"] = None
+    
+    def __init__(self):
+        super().__init__()
+        self._ui = UserInterface(self)
+        self._documents = Documents(self)
+        self._active_document = None
+        self._custom_events = {}
+        self.documentActivated = Event("documentActivated")
+        self.documentClosed = Event("documentClosed")
+    
+    @staticmethod
+    def get() -> Optional["Application"]:
+        return Application._instance
+    
+    @property
+    def userInterface(self) -> UserInterface:
+        return self._ui
+    
+    @property
+    def documents(self) -> Documents:
+        return self._documents
+    
+    @property
+    def activeDocument(self):
+        return self._active_document
+    
+    @property
+    def activeProduct(self):
+        document = self._active_document
+        if document is None:
+            return None
+        return document._products._items[0] if document._products._items else None
+    
+    def registerCustomEvent(self, eventId: str) -> Event:
+        event = self._custom_events.get(eventId)
+        if event is None:
+            event = self._custom_events[eventId] = Event(eventId)
+        return event
+    
+    def unregisterCustomEvent(self, eventId: str) -> bool:
+        return self._custom_events.pop(eventId, None) is not None
+    
+    def fireCustomEvent(self, eventId: str, additionalInfo: str = "") -> bool:
+        event = self._custom_events.get(eventId)
+        if event is None:
+            return False
+        event._fire(CustomEventArgs(additionalInfo, event))
+        return True
+    
+    def _activate(self, document):
+        if self._active_document is document:
+            return
+        self._active_document = document
+        self.documentActivated._fire(EventArgs(self.documentActivated, document=document))
+    
+    def _close(self, document):
+        if document in self._documents._items:
+            self._documents._items.remove(document)
+        if self._active_document is document:
+            self._active_document = self._documents.item(self._documents.count - 1)
+        self.documentClosed._fire(EventArgs(self.documentClosed, document=document))
@@ -0,0 +1,1345 @@
+"""
+Fake adsk.fusion - Design, parameters, timeline, components, sketches,
+features and B-Rep
+"""
+
+import ast
+import math
+import re
+from typing import Dict, List, Optional, Set
+
+from ._api import Base, Collection, api_class
+from .core import (BoundingBox3D, Curve3DTypes, Document, Matrix3D, Point3D, Product, SurfaceTypes, ValueInput,
+                   Vector3D)
+
+
+DESIGN_PRODUCT_TYPE = "DesignProductType"
+
+# Internal length unit is cm, angles are radians (as in Fusion)
+UNIT_SCALE = {"mm": 0.1, "cm": 1.0, "m": 100.0, "in": 2.54, "ft": 30.48, "deg": 0.017453292519943295, "rad": 1.0}
+
+_TOKEN = re.compile(
+    r"\s*(?:(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*(?P<unit>mm|cm|m|in|ft|deg|rad)?(?![A-Za-z_])"
+    r"|(?P<name>[A-Za-z_]\w*)|(?P<op>\*\*|[-+*/%()^]))"
+)
+_ALLOWED_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Add, ast.Sub, ast.Mult,
+                  ast.Div, ast.Mod, ast.Pow, ast.USub, ast.UAdd)
+
+
+# Enums
+
+class FeatureOperations:
+    JoinFeatureOperation = 0
+    CutFeatureOperation = 1
+    IntersectFeatureOperation = 2
+    NewBodyFeatureOperation = 3
+    NewComponentFeatureOperation = 4
+
+
+class DimensionOrientations:
+    AlignedDimensionOrientation = 0
+    HorizontalDimensionOrientation = 1
+    VerticalDimensionOrientation = 2
+
+
+class ExtentDirections:
+    PositiveExtentDirection = 0
+    NegativeExtentDirection = 1
+    SymmetricExtentDirection = 2
+
+
+class DesignTypes:
+    DirectDesignType = 0
+    ParametricDesignType = 1
+
+
+def _expression_refs(expression: str) -> Set[str]:
+    return {match.group("name") for match in _TOKEN.finditer(expression) if match.group("name")}
+
+
+# Parameters
+
+@api_class
+class Parameter(Base):
+    def __init__(self, design: "Design", name: str, expression: str, unit: str, comment: str = ""):
+        super().__init__()
+        self._design = design
+        self._name = name
+        self._unit = unit
+        self._comment = comment
+        self._expression = ""
+        self._refs: Set[str] = set()
+        self._value = 0.0
+        self._set_expression(expression)
+    
+    @property
+    def name(self) -> str:
+        return self._name
+    
+    @property
+    def unit(self) -> str:
+        return self._unit
+    
+    @property
+    def comment(self) -> str:
+        return self._comment
+    
+    @comment.setter
+    def comment(self, value: str):
+        self._comment = value
+    
+    @property
+    def expression(self) -> str:
+        return self._expression
+    
+    @expression.setter
+    def expression(self, value: str):
+        self._set_expression(value)
+        self._design._parameter_changed(self)
+    
+    @property
+    def value(self) -> float:
+        return self._value
+    
+    @value.setter
+    def value(self, value: float):
+        scale = UNIT_SCALE.get(self._unit, 1.0)
+        self.expression = f"{value / scale:g} {self._unit}".strip()
+    
+    @property
+    def dependentParameters(self) -> "ParameterList":
+        return ParameterList([p for p in self._design._parameters() if self._name in p._refs])
+    
+    def _set_expression(self, expression: str):
+        expression = str(expression)
+        value = self._design._units._evaluate(expression, self._unit, exclude=self._name)
+        self._expression = expression
+        self._refs = _expression_refs(expression)
+        self._value = value
+    
+    def _reevaluate(self):
+        self._value = self._design._units._evaluate(self._expression, self._unit, exclude=self._name)
+
+
+@api_class
+class UserParameter(Parameter):
+    def deleteMe(self) -> bool:
+        if any(self._name in p._refs for p in self._design._parameters()):
+            return False  # Still referenced, as in Fusion
+        self._design._user_parameters._items.remove(self)
+        self._design._parameters_by_name.pop(self._name, None)
+        return True
+
+
+@api_class
+class ModelParameter(Parameter):
+    pass
+
+
+@api_class
+class ParameterList(Collection):
+    pass
+
+
+@api_class
+class UserParameters(Collection):
+    def __init__(self, design: "Design"):
+        super().__init__()
+        self._design = design
+    
+    def itemByName(self, name: str) -> Optional[UserParameter]:
+        parameter = self._design._parameters_by_name.get(name)
+        return parameter if isinstance(parameter, UserParameter) else None
+    
+    def add(self, name: str, value: ValueInput, units: str, comment: str = "") -> UserParameter:
+        if self._design._find_parameter(name) is not None:
+            raise RuntimeError(f"3 : A parameter named {name} already exists")
+        if value._text is None:  # Real values are in internal units
+            expression = f"{value._real / UNIT_SCALE.get(units, 1.0):g} {units}".strip()
+        else:
+            expression = value._text
+        parameter = UserParameter(self._design, name, expression, units, comment)
+        self._items.append(parameter)
+        self._design._parameters_by_name[name] = parameter
+        return parameter
+
+
+@api_class
+class FusionUnitsManager(Base):
+    def __init__(self, design: "Design", length_units: str = "mm"):
+        super().__init__()
+        self._design = design
+        self._length_units = length_units
+    
+    @property
+    def defaultLengthUnits(self) -> str:
+        return self._length_units
+    
+    @property
+    def distanceDisplayUnits(self) -> str:
+        return self._length_units
+    
+    def evaluateExpression(self, expression: str, units: str = "") -> float:
+        return self._evaluate(expression, units or self._length_units)
+    
+    def convert(self, valueInInputUnits: float, inputUnits: str, outputUnits: str) -> float:
+        return valueInInputUnits * UNIT_SCALE.get(inputUnits, 1.0) / UNIT_SCALE.get(outputUnits, 1.0)
+    
+    def _evaluate(self, expression: str, units: str, exclude: Optional[str] = None) -> float:
+        """Arithmetic over numbers with units and parameter names, in internal units"""
+        parts = []
+        position = 0
+        expression = expression.strip()
+        while position < len(expression):
+            match = _TOKEN.match(expression, position)
+            if match is None or match.end() == position:
+                raise RuntimeError(f"3 : Invalid expression: {expression}")
+            position = match.end()
+            if match.group("number"):
+                unit = match.group("unit") or units
+                parts.append(repr(float(match.group("number")) * UNIT_SCALE.get(unit, 1.0)))
+            elif match.group("name"):
+                name = match.group("name")
+                parameter = self._design._find_parameter(name) if name != exclude else None
+                if parameter is None:
+                    raise RuntimeError(f"3 : Unknown parameter in expression: {name}")
+                parts.append(repr(parameter._value))
+            else:
+                op = match.group("op")
+                parts.append("**" if op == "^" else op)
+        if not parts:
+            raise RuntimeError("3 : Empty expression")
+        try:
+            tree = ast.parse(" ".join(parts), mode="eval")
+            if not all(isinstance(node, _ALLOWED_NODES) for node in ast.walk(tree)):
+                raise ValueError(expression)
+            return float(eval(compile(tree, "<expression>", "eval"), {"__builtins__": {}}))
+        except (SyntaxError, ValueError, ZeroDivisionError):
+            raise RuntimeError(f"3 : Invalid expression: {expression}")
+
+
+# Timeline
+
+@api_class
+class TimelineObject(Base):
+    def __init__(self, timeline: "Timeline", entity):
+        super().__init__()
+        self._timeline = timeline
+        self._entity = entity
+        self.isSuppressed = False
+    
+    @property
+    def name(self) -> str:
+        return getattr(self._entity, "_name", "")
+    
+    @property
+    def entity(self):
+        return self._entity
+    
+    @property
+    def index(self) -> int:
+        return self._timeline._items.index(self)
+    
+    def rollTo(self, rollBefore: bool) -> bool:
+        self._timeline._marker = self.index + (0 if rollBefore else 1)
+        return True
+
+
+@api_class
+class Timeline(Collection):
+    def __init__(self, design: "Design"):
+        super().__init__()
+        self._design = design
+        self._marker = 0
+    
+    @property
+    def markerPosition(self) -> int:
+        return self._marker
+    
+    @markerPosition.setter
+    def markerPosition(self, value: int):
+        self._marker = max(0, min(int(value), len(self._items)))
+    
+    def moveToEnd(self) -> bool:
+        self._marker = len(self._items)
+        return True
+    
+    def deleteAllAfterMarker(self) -> bool:
+        removed = self._items[self._marker:]
+        del self._items[self._marker:]
+        for timeline_object in reversed(removed):
+            timeline_object._entity._remove()
+        return True
+    
+    def _append(self, entity) -> TimelineObject:
+        timeline_object = TimelineObject(self, entity)
+        self._items.append(timeline_object)
+        self._marker = len(self._items)
+        self._design._feature_added()
+        return timeline_object
+
+
+# B-Rep
+
+@api_class
+class Plane(Base):
+    def __init__(self, origin: Point3D, normal: Vector3D):
+        super().__init__()
+        self._origin = origin
+        self._normal = normal
+    
+    @property
+    def surfaceType(self) -> int:
+        return SurfaceTypes.PlaneSurfaceType
+    
+    @property
+    def origin(self) -> Point3D:
+        return Point3D(*self._origin._xyz)
+    
+    @property
+    def normal(self) -> Vector3D:
+        return Vector3D(*self._normal._xyz)
+
+
+@api_class
+class Line3D(Base):
+    def __init__(self, start: Point3D, end: Point3D):
+        super().__init__()
+        self._start = start
+        self._end = end
+    
+    @property
+    def curveType(self) -> int:
+        return Curve3DTypes.Line3DCurveType
+    
+    @property
+    def startPoint(self) -> Point3D:
+        return Point3D(*self._start._xyz)
+    
+    @property
+    def endPoint(self) -> Point3D:
+        return Point3D(*self._end._xyz)
+
+
+@api_class
+class SurfaceEvaluator(Base):
+    def __init__(self, face: "BRepFace"):
+        super().__init__()
+        self._face = face
+    
+    def getNormalAtPoint(self, point: Point3D):
+        return True, Vector3D(*self._face._normal)
+
+
+@api_class
+class BRepFace(Base):
+    def __init__(self, body: "BRepBody", low: tuple, high: tuple, normal: tuple):
+        super().__init__()
+        self._body = body
+        self._low = low
+        self._high = high
+        self._normal = normal
+    
+    @property
+    def body(self) -> "BRepBody":
+        return self._body
+    
+    @property
+    def area(self) -> float:
+        sizes = sorted(h - l for l, h in zip(self._low, self._high))
+        return sizes[1] * sizes[2]
+    
+    @property
+    def boundingBox(self) -> BoundingBox3D:
+        return BoundingBox3D(Point3D(*self._low), Point3D(*self._high))
+    
+    @property
+    def centroid(self) -> Point3D:
+        return Point3D(*((l + h) / 2 for l, h in zip(self._low, self._high)))
+    
+    @property
+    def pointOnFace(self) -> Point3D:
+        return Point3D(*((l + h) / 2 for l, h in zip(self._low, self._high)))
+    
+    @property
+    def evaluator(self) -> SurfaceEvaluator:
+        return SurfaceEvaluator(self)
+    
+    @property
+    def geometry(self) -> Plane:
+        return Plane(Point3D(*self._low), Vector3D(*self._normal))
+    
+    @property
+    def edges(self) -> "BRepEdges":
+        return BRepEdges([edge for edge in self._body._edges if self in edge._faces])
+
+
+@api_class
+class BRepEdge(Base):
+    def __init__(self, body: "BRepBody", start: tuple, end: tuple, faces: List[BRepFace]):
+        super().__init__()
+        self._body = body
+        self._start = start
+        self._end = end
+        self._faces = faces
+    
+    @property
+    def body(self) -> "BRepBody":
+        return self._body
+    
+    @property
+    def length(self) -> float:
+        return math.dist(self._start, self._end)
+    
+    @property
+    def boundingBox(self) -> BoundingBox3D:
+        low = tuple(map(min, self._start, self._end))
+        high = tuple(map(max, self._start, self._end))
+        return BoundingBox3D(Point3D(*low), Point3D(*high))
+    
+    @property
+    def geometry(self) -> Line3D:
+        return Line3D(Point3D(*self._start), Point3D(*self._end))
+    
+    @property
+    def faces(self) -> "BRepFaces":
+        return BRepFaces(self._faces)
+
+
+@api_class
+class BRepFaces(Collection):
+    pass
+
+
+@api_class
+class BRepEdges(Collection):
+    pass
+
+
+@api_class
+class BRepBody(Base):
+    """An axis-aligned box: 6 faces, 12 edges"""
+    
+    def __init__(self, component: "Component", name: str, low: tuple, high: tuple):
+        super().__init__()
+        self._component = component
+        self._name = name
+        self._low = tuple(map(min, low, high))
+        self._high = tuple(map(max, low, high))
+        self._faces: List[BRepFace] = []
+        self._edges: List[BRepEdge] = []
+        self._build()
+    
+    def _build(self):
+        low, high = self._low, self._high
+        faces = {}
+        for axis in range(3):
+            for side, bound in ((-1, low), (1, high)):
+                face_low = list(low)
+                face_high = list(high)
+                face_low[axis] = face_high[axis] = bound[axis]
+                normal = [0.0, 0.0, 0.0]
+                normal[axis] = float(side)
+                faces[(axis, side)] = BRepFace(self, tuple(face_low), tuple(face_high), tuple(normal))
+        self._faces = list(faces.values())
+        for axis in range(3):
+            others = [a for a in range(3) if a != axis]
+            for side_a in (-1, 1):
+                for side_b in (-1, 1):
+                    start = list(low)
+                    for other, side in zip(others, (side_a, side_b)):
+                        start[other] = (high if side > 0 else low)[other]
+                    end = list(start)
+                    end[axis] = high[axis]
+                    edge_faces = [faces[(others[0], side_a)], faces[(others[1], side_b)]]
+                    self._edges.append(BRepEdge(self, tuple(start), tuple(end), edge_faces))
+    
+    @property
+    def name(self) -> str:
+        return self._name
+    
+    @name.setter
+    def name(self, value: str):
+        self._name = value
+    
+    @property
+    def parentComponent(self) -> "Component":
+        return self._component
+    
+    @property
+    def isSolid(self) -> bool:
+        return True
+    
+    @property
+    def volume(self) -> float:
+        x, y, z = (h - l for l, h in zip(self._low, self._high))
+        return x * y * z
+    
+    @property
+    def area(self) -> float:
+        x, y, z = (h - l for l, h in zip(self._low, self._high))
+        return 2 * (x * y + y * z + x * z)
+    
+    @property
+    def boundingBox(self) -> BoundingBox3D:
+        return BoundingBox3D(Point3D(*self._low), Point3D(*self._high))
+    
+    @property
+    def faces(self) -> BRepFaces:
+        return BRepFaces(self._faces)
+    
+    @property
+    def edges(self) -> BRepEdges:
+        return BRepEdges(self._edges)
+    
+    def deleteMe(self) -> bool:
+        self._remove()
+        return True
+    
+    def _remove(self):
+        if self in self._component._bodies._items:
+            self._component._bodies._items.remove(self)
+
+
+@api_class
+class BRepBodies(Collection):
+    pass
+
+
+# Sketches
+
+@api_class
+class ConstructionPlane(Base):
+    def __init__(self, component: "Component", name: str, normal: tuple):
+        super().__init__()
+        self._component = component
+        self._name = name
+        self._normal = normal
+    
+    @property
+    def name(self) -> str:
+        return self._name
+    
+    @property
+    def component(self) -> "Component":
+        return self._component
+    
+    @property
+    def geometry(self) -> Plane:
+        return Plane(Point3D(), Vector3D(*self._normal))
+
+
+@api_class
+class SketchPoint(Base):
+    def __init__(self, sketch: "Sketch", point: Point3D):
+        super().__init__()
+        self._sketch = sketch
+        self._point = Point3D(*point._xyz)
+    
+    @property
+    def geometry(self) -> Point3D:
+        return Point3D(*self._point._xyz)
+    
+    @property
+    def parentSketch(self) -> "Sketch":
+        return self._sketch
+
+
+@api_class
+class SketchLine(Base):
+    def __init__(self, sketch: "Sketch", start: SketchPoint, end: SketchPoint):
+        super().__init__()
+        self._sketch = sketch
+        self._start = start
+        self._end = end
+    
+    @property
+    def startSketchPoint(self) -> SketchPoint:
+        return self._start
+    
+    @property
+    def endSketchPoint(self) -> SketchPoint:
+        return self._end
+    
+    @property
+    def length(self) -> float:
+        return math.dist(self._start._point._xyz, self._end._point._xyz)
+    
+    @property
+    def parentSketch(self) -> "Sketch":
+        return self._sketch
+    
+    def deleteMe(self) -> bool:
+        self._sketch._lines._items.remove(self)
+        return True
+
+
+@api_class
+class SketchLineList(Collection):
+    pass
+
+
+@api_class
+class SketchCircle(Base):
+    def __init__(self, sketch: "Sketch", center: SketchPoint, radius: float):
+        super().__init__()
+        self._sketch = sketch
+        self._center = center
+        self._radius = radius
+    
+    @property
+    def centerSketchPoint(self) -> SketchPoint:
+        return self._center
+    
+    @property
+    def radius(self) -> float:
+        return self._radius
+    
+    @property
+    def parentSketch(self) -> "Sketch":
+        return self._sketch
+
+
+@api_class
+class Profile(Base):
+    def __init__(self, sketch: "Sketch", low: tuple, high: tuple):
+        super().__init__()
+        self._sketch = sketch
+        self._low = low
+        self._high = high
+    
+    @property
+    def parentSketch(self) -> "Sketch":
+        return self._sketch
+    
+    @property
+    def boundingBox(self) -> BoundingBox3D:
+        return BoundingBox3D(Point3D(*self._low), Point3D(*self._high))
+
+
+@api_class
+class Profiles(Collection):
+    pass
+
+
+def _as_point(sketch: "Sketch", point) -> SketchPoint:
+    if isinstance(point, SketchPoint):
+        return point
+    if isinstance(point, Point3D):
+        return SketchPoint(sketch, point)
+    raise RuntimeError("3 : Expected a Point3D or SketchPoint")
+
+
+@api_class
+class SketchLines(Collection):
+    def __init__(self, sketch: "Sketch"):
+        super().__init__()
+        self._sketch = sketch
+    
+    def addByTwoPoints(self, startPoint, endPoint) -> SketchLine:
+        line = SketchLine(self._sketch, _as_point(self._sketch, startPoint), _as_point(self._sketch, endPoint))
+        self._items.append(line)
+        self._sketch._chain_line(line)
+        return line
+    
+    def addTwoPointRectangle(self, pointOne, pointTwo) -> SketchLineList:
+        return self._rectangle(_as_point(self._sketch, pointOne)._point._xyz,
+                               _as_point(self._sketch, pointTwo)._point._xyz)
+    
+    def addCenterPointRectangle(self, centerPoint, cornerPoint) -> SketchLineList:
+        cx, cy, _ = _as_point(self._sketch, centerPoint)._point._xyz
+        x, y, z = _as_point(self._sketch, cornerPoint)._point._xyz
+        return self._rectangle((2 * cx - x, 2 * cy - y, z), (x, y, z))
+    
+    def _rectangle(self, one, two) -> SketchLineList:
+        (ax, ay, az), (cx, cy, _) = one, two
+        corners = [Point3D(ax, ay, az), Point3D(cx, ay, az), Point3D(cx, cy, az), Point3D(ax, cy, az)]
+        points = [SketchPoint(self._sketch, corner) for corner in corners]
+        lines = [SketchLine(self._sketch, points[i], points[(i + 1) % 4]) for i in range(4)]
+        self._items.extend(lines)
+        self._sketch._add_profile(corners)
+        return SketchLineList(lines)
+
+
+@api_class
+class SketchCircles(Collection):
+    def __init__(self, sketch: "Sketch"):
+        super().__init__()
+        self._sketch = sketch
+    
+    def addByCenterRadius(self, centerPoint, radius: float) -> SketchCircle:
+        center = _as_point(self._sketch, centerPoint)
+        circle = SketchCircle(self._sketch, center, float(radius))
+        self._items.append(circle)
+        x, y, z = center._point._xyz
+        self._sketch._add_profile([Point3D(x - radius, y - radius, z), Point3D(x + radius, y + radius, z)])
+        return circle
+
+
+@api_class
+class SketchCurves(Base):
+    def __init__(self, sketch: "Sketch"):
+        super().__init__()
+        self._sketch = sketch
+    
+    @property
+    def sketchLines(self) -> SketchLines:
+        return self._sketch._lines
+    
+    @property
+    def sketchCircles(self) -> SketchCircles:
+        return self._sketch._circles
+    
+    @property
+    def count(self) -> int:
+        return len(self._sketch._lines._items) + len(self._sketch._circles._items)
+
+
+@api_class
+class SketchLinearDimension(Base):
+    def __init__(self, parameter: ModelParameter):
+        super().__init__()
+        self._parameter = parameter
+    
+    @property
+    def parameter(self) -> ModelParameter:
+        return self._parameter
+    
+    @property
+    def value(self) -> float:
+        return self._parameter._value
+
+
+@api_class
+class SketchDimensions(Collection):
+    def __init__(self, sketch: "Sketch"):
+        super().__init__()
+        self._sketch = sketch
+    
+    def addDistanceDimension(self, pointOne, pointTwo, orientation: int, textPoint: Point3D,
+                             isDriving: bool = True) -> SketchLinearDimension:
+        a = _as_point(self._sketch, pointOne)._point._xyz
+        b = _as_point(self._sketch, pointTwo)._point._xyz
+        if orientation == DimensionOrientations.HorizontalDimensionOrientation:
+            distance = abs(b[0] - a[0])
+        elif orientation == DimensionOrientations.VerticalDimensionOrientation:
+            distance = abs(b[1] - a[1])
+        else:
+            distance = math.dist(a, b)
+        design = self._sketch._component._design
+        dimension = SketchLinearDimension(design._model_parameter(distance))
+        self._items.append(dimension)
+        return dimension
+    
+    def addDiameterDimension(self, entity: SketchCircle, textPoint: Point3D,
+                             isDriving: bool = True) -> SketchLinearDimension:
+        design = self._sketch._component._design
+        dimension = SketchLinearDimension(design._model_parameter(2 * entity._radius))
+        self._items.append(dimension)
+        return dimension
+
+
+@api_class
+class Sketch(Base):
+    def __init__(self, component: "Component", name: str, plane):
+        super().__init__()
+        self._component = component
+        self._name = name
+        self._plane = plane
+        self._lines = SketchLines(self)
+        self._circles = SketchCircles(self)
+        self._profiles = Profiles()
+        self._dimensions = SketchDimensions(self)
+        self._chain: List[SketchLine] = []
+        self.isVisible = True
+    
+    @property
+    def name(self) -> str:
+        return self._name
+    
+    @name.setter
+    def name(self, value: str):
+        self._name = value
+    
+    @property
+    def parentComponent(self) -> "Component":
+        return self._component
+    
+    @property
+    def referencePlane(self):
+        return self._plane
+    
+    @property
+    def sketchCurves(self) -> SketchCurves:
+        return SketchCurves(self)
+    
+    @property
+    def profiles(self) -> Profiles:
+        return self._profiles
+    
+    @property
+    def sketchDimensions(self) -> SketchDimensions:
+        return self._dimensions
+    
+    def deleteMe(self) -> bool:
+        self._remove()
+        return True
+    
+    def _remove(self):
+        if self in self._component._sketches._items:
+            self._component._sketches._items.remove(self)
+    
+    def _chain_line(self, line: SketchLine):
+        """Lines drawn end to end form a profile once the loop closes"""
+        if self._chain and math.dist(self._chain[-1]._end._point._xyz, line._start._point._xyz) > 1e-9:
+            self._chain = []
+        self._chain.append(line)
+        if len(self._chain) >= 3 and math.dist(line._end._point._xyz, self._chain[0]._start._point._xyz) <= 1e-9:
+            self._add_profile([segment._start._point for segment in self._chain])
+            self._chain = []
+    
+    def _add_profile(self, points: List[Point3D]):
+        low = tuple(min(p._xyz[axis] for p in points) for axis in range(3))
+        high = tuple(max(p._xyz[axis] for p in points) for axis in range(3))
+        self._profiles._items.append(Profile(self, low, high))
+
+
+@api_class
+class Sketches(Collection):
+    def __init__(self, component: "Component"):
+        super().__init__()
+        self._component = component
+    
+    def add(self, planarEntity) -> Sketch:
+        sketch = Sketch(self._component, f"Sketch{self._component._design._next_name('Sketch')}", planarEntity)
+        self._items.append(sketch)
+        self._component._design._timeline._append(sketch)
+        return sketch
+
+
+# Features
+
+@api_class
+class Feature(Base):
+    def __init__(self, component: "Component", name: str, collection: "FeatureCollection"):
+        super().__init__()
+        self._component = component
+        self._name = name
+        self._collection = collection
+        self._bodies: List[BRepBody] = []
+        self._timeline_object: Optional[TimelineObject] = None
+    
+    @property
+    def name(self) -> str:
+        return self._name
+    
+    @name.setter
+    def name(self, value: str):
+        self._name = value
+    
+    @property
+    def parentComponent(self) -> "Component":
+        return self._component
+    
+    @property
+    def bodies(self) -> BRepBodies:
+        return BRepBodies(self._bodies)
+    
+    @property
+    def timelineObject(self) -> Optional[TimelineObject]:
+        return self._timeline_object
+    
+    @property
+    def healthState(self) -> int:
+        return 0  # HealthyFeatureHealthState
+    
+    def deleteMe(self) -> bool:
+        timeline = self._component._design._timeline
+        if self._timeline_object in timeline._items:
+            timeline._items.remove(self._timeline_object)
+            timeline._marker = min(timeline._marker, len(timeline._items))
+        self._remove()
+        return True
+    
+    def _remove(self):
+        for body in self._bodies:
+            body._remove()
+        if self in self._collection._items:
+            self._collection._items.remove(self)
+
+
+@api_class
+class FeatureCollection(Collection):
+    kind = "Feature"
+    
+    def __init__(self, component: "Component"):
+        super().__init__()
+        self._component = component
+    
+    def _add(self, feature_class, bodies: List[BRepBody] = ()) -> Feature:
+        design = self._component._design
+        feature = feature_class(self._component, f"{self.kind}{design._next_name(self.kind)}", self)
+        feature._bodies = list(bodies)
+        self._items.append(feature)
+        feature._timeline_object = design._timeline._append(feature)
+        return feature
+
+
+@api_class
+class ExtrudeFeatureInput(Base):
+    def __init__(self, profile: Profile, operation: int):
+        super().__init__()
+        self.profile = profile
+        self.operation = operation
+        self.isSolid = True
+        self._distance: Optional[ValueInput] = None
+        self._symmetric = False
+    
+    def setDistanceExtent(self, isSymmetric: bool, distance: ValueInput) -> bool:
+        self._symmetric = bool(isSymmetric)
+        self._distance = distance
+        return True
+
+
+@api_class
+class ExtrudeFeature(Feature):
+    pass
+
+
+@api_class
+class ExtrudeFeatures(FeatureCollection):
+    kind = "Extrude"
+    
+    def createInput(self, profile: Profile, operation: int) -> ExtrudeFeatureInput:
+        return ExtrudeFeatureInput(profile, operation)
+    
+    def addSimple(self, profile: Profile, distance: ValueInput, operation: int) -> ExtrudeFeature:
+        extrude_input = ExtrudeFeatureInput(profile, operation)
+        extrude_input.setDistanceExtent(False, distance)
+        return self.add(extrude_input)
+    
+    def add(self, input: ExtrudeFeatureInput) -> ExtrudeFeature:
+        if not isinstance(input.profile, Profile) or input._distance is None:
+            raise RuntimeError("3 : The extrude input needs a profile and an extent")
+        design = self._component._design
+        distance = input._distance
+        if distance._text is None:
+            height = distance._real
+        else:
+            height = design._model_parameter(None, distance._text)._value
+        bodies = []
+        if input.operation in (FeatureOperations.NewBodyFeatureOperation, FeatureOperations.JoinFeatureOperation):
+            low, high = list(input.profile._low), list(input.profile._high)
+            low[2], high[2] = (low[2] - height / 2, low[2] + height / 2) if input._symmetric else (low[2], low[2] + height)
+            body = BRepBody(self._component, f"Body{design._next_name('Body')}", tuple(low), tuple(high))
+            self._component._bodies._items.append(body)
+            bodies.append(body)
+        return self._add(ExtrudeFeature, bodies)
+
+
+@api_class
+class EdgeSetInputs(Base):
+    """Edge sets of a fillet or chamfer input"""
+    
+    def __init__(self):
+        super().__init__()
+        self._edges: List[BRepEdge] = []
+        self._values: List[ValueInput] = []
+    
+    @property
+    def count(self) -> int:
+        return len(self._values)
+    
+    def _add(self, edges, value: ValueInput):
+        self._edges.extend(edges)
+        self._values.append(value)
+        return self
+
+
+@api_class
+class FilletEdgeSetInputs(EdgeSetInputs):
+    def addConstantRadiusEdgeSet(self, entities, radius: ValueInput, isTangentChain: bool):
+        return self._add(entities, radius)
+
+
+@api_class
+class ChamferEdgeSets(EdgeSetInputs):
+    def addEqualDistanceChamferEdgeSet(self, edges, distance: ValueInput, isTangentChain: bool):
+        return self._add(edges, distance)
+
+
+@api_class
+class FilletFeatureInput(Base):
+    def __init__(self):
+        super().__init__()
+        self._edge_sets = FilletEdgeSetInputs()
+    
+    @property
+    def edgeSetInputs(self) -> FilletEdgeSetInputs:
+        return self._edge_sets
+
+
+@api_class
+class ChamferFeatureInput(Base):
+    def __init__(self):
+        super().__init__()
+        self._edge_sets = ChamferEdgeSets()
+    
+    @property
+    def chamferEdgeSets(self) -> ChamferEdgeSets:
+        return self._edge_sets
+
+
+@api_class
+class FilletFeature(Feature):
+    pass
+
+
+@api_class
+class ChamferFeature(Feature):
+    pass
+
+
+def _edge_feature(collection: FeatureCollection, edge_sets: EdgeSetInputs, feature_class) -> Feature:
+    if not edge_sets._edges:
+        raise RuntimeError("3 : No edges to modify")
+    for value in edge_sets._values:
+        if value._text is not None:
+            collection._component._design._units._evaluate(value._text, "mm")
+    return collection._add(feature_class)
+
+
+@api_class
+class FilletFeatures(FeatureCollection):
+    kind = "Fillet"
+    
+    def createInput(self) -> FilletFeatureInput:
+        return FilletFeatureInput()
+    
+    def add(self, input: FilletFeatureInput) -> FilletFeature:
+        return _edge_feature(self, input._edge_sets, FilletFeature)
+
+
+@api_class
+class ChamferFeatures(FeatureCollection):
+    kind = "Chamfer"
+    
+    def createInput2(self) -> ChamferFeatureInput:
+        return ChamferFeatureInput()
+    
+    def add(self, input: ChamferFeatureInput) -> ChamferFeature:
+        return _edge_feature(self, input._edge_sets, ChamferFeature)
+
+
+@api_class
+class Features(Base):
+    def __init__(self, component: "Component"):
+        super().__init__()
+        self._extrudes = ExtrudeFeatures(component)
+        self._fillets = FilletFeatures(component)
+        self._chamfers = ChamferFeatures(component)
+    
+    @property
+    def extrudeFeatures(self) -> ExtrudeFeatures:
+        return self._extrudes
+    
+    @property
+    def filletFeatures(self) -> FilletFeatures:
+        return self._fillets
+    
+    @property
+    def chamferFeatures(self) -> ChamferFeatures:
+        return self._chamfers
+    
+    @property
+    def count(self) -> int:
+        return len(self._extrudes._items) + len(self._fillets._items) + len(self._chamfers._items)
+
+
+# Components and occurrences
+
+@api_class
+class Occurrence(Base):
+    def __init__(self, parent: "Component", component: "Component", name: str, transform: Matrix3D):
+        super().__init__()
+        self._parent = parent
+        self._component = component
+        self._name = name
+        self._transform = transform
+        self.isVisible = True
+    
+    @property
+    def name(self) -> str:
+        return self._name
+    
+    @property
+    def component(self) -> "Component":
+        return self._component
+    
+    @property
+    def childOccurrences(self) -> "Occurrences":
+        return self._component._occurrences
+    
+    @property
+    def transform(self) -> Matrix3D:
+        return self._transform
+    
+    @property
+    def boundingBox(self) -> BoundingBox3D:
+        return self._component._bounding_box()
+    
+    def deleteMe(self) -> bool:
+        self._remove()
+        return True
+    
+    def _remove(self):
+        if self in self._parent._occurrences._items:
+            self._parent._occurrences._items.remove(self)
+
+
+@api_class
+class OccurrenceList(Collection):
+    pass
+
+
+@api_class
+class Occurrences(Collection):
+    def __init__(self, component: "Component"):
+        super().__init__()
+        self._component = component
+    
+    @property
+    def asList(self) -> OccurrenceList:
+        return OccurrenceList(self._items)
+    
+    def addNewComponent(self, transform: Matrix3D) -> Occurrence:
+        design = self._component._design
+        component = Component(design, f"Component{design._next_name('Component')}")
+        return self._add_occurrence(component, transform)
+    
+    def addExistingComponent(self, component: "Component", transform: Matrix3D) -> Occurrence:
+        return self._add_occurrence(component, transform)
+    
+    def _add_occurrence(self, component: "Component", transform: Matrix3D, timeline: bool = True) -> Occurrence:
+        design = self._component._design
+        component._instances += 1
+        occurrence = Occurrence(self._component, component, f"{component._name}:{component._instances}", transform)
+        self._items.append(occurrence)
+        if timeline:
+            design._timeline._append(occurrence)
+        return occurrence
+
+
+@api_class
+class Component(Base):
+    def __init__(self, design: "Design", name: str):
+        super().__init__()
+        self._design = design
+        self._name = name
+        self._instances = 0
+        self._occurrences = Occurrences(self)
+        self._sketches = Sketches(self)
+        self._features = Features(self)
+        self._bodies = BRepBodies()
+        self._planes = {
+            "xY": ConstructionPlane(self, "XY", (0.0, 0.0, 1.0)),
+            "xZ": ConstructionPlane(self, "XZ", (0.0, 1.0, 0.0)),
+            "yZ": ConstructionPlane(self, "YZ", (1.0, 0.0, 0.0)),
+        }
+        self._box = None  # Bounding box of components without bodies (synthetic designs)
+        design._components.append(self)
+    
+    @property
+    def name(self) -> str:
+        return self._name
+    
+    @name.setter
+    def name(self, value: str):
+        self._name = value
+    
+    @property
+    def parentDesign(self) -> "Design":
+        return self._design
+    
+    @property
+    def occurrences(self) -> Occurrences:
+        return self._occurrences
+    
+    @property
+    def allOccurrences(self) -> OccurrenceList:
+        found = []
+        stack = list(reversed(self._occurrences._items))
+        while stack:
+            occurrence = stack.pop()
+            found.append(occurrence)
+            stack.extend(reversed(occurrence._component._occurrences._items))
+        return OccurrenceList(found)
+    
+    @property
+    def sketches(self) -> Sketches:
+        return self._sketches
+    
+    @property
+    def features(self) -> Features:
+        return self._features
+    
+    @property
+    def bRepBodies(self) -> BRepBodies:
+        return self._bodies
+    
+    @property
+    def xYConstructionPlane(self) -> ConstructionPlane:
+        return self._planes["xY"]
+    
+    @property
+    def xZConstructionPlane(self) -> ConstructionPlane:
+        return self._planes["xZ"]
+    
+    @property
+    def yZConstructionPlane(self) -> ConstructionPlane:
+        return self._planes["yZ"]
+    
+    @property
+    def boundingBox(self) -> BoundingBox3D:
+        return self._bounding_box()
+    
+    def _bounding_box(self) -> BoundingBox3D:
+        boxes = [(body._low, body._high) for body in self._bodies._items]
+        if self._box is not None:
+            boxes.append(self._box)
+        if not boxes:
+            return BoundingBox3D(Point3D(), Point3D())
+        low = tuple(min(box[0][axis] for box in boxes) for axis in range(3))
+        high = tuple(max(box[1][axis] for box in boxes) for axis in range(3))
+        return BoundingBox3D(Point3D(*low), Point3D(*high))
+
+
+@api_class
+class Components(Collection):
+    pass
+
+
+# Design
+
+@api_class
+class Design(Product):
+    def __init__(self, document: "FusionDocument", length_units: str = "mm"):
+        super().__init__(DESIGN_PRODUCT_TYPE)
+        self._document = document
+        self._components: List[Component] = []
+        self._counters: Dict[str, int] = {}
+        self._units = FusionUnitsManager(self, length_units)
+        self._user_parameters = UserParameters(self)
+        self._model_parameters: List[ModelParameter] = []
+        self._parameters_by_name: Dict[str, Parameter] = {}
+        self._timeline = Timeline(self)
+        self._deferred = False
+        self._pending = 0
+        self.computes = 0  # Recomputes so far, for benchmarks
+        self._root = Component(self, document._name)
+    
+    @property
+    def parentDocument(self) -> "FusionDocument":
+        return self._document
+    
+    @property
+    def designType(self) -> int:
+        return DesignTypes.ParametricDesignType
+    
+    @property
+    def rootComponent(self) -> Component:
+        return self._root
+    
+    @property
+    def activeComponent(self) -> Component:
+        return self._root
+    
+    @property
+    def allComponents(self) -> Components:
+        return Components(self._components)
+    
+    @property
+    def userParameters(self) -> UserParameters:
+        return self._user_parameters
+    
+    @property
+    def allParameters(self) -> ParameterList:
+        return ParameterList(self._parameters())
+    
+    @property
+    def timeline(self) -> Timeline:
+        return self._timeline
+    
+    @property
+    def unitsManager(self) -> FusionUnitsManager:
+        return self._units
+    
+    @property
+    def fusionUnitsManager(self) -> FusionUnitsManager:
+        return self._units
+    
+    @property
+    def isComputeDeferred(self) -> bool:
+        return self._deferred
+    
+    @isComputeDeferred.setter
+    def isComputeDeferred(self, value: bool):
+        was_deferred = self._deferred
+        self._deferred = bool(value)
+        if was_deferred and not self._deferred and self._pending:
+            self._compute()
+    
+    def computeAll(self) -> bool:
+        self._compute()
+        return True
+    
+    def _compute(self):
+        self.computes += 1
+        self._pending = 0
+    
+    def _feature_added(self):
+        self._document.isModified = True
+        if self._deferred:
+            self._pending += 1
+        else:
+            self._compute()
+    
+    def _next_name(self, kind: str) -> int:
+        self._counters[kind] = self._counters.get(kind, 0) + 1
+        return self._counters[kind]
+    
+    def _parameters(self) -> List[Parameter]:
+        return self._user_parameters._items + self._model_parameters
+    
+    def _find_parameter(self, name: str) -> Optional[Parameter]:
+        return self._parameters_by_name.get(name)
+    
+    def _model_parameter(self, value: Optional[float], expression: Optional[str] = None) -> ModelParameter:
+        name = f"d{self._next_name('d')}"
+        if expression is None:
+            expression = f"{value / UNIT_SCALE.get(self._units._length_units, 1.0):g} {self._units._length_units}"
+        parameter = ModelParameter(self, name, expression, self._units._length_units)
+        self._model_parameters.append(parameter)
+        self._parameters_by_name[name] = parameter
+        return parameter
+    
+    def _parameter_changed(self, changed: Parameter):
+        """Re-evaluate everything that depends on a parameter, then recompute"""
+        dirty = {changed._name}
+        for parameter in self._parameters():
+            if parameter is not changed and parameter._refs & dirty:
+                parameter._reevaluate()
+                dirty.add(parameter._name)
+        self._feature_added()
+
+
+@api_class
+class FusionDocument(Document):
+    def __init__(self, app, name: str, length_units: str = "mm"):
+        super().__init__(app, name)
+        self._design = Design(self, length_units)
+        self._products._items.append(self._design)
+    
+    @property
+    def design(self) -> Design:
+        return self._design
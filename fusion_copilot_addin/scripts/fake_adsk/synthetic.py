@@ -0,0 +1,111 @@
+"""
+Synthetic designs - Large fake Fusion documents for load tests
+"""
+
+import math
+import random
+
+from . import cam as fake_cam
+from ._api import state
+from .core import Application, Matrix3D, Selection, ValueInput
+from .fusion import BRepBody, Component, FusionDocument
+
+
+PART_NAMES = ("Bolt", "Nut", "Washer", "Bracket", "Plate", "Spacer", "Pin", "Bearing", "Shaft", "Clip")
+
+
+def build_application(parameters: int = 0, occurrences: int = 0, depth: int = 3, bodies: int = 0,
+                      selected: int = 0, cam: bool = False, name: str = "Synthetic", seed: int = 0) -> Application:
+    """
+    A session with one active design holding:
+    - parameters user parameters; every third one's expression references
+      an earlier parameter, so the dependency graph has chains
+    - occurrences occurrences in a tree depth levels deep: assemblies are
+      unique components, leaves share a small library of parts (as
+      fasteners do in real assemblies)
+    - bodies box bodies in the root component, and the first selected of
+      their faces and edges in the active selection
+    - a CAM product with no setups, if cam
+    
+    Built without charging replayed latency, and with an empty timeline.
+    """
+    latency, state.latency = state.latency, None
+    try:
+        rng = random.Random(seed)
+        app = Application()
+        document = FusionDocument(app, name)
+        if cam:
+            document._products._items.append(fake_cam.CAM())
+        app._documents._items.append(document)
+        app._active_document = document
+        design = document._design
+        
+        _add_parameters(design, parameters, rng)
+        _add_occurrences(design, occurrences, max(1, depth), rng)
+        _add_bodies(design.rootComponent, bodies, rng)
+        _select(app, design.rootComponent, selected)
+        
+        design.computes = 0
+        document.isModified = False
+        return app
+    finally:
+        state.latency = latency
+
+
+def _add_parameters(design, count: int, rng: random.Random):
+    params = design._user_parameters
+    for i in range(count):
+        if i >= 3 and i % 3 == 0:
+            expression = f"P{rng.randrange(i)} * {rng.randint(2, 4)}"
+        else:
+            expression = f"{rng.randint(1, 500)} mm"
+        params.add(f"P{i}", ValueInput.createByString(expression), "mm", f"Synthetic parameter {i}")
+
+
+def _add_occurrences(design, count: int, depth: int, rng: random.Random):
+    if count <= 0:
+        return
+    fan_out = max(2, math.ceil(count ** (1.0 / depth)))
+    parts = []
+    for part_name in PART_NAMES:
+        part = Component(design, part_name)
+        size = rng.uniform(0.5, 5.0)
+        part._box = ((0.0, 0.0, 0.0), (size, size, size))
+        parts.append(part)
+    
+    made = 0
+    level = [design.rootComponent]
+    for current_depth in range(1, depth + 1):
+        leaf_level = current_depth == depth
+        next_level = []
+        for parent in level:
+            for _ in range(fan_out):
+                if made >= count:
+                    return
+                if leaf_level:
+                    component = rng.choice(parts)
+                else:
+                    component = Component(design, f"Assembly{design._next_name('Assembly')}")
+                    next_level.append(component)
+                parent._occurrences._add_occurrence(component, Matrix3D(), timeline=False)
+                made += 1
+        level = next_level
+
+
+def _add_bodies(root, count: int, rng: random.Random):
+    for i in range(count):
+        x, y = rng.uniform(-50, 50), rng.uniform(-50, 50)
+        size = rng.uniform(1, 10)
+        root._bodies._items.append(BRepBody(root, f"Body{i + 1}", (x, y, 0.0), (x + size, y + size, size / 2)))
+
+
+def _select(app, root, count: int):
+    selections = app._ui._selections
+    entities = []
+    for body in root._bodies._items:
+        entities.extend(body._faces)
+        entities.extend(body._edges)
+        if len(entities) >= count:
+            break
+    for entity in entities[:count]:
+        selections._items.append(Selection(entity))
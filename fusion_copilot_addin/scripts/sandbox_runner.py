@@ -2,62 +2,295 @@
 Sandbox Runner - Utilities for isolated code execution
 """
 
+import itertools
+import json
+import os
+import queue
+import subprocess
 import sys
-from io import StringIO
-from typing import Dict, Any, Tuple
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List, Optional
 
+from config import SANDBOX_CONFIG
 
-class SandboxRunner:
+
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+# Exit code of a worker that went over its memory limit
+MEMORY_EXIT_CODE = 3
+
+
+def _python_executable() -> str:
     """
-    Run code in an isolated sandbox environment.
-    Captures output, exceptions, and execution time.
+    Interpreter for worker processes. Inside Fusion sys.executable is
+    Fusion itself, so look for the bundled interpreter under sys.prefix.
     """
+    configured = SANDBOX_CONFIG.get("python_executable")
+    if configured:
+        return configured
+    executable = sys.executable or ""
+    if os.path.basename(executable).lower().startswith("python"):
+        return executable
+    for candidate in ("python.exe", "python3.exe", os.path.join("bin", "python3"), os.path.join("bin", "python")):
+        path = os.path.join(sys.prefix, candidate)
+        if os.path.isfile(path):
+            return path
+    return executable
+
+
+class _Worker:
+    """One pre-started worker process and the thread reading its replies"""
     
-    @staticmethod
-    def run_isolated(code: str, globals_dict: Dict = None, timeout: float = 30.0) -> Dict[str, Any]:
+    def __init__(self, python: str, memory_mb: int):
+        self.process = subprocess.Popen(
+            [python, "-u", WORKER_PATH, str(memory_mb)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0),
+        )
+        self.ready = False
+        self._replies: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        threading.Thread(target=self._read, name="sandbox-reader", daemon=True).start()
+    
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+    
+    def _read(self):
+        for line in self.process.stdout:
+            try:
+                self._replies.put(json.loads(line))
+            except ValueError:
+                continue
+        self._replies.put(None)  # EOF: the process is gone
+    
+    def wait_ready(self, timeout: float) -> bool:
+        if not self.ready:
+            try:
+                reply = self._replies.get(timeout=timeout)
+            except queue.Empty:
+                return False
+            self.ready = bool(reply and reply.get("ready"))
+        return self.ready
+    
+    def request(self, request_id: int, line: str, timeout: float,
+                on_output: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Send one serialised request; the reply, None if the worker died,
+        queue.Empty on timeout. Output chunks that arrive before the reply go
+        to on_output. Messages tagged with another request's id are dropped.
         """
-        Run code in isolated scope.
+        try:
+            self.process.stdin.write(line + "\n")
+            self.process.stdin.flush()
+        except (OSError, ValueError):
+            return None
+        deadline = time.monotonic() + timeout
+        while True:
+            reply = self._replies.get(timeout=max(0.0, deadline - time.monotonic()))
+            if reply is None:
+                return None
+            if reply.get("id") != request_id:
+                continue
+            if "success" in reply:
+                return reply
+            if on_output is not None:
+                try:
+                    on_output({"stream": reply.get("stream"), "text": reply.get("text", "")})
+                except Exception:
+                    pass
+    
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.wait(1.0)
+        except Exception:
+            pass
+
+
+class SandboxPool:
+    """
+    Pre-started worker processes for running generated code outside Fusion:
+    - Workers start with their imports done, including a stub adsk module
+      (scripts/adsk_stub.py), so a run costs a pipe round trip, not an
+      interpreter start
+    - Code goes over the worker's stdin as JSON; results come back the same way
+    - A run past its timeout kills the worker; a worker that crashes or
+      exceeds memory_mb exits. Either way a fresh one replaces it
+    - run_many() spreads runs over all workers, one per core by default
+    """
+    
+    def __init__(self, size: Optional[int] = None, memory_mb: Optional[int] = None,
+                 python: Optional[str] = None):
+        self.size = size or SANDBOX_CONFIG.get("workers") or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.memory_mb = SANDBOX_CONFIG.get("memory_limit_mb", 512) if memory_mb is None else memory_mb
+        self.startup_timeout = SANDBOX_CONFIG.get("startup_timeout_seconds", 30)
+        self.python = python or _python_executable()
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._ids = itertools.count(1)
+        self._closed = False
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+    
+    def _spawn(self) -> _Worker:
+        return _Worker(self.python, self.memory_mb)
+    
+    def run(self, code: str, globals_dict: Optional[Dict[str, Any]] = None,
+            timeout: float = 30.0, on_output: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
+        """
+        Run code in the next free worker. on_output receives the script's
+        output as {"stream", "text"} chunks while it runs.
         
         Returns:
             {
                 "success": bool,
                 "output": str,
                 "error": Optional[str],
+                "stack_trace": Optional[str],
                 "execution_time": float,
+                "worker": Optional[int],    # pid (None if no worker ran it)
+                "timed_out": bool,          # only when set
+                "crashed": bool,            # only when set
+                "memory_exceeded": bool,    # only when set
             }
         """
-        import time
-        
-        if globals_dict is None:
-            globals_dict = {}
-        
-        # Capture output
-        old_stdout = sys.stdout
-        old_stderr = sys.stderr
-        sys.stdout = StringIO()
-        sys.stderr = StringIO()
-        
-        start_time = time.time()
-        error = None
-        success = True
-        
+        if self._closed:
+            raise RuntimeError("Sandbox pool is closed")
+        # Serialise before taking a worker, so bad globals can't cost one
+        request_id = next(self._ids)
+        payload = {"id": request_id, "code": code, "globals": globals_dict or {}}
+        if on_output is not None:
+            payload["stream"] = True
         try:
-            exec(code, globals_dict)
-        except Exception as e:
-            success = False
-            error = str(e)
+            line = json.dumps(payload)
+        except (TypeError, ValueError) as e:
+            return {
+                "success": False,
+                "output": "",
+                "error": f"Globals must be JSON-serialisable: {e}",
+                "stack_trace": None,
+                "execution_time": 0.0,
+                "worker": None,
+            }
+        worker = self._idle.get()
+        keep = False
+        started = time.perf_counter()
+        try:
+            if not worker.wait_ready(self.startup_timeout):
+                return self._failure(worker, started, "Sandbox worker failed to start", crashed=True)
+            started = time.perf_counter()
+            try:
+                reply = worker.request(request_id, line, timeout, on_output)
+            except queue.Empty:
+                return self._failure(worker, started, f"Timed out after {timeout:g} s", timed_out=True)
+            if reply is None:
+                try:
+                    exit_code = worker.process.wait(1.0)
+                except subprocess.TimeoutExpired:
+                    exit_code = None
+                if exit_code == MEMORY_EXIT_CODE:
+                    return self._failure(worker, started, f"Memory limit exceeded ({self.memory_mb} MB)",
+                                         memory_exceeded=True)
+                return self._failure(worker, started, f"Sandbox worker crashed (exit code {exit_code})", crashed=True)
+            if reply.get("memory_exceeded"):
+                return self._failure(worker, started, reply["error"], memory_exceeded=True)
+            keep = True
+            reply.pop("id", None)
+            reply["worker"] = worker.pid
+            return reply
         finally:
-            output = sys.stdout.getvalue()
-            error_output = sys.stderr.getvalue()
-            
-            sys.stdout = old_stdout
-            sys.stderr = old_stderr
-            
-            execution_time = time.time() - start_time
-        
-        return {
-            "success": success,
-            "output": output,
-            "error": error or error_output,
-            "execution_time": execution_time,
+            if self._closed:
+                worker.kill()
+            elif keep:
+                self._idle.put(worker)
+            else:
+                worker.kill()
+                self._idle.put(self._spawn())
+    
+    def run_many(self, codes: List[str], timeout: float = 30.0) -> List[Dict[str, Any]]:
+        """Run scripts in parallel across the workers; results in input order"""
+        with ThreadPoolExecutor(max_workers=self.size) as pool:
+            return list(pool.map(lambda code: self.run(code, timeout=timeout), codes))
+    
+    @staticmethod
+    def _failure(worker: _Worker, started: float, error: str, **flags) -> Dict[str, Any]:
+        result = {
+            "success": False,
+            "output": "",
+            "error": error,
+            "stack_trace": None,
+            "execution_time": round(time.perf_counter() - started, 4),
+            "worker": worker.pid,
         }
+        result.update(flags)
+        return result
+    
+    def close(self):
+        """Stop every worker"""
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                worker.process.stdin.close()
+            except Exception:
+                pass
+            worker.kill()
+
+
+class SandboxRunner:
+    """
+    Run code in an isolated sandbox environment.
+    Captures output, exceptions, and execution time.
+    
+    Runs go to a shared SandboxPool of worker processes, started on first
+    use; shutdown() stops it.
+    """
+    
+    _pool: Optional[SandboxPool] = None
+    _pool_lock = threading.Lock()
+    
+    @classmethod
+    def pool(cls) -> SandboxPool:
+        with cls._pool_lock:
+            if cls._pool is None:
+                cls._pool = SandboxPool()
+            return cls._pool
+    
+    @classmethod
+    def run_isolated(cls, code: str, globals_dict: Dict = None, timeout: float = 30.0,
+                     on_output: Optional[Callable[[Dict[str, Any]], Any]] = None) -> Dict[str, Any]:
+        """
+        Run code in a worker process. globals_dict must be JSON-serialisable;
+        the worker adds a stub adsk module and app/doc/design. on_output
+        receives output chunks as the script prints them.
+        
+        Returns:
+            {
+                "success": bool,
+                "output": str,
+                "error": Optional[str],
+                "execution_time": float,
+                ...                         # see SandboxPool.run
+            }
+        """
+        return cls.pool().run(code, globals_dict, timeout, on_output)
+    
+    @classmethod
+    def run_many(cls, codes: List[str], timeout: float = 30.0) -> List[Dict[str, Any]]:
+        """Run several scripts in parallel, one worker each"""
+        return cls.pool().run_many(codes, timeout)
+    
+    @classmethod
+    def shutdown(cls):
+        with cls._pool_lock:
+            if cls._pool is not None:
+                cls._pool.close()
+                cls._pool = None
@@ -0,0 +1,149 @@
+"""
+Sandbox Worker - Subprocess side of the SandboxRunner worker pool
+
+Run as: python sandbox_worker.py <memory_limit_mb>
+
+Reads one JSON request per line on stdin ({"id", "code", "globals"}) and
+writes one JSON result per line to the original stdout. The script's own
+stdout/stderr are captured (and streamed as {"id", "stream", "text"}
+messages when the request sets "stream"), and fd 1 is pointed at devnull
+so stray writes can't corrupt the protocol.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+
+# Warm imports: paid once per worker, not per run
+import math  # noqa: F401
+import re  # noqa: F401
+import builtins
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import EXECUTION_CONFIG  # noqa: E402
+from core.output_capture import OutputCapture  # noqa: E402
+from scripts.adsk_stub import install  # noqa: E402
+
+install(force=True)
+import adsk  # noqa: E402
+import adsk.core  # noqa: E402
+import adsk.fusion  # noqa: E402
+
+
+def _rss_bytes() -> int:
+    """Resident memory of this process, 0 if unknown"""
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+            
+            class _Counters(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                    (name, ctypes.c_size_t) for name in (
+                        "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                        "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                        "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+            
+            counters = _Counters()
+            counters.cb = ctypes.sizeof(counters)
+            ctypes.windll.psapi.GetProcessMemoryInfo(
+                ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+            return counters.WorkingSetSize
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # bytes on macOS
+    except Exception:
+        return 0
+
+
+def _limit_memory(limit: int, send, current_id):
+    """
+    Cap the heap where the OS supports it, and poll RSS everywhere.
+    current_id() is the id of the request running, so the runner can tell
+    the report apart from the replies to other requests.
+    """
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, limit))
+    except Exception:
+        pass
+    
+    def monitor():
+        while True:
+            if _rss_bytes() > limit:
+                send({"id": current_id(), "success": False, "memory_exceeded": True,
+                      "error": f"Memory limit exceeded ({limit // (1024 * 1024)} MB)"})
+                os._exit(3)  # MEMORY_EXIT_CODE in sandbox_runner.py
+            time.sleep(0.05)
+    
+    threading.Thread(target=monitor, name="sandbox-memory", daemon=True).start()
+
+
+def _base_namespace():
+    app = adsk.core.Application.get()
+    design = adsk.fusion.Design.cast(app.activeProduct)
+    return {"__builtins__": builtins, "adsk": adsk, "app": app, "doc": app.activeDocument, "design": design}
+
+
+def main():
+    memory_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    
+    # The protocol keeps the real stdout; fd 1 goes to devnull
+    protocol = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    lock = threading.Lock()
+    
+    def send(message):
+        with lock:
+            protocol.write(json.dumps(message, default=str) + "\n")
+            protocol.flush()
+    
+    running = {"id": None}
+    if memory_mb > 0:
+        _limit_memory(memory_mb * 1024 * 1024, send, lambda: running["id"])
+    
+    base = _base_namespace()
+    send({"ready": True, "pid": os.getpid()})
+    
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        running["id"] = request.get("id")
+        exec_globals = dict(base)
+        exec_globals.update(request.get("globals") or {})
+        on_chunk = None
+        if request.get("stream"):
+            on_chunk = lambda chunk, id=request.get("id"): send(dict(chunk, id=id))
+        capture = OutputCapture(EXECUTION_CONFIG.get("output_buffer_chars", 200_000), on_chunk,
+                                EXECUTION_CONFIG.get("output_chunk_chars", 4096),
+                                EXECUTION_CONFIG.get("output_flush_seconds", 0.25))
+        started = time.perf_counter()
+        error = None
+        stack_trace = None
+        try:
+            with capture:
+                exec(compile(request["code"], "<sandbox>", "exec"), exec_globals)
+        except BaseException as e:  # SystemExit and MemoryError are results too
+            error = f"{type(e).__name__}: {e}"
+            stack_trace = traceback.format_exc()
+        send({
+            "id": request.get("id"),
+            "success": error is None,
+            "output": capture.output,
+            "error": error or capture.errors or None,
+            "stack_trace": stack_trace,
+            "execution_time": round(time.perf_counter() - started, 4),
+        })
+        running["id"] = None
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Speculative generation - generate() with and without a cancel token
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.pipeline import CancelToken, GenerationCancelled  # noqa: E402
+from core.speculative import SpeculativeGenerator  # noqa: E402
+
+
+VALID_CODE = "import adsk.core\napp = adsk.core.Application.get()\n"
+
+
+class _FakeClient:
+    """Streams a fixed response in chunks, optionally pausing between them"""
+    
+    def __init__(self, text: str, name: str = "fake", delay: float = 0.0):
+        self.text = text
+        self.name = name
+        self.delay = delay
+        self.closed = 0
+    
+    def stream(self, prompt, temperature=None):
+        client = self
+        
+        class _Stream:
+            def __iter__(self):
+                for i in range(0, len(client.text), 8):
+                    if client.delay:
+                        time.sleep(client.delay)
+                    yield client.text[i:i + 8]
+            
+            def close(self):
+                client.closed += 1
+        
+        return _Stream()
+
+
+def _parse(text: str):
+    return {"code": text, "notes": "", "error": None}
+
+
+class SpeculativeGeneratorTest(unittest.TestCase):
+    
+    def test_generate_without_token(self):
+        generator = SpeculativeGenerator([_FakeClient(VALID_CODE)], _parse, candidates=2)
+        result = generator.generate("prompt")
+        self.assertEqual(result["code"], VALID_CODE)
+        self.assertIsNone(result["error"])
+        self.assertTrue(generator.last_report["valid"])
+    
+    def test_generate_with_token_not_cancelled(self):
+        generator = SpeculativeGenerator([_FakeClient(VALID_CODE)], _parse, candidates=2)
+        result = generator.generate("prompt", cancel=CancelToken())
+        self.assertEqual(result["code"], VALID_CODE)
+    
+    def test_token_cancelled_before_start(self):
+        client = _FakeClient(VALID_CODE)
+        token = CancelToken()
+        token.cancel("user")
+        generator = SpeculativeGenerator([client], _parse)
+        with self.assertRaises(GenerationCancelled):
+            generator.generate("prompt", cancel=token)
+        self.assertEqual(client.closed, 0)
+    
+    def test_token_cancelled_mid_stream(self):
+        client = _FakeClient(VALID_CODE * 20, delay=0.05)
+        token = CancelToken()
+        threading.Timer(0.2, token.cancel, args=("user",)).start()
+        generator = SpeculativeGenerator([client], _parse, candidates=2)
+        started = time.perf_counter()
+        with self.assertRaises(GenerationCancelled):
+            generator.generate("prompt", cancel=token)
+        self.assertLess(time.perf_counter() - started, 2.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,244 @@
+"""
+File Watch - Keeps a project file index current as files change
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+
+# inotify(7) event bits
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = (IN_CLOSE_WRITE | IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """
+    Minimal inotify(7) binding over libc (Linux only):
+    - One watch per directory (inotify is not recursive)
+    - read() returns (watch descriptor, mask, name) events, waiting at most timeout
+    """
+    
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+    
+    def add_watch(self, path: str, mask: int = WATCH_MASK) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), path)
+        return wd
+    
+    def remove_watch(self, wd: int):
+        self._libc.inotify_rm_watch(self.fd, wd)
+    
+    def read(self, timeout: float) -> List[Tuple[int, int, str]]:
+        readable, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+            offset += _EVENT.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            events.append((wd, mask, name))
+        return events
+    
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class ProjectWatcher:
+    """
+    Background thread that keeps a ProjectFileScanner's index current:
+    - "inotify" mode (Linux): a watch on every directory; events only mark
+      their directory dirty, and only dirty directories are listed again
+    - "poll" mode (elsewhere, or if inotify is unavailable or out of
+      watches): the scanner's incremental walk every poll_seconds
+    - Changes are debounced: a batch is applied debounce_seconds after
+      the last event (at most max_delay_seconds after the first), so a
+      burst of saves or a folder copy becomes one update
+    
+    inotify only sees changes made through this machine's kernel; for
+    projects on network shares edited from other machines use "poll".
+    """
+    
+    def __init__(self, scanner, mode: str = "auto", debounce_seconds: float = 0.5,
+                 max_delay_seconds: float = 5.0, poll_seconds: float = 30.0):
+        self.scanner = scanner
+        self.mode = mode
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max(max_delay_seconds, debounce_seconds)
+        self.poll_seconds = poll_seconds
+        self.batches = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inotify: Optional[Inotify] = None
+        self._wd_dirs: Dict[int, str] = {}
+        self._dir_wds: Dict[str, int] = {}
+    
+    def start(self):
+        if self.mode in ("auto", "inotify"):
+            try:
+                self._inotify = Inotify()
+                self._watch_new_dirs(strict=True)
+                self.mode = "inotify"
+                # Catch up on changes made between the scan and the watches
+                self._apply(self.scanner._poll)
+            except OSError:
+                # Not Linux, or fs.inotify.max_user_watches is too low for this tree
+                self._close_inotify()
+                self.mode = "poll"
+        target = self._run_inotify if self.mode == "inotify" else self._run_poll
+        self._thread = threading.Thread(target=target, name="project-watch", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._close_inotify()
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def _run_poll(self):
+        while not self._stop.wait(self.poll_seconds):
+            self._apply(self.scanner._poll)
+    
+    def _run_inotify(self):
+        dirty: Set[str] = set()
+        full_rescan = False
+        first_event = deadline = 0.0
+        while not self._stop.is_set():
+            timeout = 0.5 if not (dirty or full_rescan) else min(0.5, deadline - time.monotonic())
+            try:
+                events = self._inotify.read(timeout)
+            except (OSError, ValueError):
+                break
+            
+            marked = False
+            for wd, mask, name in events:
+                if mask & IN_Q_OVERFLOW:
+                    full_rescan = marked = True
+                    continue
+                if mask & IN_IGNORED:
+                    rel_dir = self._wd_dirs.pop(wd, None)
+                    if rel_dir is not None and self._dir_wds.get(rel_dir) == wd:
+                        del self._dir_wds[rel_dir]
+                    continue
+                rel_dir = self._wd_dirs.get(wd)
+                if rel_dir is None:
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    # Seen by the parent too; only the root has no parent to report it
+                    if rel_dir == "":
+                        dirty.add(rel_dir)
+                        marked = True
+                    continue
+                if mask & IN_ISDIR:
+                    if self.scanner._is_ignored(name):
+                        continue
+                elif self.scanner._category(name) is None:
+                    continue
+                dirty.add(rel_dir)
+                marked = True
+            
+            now = time.monotonic()
+            if marked:
+                if not first_event:
+                    first_event = now
+                deadline = min(now + self.debounce_seconds, first_event + self.max_delay_seconds)
+            if (dirty or full_rescan) and now >= deadline:
+                if full_rescan:
+                    self._apply(self.scanner._poll)
+                else:
+                    batch = set(dirty)
+                    self._apply(lambda: self.scanner._refresh(batch))
+                dirty.clear()
+                full_rescan = False
+                first_event = 0.0
+                # Files created in a new directory before its watch existed are
+                # only found by listing it again once it is watched
+                added = self._watch_new_dirs()
+                if added:
+                    dirty.update(added)
+                    first_event = now
+                    deadline = now + self.debounce_seconds
+    
+    def _apply(self, update: Callable[[], None]):
+        try:
+            update()
+            self.batches += 1
+        except Exception:
+            # A failed batch is retried by the next event or poll; the watcher keeps running
+            pass
+    
+    def _watch_new_dirs(self, strict: bool = False) -> List[str]:
+        """
+        Add watches for directories new to the index, drop those that left
+        it. strict: raise if a watch can't be added, instead of skipping it.
+        """
+        root = str(self.scanner.project_root)
+        directories = self.scanner._manifest or {}
+        for rel_dir in list(self._dir_wds):
+            if rel_dir not in directories:
+                wd = self._dir_wds.pop(rel_dir)
+                if self._wd_dirs.get(wd) == rel_dir:
+                    del self._wd_dirs[wd]
+                    self._inotify.remove_watch(wd)
+        added = []
+        for rel_dir in directories:
+            if rel_dir in self._dir_wds:
+                continue
+            try:
+                wd = self._inotify.add_watch(os.path.join(root, rel_dir) if rel_dir else root)
+            except OSError:
+                if strict:
+                    raise
+                continue
+            # A renamed directory keeps its watch descriptor under its new path
+            self._wd_dirs[wd] = rel_dir
+            self._dir_wds[rel_dir] = wd
+            added.append(rel_dir)
+        return added
+    
+    def _close_inotify(self):
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
@@ -2,9 +2,24 @@
 Filesystem Tools - Read project files and geometry metadata
 """
 
+import fnmatch
+import hashlib
+import json
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Set, Tuple
+
+from config import PROJECT_CONFIG
+from tools.file_watch import ProjectWatcher
+
+
+CATEGORIES = ("geometry_files", "documentation", "images", "tool_libraries")
+EXTRACTED_CATEGORIES = ("geometry_files", "tool_libraries")
+MANIFEST_VERSION = 1
+RACY_SECONDS = 2.0  # Coarsest directory mtime resolution we expect (FAT, some network shares)
 
 
 class ProjectFileScanner:
@@ -14,19 +29,47 @@ class ProjectFileScanner:
     - Documentation (TXT, MD, PDF)
     - Tool libraries (JSON)
     - Images/blueprints (PNG, JPG)
+    
+    Scans are incremental: a manifest of every directory's mtime and its
+    categorised files (size, mtime, category) is kept on disk, and a
+    rescan only lists directories whose mtime changed (a file was added,
+    removed or renamed in them). Ignored trees are never entered, and
+    directories are listed in parallel.
+    
+    watch() keeps the index current in the background instead (inotify on
+    Linux, polling elsewhere; see tools/file_watch.py), so queries never
+    touch the disk and only changed files have their metadata extracted.
     """
     
     GEOMETRY_EXTENSIONS = {'.stl', '.step', '.stp', '.iges', '.igs', '.obj'}
     DOC_EXTENSIONS = {'.txt', '.md', '.json', '.pdf'}
     IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.bmp'}
     
-    def __init__(self, project_root: Optional[str] = None):
+    def __init__(self, project_root: Optional[str] = None, manifest_path: Optional[str] = None,
+                 ignore_dirs: Optional[List[str]] = None, workers: Optional[int] = None):
         self.project_root = Path(project_root) if project_root else None
+        self.ignore_dirs = list(PROJECT_CONFIG.get("ignore_dirs", []) if ignore_dirs is None else ignore_dirs)
+        self.workers = max(1, workers or PROJECT_CONFIG.get("scan_workers", 8))
+        self.manifest_path = manifest_path if manifest_path is not None else self._default_manifest_path()
+        self.last_scan: Dict[str, Any] = {}
+        self._manifest: Optional[Dict[str, Dict[str, Any]]] = None
+        self._result: Optional[Dict[str, List[str]]] = None
+        self._metadata: Dict[str, Tuple[int, int, Any]] = {}
+        self._lock = threading.Lock()
+        self._watcher: Optional[ProjectWatcher] = None
+        self._on_change: Optional[Callable[[Dict[str, List[str]]], None]] = None
+        self._ignore_names = {p for p in self.ignore_dirs if not any(c in p for c in "*?[")}
+        self._ignore_patterns = [p for p in self.ignore_dirs if p not in self._ignore_names]
     
     def scan_project(self) -> Dict[str, List[str]]:
         """
         Scan project directory and categorize files.
         
+        Only directories changed since the last scan (of this process or a
+        previous one, via the manifest) are listed again. Files modified in
+        place keep their recorded size/mtime until their directory changes.
+        While watching, the live index is returned without a scan.
+        
         Returns:
             {
                 "geometry_files": [...],
@@ -35,38 +78,297 @@ class ProjectFileScanner:
                 "tool_libraries": [...],
             }
         """
-        if not self.project_root or not self.project_root.exists():
-            return {
-                "geometry_files": [],
-                "documentation": [],
-                "images": [],
-                "tool_libraries": [],
-            }
+        if self._watcher is not None:
+            return self._categorised()
+        if not self.project_root or not self.project_root.is_dir():
+            return {category: [] for category in CATEGORIES}
+        
+        started = time.time()
+        previous = self._load_manifest()
+        directories, rescanned = self._walk(previous)
+        self._update(directories, rescanned or len(directories) != len(previous))
+        result = self._categorised()
         
-        result = {
-            "geometry_files": [],
-            "documentation": [],
-            "images": [],
-            "tool_libraries": [],
+        self.last_scan = {
+            "directories": len(directories),
+            "rescanned": rescanned,
+            "files": sum(len(files) for files in result.values()),
+            "seconds": round(time.time() - started, 3),
         }
+        return result
+    
+    def watch(self, on_change: Optional[Callable[[Dict[str, List[str]]], None]] = None,
+              mode: Optional[str] = None) -> "ProjectWatcher":
+        """
+        Keep the file index current in the background.
+        
+        Args:
+            on_change: Called from the watcher thread after each batch with
+                {"changed": [...], "removed": [...]} relative paths
+            mode: "auto", "inotify" or "poll" (default PROJECT_CONFIG["watch_mode"])
+        
+        Returns:
+            The running ProjectWatcher (its mode says which one is in use)
+        """
+        if self._watcher is not None:
+            return self._watcher
+        self.scan_project()
+        self._on_change = on_change
+        watcher = ProjectWatcher(
+            self,
+            mode=mode or PROJECT_CONFIG.get("watch_mode", "auto"),
+            debounce_seconds=PROJECT_CONFIG.get("watch_debounce_seconds", 0.5),
+            max_delay_seconds=PROJECT_CONFIG.get("watch_max_delay_seconds", 5.0),
+            poll_seconds=PROJECT_CONFIG.get("watch_poll_seconds", 30.0),
+        )
+        self._watcher = watcher
+        watcher.start()
+        return watcher
+    
+    def stop_watching(self):
+        """Stop the watcher; later scan_project() calls scan again"""
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            watcher.stop()
+    
+    def get_metadata(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Extracted metadata of an indexed geometry file or tool library.
         
-        for file_path in self.project_root.rglob('*'):
-            if not file_path.is_file():
+        Extracted on first request and kept until the file changes; while
+        watching, changed files are re-extracted as soon as they change.
+        
+        Args:
+            file_path: Relative path from project root, as returned by scan_project()
+        
+        Returns:
+            Metadata dict, or None if the file isn't indexed or has no extractor
+        """
+        with self._lock:
+            info = self._file_info(file_path)
+            cached = self._metadata.get(file_path)
+        if info is None or info[2] not in EXTRACTED_CATEGORIES:
+            return None
+        if cached is not None and cached[:2] == (info[0], info[1]):
+            return cached[2]
+        return self._extract(file_path, info)
+    
+    def _file_info(self, file_path: str) -> Optional[List[Any]]:
+        rel_dir, name = os.path.split(file_path)
+        record = (self._manifest or {}).get(rel_dir)
+        return record["files"].get(name) if record else None
+    
+    def _extract(self, file_path: str, info: List[Any]) -> Dict[str, Any]:
+        full_path = os.path.join(str(self.project_root), file_path)
+        if info[2] == "geometry_files":
+            metadata = GeometryMetadataExtractor().extract_metadata(full_path)
+        else:
+            metadata = {"tools": ToolLibraryLoader().load_tool_library(full_path)}
+        with self._lock:
+            self._metadata[file_path] = (info[0], info[1], metadata)
+        return metadata
+    
+    def _categorised(self) -> Dict[str, List[str]]:
+        with self._lock:
+            if self._result is None:
+                result = {category: [] for category in CATEGORIES}
+                directories = self._manifest or {}
+                for rel_dir in sorted(directories):
+                    files = directories[rel_dir]["files"]
+                    for name in sorted(files):
+                        result[files[name][2]].append(os.path.join(rel_dir, name) if rel_dir else name)
+                self._result = result
+            return {category: list(paths) for category, paths in self._result.items()}
+    
+    def _update(self, directories: Dict[str, Dict[str, Any]], changed: bool):
+        with self._lock:
+            self._manifest = directories
+            if changed:
+                self._result = None
+        if changed:
+            self._save_manifest(directories)
+    
+    def _poll(self):
+        """Watcher: incremental walk of the whole tree"""
+        previous = self._manifest or {}
+        directories, rescanned = self._walk(previous)
+        self._apply_changes(previous, directories, rescanned)
+    
+    def _refresh(self, dirty: Set[str]):
+        """Watcher: list only the dirty directories, and any new subdirectories in full"""
+        root = str(self.project_root)
+        started = time.time()
+        previous = self._manifest or {}
+        directories = dict(previous)
+        pending = sorted(dirty, reverse=True)  # Parents first, so removed trees are dropped once
+        listed = 0
+        while pending:
+            rel_dir = pending.pop()
+            if rel_dir and os.path.dirname(rel_dir) not in directories:
                 continue
-            
-            suffix = file_path.suffix.lower()
-            relative_path = str(file_path.relative_to(self.project_root))
-            
-            if suffix in self.GEOMETRY_EXTENSIONS:
-                result["geometry_files"].append(relative_path)
-            elif suffix in self.IMAGE_EXTENSIONS:
-                result["images"].append(relative_path)
-            elif suffix == '.json':
-                result["tool_libraries"].append(relative_path)
-            elif suffix in {'.txt', '.md', '.pdf'}:
-                result["documentation"].append(relative_path)
+            visited = self._visit(root, rel_dir, {}, started)
+            if visited is None:
+                _drop_tree(directories, rel_dir)
+                continue
+            record = visited[1]
+            listed += 1
+            before = previous.get(rel_dir)
+            directories[rel_dir] = record
+            for name in set(before["dirs"]) - set(record["dirs"]) if before else ():
+                _drop_tree(directories, os.path.join(rel_dir, name) if rel_dir else name)
+            for name in record["dirs"]:
+                child = os.path.join(rel_dir, name) if rel_dir else name
+                if child not in directories:
+                    pending.append(child)
+        self._apply_changes(previous, directories, listed)
+    
+    def _apply_changes(self, previous: Dict[str, Dict[str, Any]], directories: Dict[str, Dict[str, Any]],
+                       listed: int):
+        """Watcher: swap in the new manifest, re-extract changed files and report them"""
+        changed, removed = _diff_manifests(previous, directories)
+        self._update(directories, bool(listed) or len(directories) != len(previous))
+        if not changed and not removed:
+            return
+        with self._lock:
+            for file_path in removed:
+                self._metadata.pop(file_path, None)
+        for file_path in changed:
+            info = self._file_info(file_path)
+            if info is not None and info[2] in EXTRACTED_CATEGORIES:
+                self._extract(file_path, info)
+        if self._on_change:
+            self._on_change({"changed": changed, "removed": removed})
+    
+    def _walk(self, previous: Dict[str, Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """Visit every directory from the root; returns the new manifest and how many were listed"""
+        root = str(self.project_root)
+        started = time.time()
+        directories: Dict[str, Dict[str, Any]] = {}
+        rescanned = 0
         
-        return result
+        if self.workers == 1:
+            stack = [""]
+            while stack:
+                visited = self._visit(root, stack.pop(), previous, started)
+                if visited:
+                    rel_dir, record, listed = visited
+                    directories[rel_dir] = record
+                    rescanned += listed
+                    stack.extend(os.path.join(rel_dir, name) if rel_dir else name for name in record["dirs"])
+            return directories, rescanned
+        
+        # Each directory is one task; its subdirectories are submitted as it completes
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="project-scan") as pool:
+            pending = {pool.submit(self._visit, root, "", previous, started)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    visited = future.result()
+                    if not visited:
+                        continue
+                    rel_dir, record, listed = visited
+                    directories[rel_dir] = record
+                    rescanned += listed
+                    for name in record["dirs"]:
+                        child = os.path.join(rel_dir, name) if rel_dir else name
+                        pending.add(pool.submit(self._visit, root, child, previous, started))
+        return directories, rescanned
+    
+    def _visit(self, root: str, rel_dir: str, previous: Dict[str, Dict[str, Any]],
+               started: float) -> Optional[Tuple[str, Dict[str, Any], int]]:
+        """One directory: reuse its manifest record if its mtime is unchanged, otherwise list it"""
+        path = os.path.join(root, rel_dir) if rel_dir else root
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        
+        record = previous.get(rel_dir)
+        if record is not None and record["mtime"] == mtime:
+            return rel_dir, record, 0
+        
+        files: Dict[str, List[Any]] = {}
+        dirs: List[str] = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not self._is_ignored(entry.name):
+                                dirs.append(entry.name)
+                            continue
+                        category = self._category(entry.name)
+                        if category and entry.is_file():
+                            stat = entry.stat()
+                            files[entry.name] = [stat.st_size, stat.st_mtime_ns, category]
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        
+        # A change in the same timestamp tick as this listing would go unnoticed, so
+        # directories modified just now are listed again next time (as git does for racy files)
+        if started - mtime / 1e9 < RACY_SECONDS:
+            mtime = -1
+        return rel_dir, {"mtime": mtime, "dirs": dirs, "files": files}, 1
+    
+    def _is_ignored(self, name: str) -> bool:
+        return name in self._ignore_names or any(fnmatch.fnmatch(name, p) for p in self._ignore_patterns)
+    
+    def _category(self, name: str) -> Optional[str]:
+        suffix = os.path.splitext(name)[1].lower()
+        if suffix in self.GEOMETRY_EXTENSIONS:
+            return "geometry_files"
+        if suffix in self.IMAGE_EXTENSIONS:
+            return "images"
+        if suffix == '.json':
+            return "tool_libraries"
+        if suffix in {'.txt', '.md', '.pdf'}:
+            return "documentation"
+        return None
+    
+    def _default_manifest_path(self) -> Optional[str]:
+        manifest_dir = PROJECT_CONFIG.get("manifest_dir")
+        if manifest_dir == "" or not self.project_root:
+            return None
+        if manifest_dir is None:
+            addin_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            manifest_dir = os.path.join(addin_path, ".cache", "projects")
+        key = hashlib.sha256(str(self.project_root.resolve()).encode("utf-8")).hexdigest()[:16]
+        return os.path.join(manifest_dir, f"{key}.json")
+    
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        if self._manifest is not None:
+            return self._manifest
+        if not self.manifest_path:
+            return {}
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if (data.get("version") != MANIFEST_VERSION or data.get("root") != str(self.project_root)
+                    or data.get("ignore_dirs") != self.ignore_dirs):
+                return {}
+            return data["directories"]
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            return {}
+    
+    def _save_manifest(self, directories: Dict[str, Dict[str, Any]]):
+        if not self.manifest_path:
+            return
+        data = {
+            "version": MANIFEST_VERSION,
+            "root": str(self.project_root),
+            "ignore_dirs": self.ignore_dirs,
+            "directories": directories,
+        }
+        tmp_path = self.manifest_path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(tmp_path, self.manifest_path)
+        except OSError:
+            pass
     
     def read_file_content(self, file_path: str, max_lines: int = 100) -> Optional[str]:
         """
@@ -100,6 +402,37 @@ class ProjectFileScanner:
             return None
 
 
+def _drop_tree(directories: Dict[str, Dict[str, Any]], rel_dir: str):
+    """Remove a directory and everything below it from a manifest"""
+    if not rel_dir:
+        directories.clear()
+        return
+    prefix = rel_dir + os.sep
+    for key in [key for key in directories if key == rel_dir or key.startswith(prefix)]:
+        del directories[key]
+
+
+def _diff_manifests(previous: Dict[str, Dict[str, Any]],
+                    current: Dict[str, Dict[str, Any]]) -> Tuple[List[str], List[str]]:
+    """Files added or modified, and files removed, between two manifests"""
+    changed: List[str] = []
+    removed: List[str] = []
+    for rel_dir, record in current.items():
+        before = previous.get(rel_dir)
+        if before is record:
+            continue
+        before_files = before["files"] if before else {}
+        for name, info in record["files"].items():
+            if before_files.get(name) != info:
+                changed.append(os.path.join(rel_dir, name) if rel_dir else name)
+        removed.extend(os.path.join(rel_dir, name) if rel_dir else name
+                       for name in before_files if name not in record["files"])
+    for rel_dir, before in previous.items():
+        if rel_dir not in current:
+            removed.extend(os.path.join(rel_dir, name) if rel_dir else name for name in before["files"])
+    return sorted(changed), sorted(removed)
+
+
 class GeometryMetadataExtractor:
     """
     Extract structured metadata from geometry files:
@@ -6,6 +6,12 @@ let currentPlan = null;
 let currentTitle = null;
 let currentNotes = null;
 let isExecuting = false;
+let isStreaming = false;
+let requestCounter = 0;
+let activeRequestId = null;  // Events for any other request are stale (superseded)
+let lastUserMessage = null;  // Resent by Regenerate
+let liveOutputTail = '';  // Streamed output after the last newline
+const MAX_LIVE_OUTPUT_LINES = 500;
 
 // Initialize
 document.addEventListener('DOMContentLoaded', () => {
@@ -29,6 +35,7 @@ function initializeEventListeners() {
     // Code panel buttons
     document.getElementById('explainBtn').addEventListener('click', explainCode);
     document.getElementById('copyBtn').addEventListener('click', copyCode);
+    document.getElementById('regenerateBtn').addEventListener('click', regenerateCode);
     document.getElementById('applyBtn').addEventListener('click', applyCode);
     document.getElementById('rejectBtn').addEventListener('click', rejectCode);
     
@@ -63,11 +70,131 @@ function sendMessage() {
     userInput.value = '';
     userInput.style.height = 'auto';
     
-    // Simulate API call (will be connected to Python backend)
+    requestGeneration(message, false);
+}
+
+// Ask again for the last message, bypassing cached responses
+function regenerateCode() {
+    if (!lastUserMessage) return;
+    addMessage('Regenerating...', 'system');
+    requestGeneration(lastUserMessage, true);
+}
+
+function requestGeneration(message, force) {
+    lastUserMessage = message;
+    
+    // A newer message supersedes the one still generating
+    removeGeneratingMessage();
     displayGeneratingMessage();
     
-    // TODO: Call Python backend via Fusion API bridge
-    simulateCodeGeneration(message);
+    if (isFusionBridgeAvailable()) {
+        // Partial results arrive as streamEvent, the final one as generationResult
+        isStreaming = false;
+        activeRequestId = ++requestCounter;
+        adsk.fusionSendData('sendMessage', JSON.stringify({ message: message, requestId: activeRequestId, force: force }));
+    } else {
+        simulateCodeGeneration(message);
+    }
+}
+
+function cancelGeneration() {
+    if (activeRequestId === null) return;
+    if (isFusionBridgeAvailable()) {
+        adsk.fusionSendData('cancelGeneration', JSON.stringify({ requestId: activeRequestId }));
+    }
+}
+
+function isFusionBridgeAvailable() {
+    return typeof adsk !== 'undefined' && typeof adsk.fusionSendData === 'function';
+}
+
+// Messages from Python (palette.sendInfoToHTML)
+window.fusionJavaScriptHandler = {
+    handle: function(action, data) {
+        try {
+            const payload = data ? JSON.parse(data) : null;
+            if (payload && payload.requestId !== undefined && payload.requestId !== activeRequestId) {
+                return 'OK';  // From a superseded request
+            }
+            if (action === 'streamEvent') {
+                handleStreamEvent(payload);
+            } else if (action === 'generationResult') {
+                handleGenerationResult(payload);
+            } else if (action === 'generationCancelled') {
+                handleGenerationCancelled(payload);
+            } else if (action === 'executionOutput') {
+                handleExecutionOutput(payload);
+            } else if (action === 'executionResult') {
+                handleExecutionResult(payload);
+            }
+        } catch (e) {
+            console.log('Error handling ' + action + ': ' + e);
+        }
+        return 'OK';
+    }
+};
+
+function startStreamingPanel() {
+    isStreaming = true;
+    removeGeneratingMessage();
+    
+    currentCode = '';
+    currentPlan = [];
+    currentTitle = 'Generating...';
+    currentNotes = '';
+    
+    document.getElementById('codeTitle').textContent = currentTitle;
+    document.getElementById('planList').innerHTML = '';
+    document.getElementById('planSection').style.display = 'none';
+    document.getElementById('codeBlock').textContent = '';
+    document.getElementById('notesSection').style.display = 'none';
+    
+    document.getElementById('codePanel').style.display = 'block';
+    document.getElementById('executionPanel').style.display = 'none';
+    document.getElementById('errorPanel').style.display = 'none';
+}
+
+function handleStreamEvent(event) {
+    if (!isStreaming) startStreamingPanel();
+    
+    if (event.type === 'title') {
+        currentTitle = event.value;
+        document.getElementById('codeTitle').textContent = currentTitle;
+    } else if (event.type === 'plan_item') {
+        currentPlan.push(event.value);
+        const item = document.createElement('li');
+        item.textContent = event.value;
+        document.getElementById('planList').appendChild(item);
+        document.getElementById('planSection').style.display = 'block';
+    } else if (event.type === 'code') {
+        currentCode += event.value;
+        document.getElementById('codeBlock').textContent = currentCode;
+    } else if (event.type === 'notes') {
+        currentNotes = event.value;
+        document.getElementById('noteText').textContent = currentNotes;
+        document.getElementById('notesSection').style.display = 'block';
+    }
+}
+
+function handleGenerationResult(result) {
+    isStreaming = false;
+    activeRequestId = null;
+    removeGeneratingMessage();
+    
+    if (result.error) {
+        document.getElementById('codePanel').style.display = 'none';
+        addMessage(`Error: ${result.error}`, 'system');
+        return;
+    }
+    showCodePanel(result);
+}
+
+function handleGenerationCancelled(payload) {
+    isStreaming = false;
+    activeRequestId = null;
+    removeGeneratingMessage();
+    document.getElementById('codePanel').style.display = 'none';
+    addMessage('Generation cancelled', 'system');
 }
 
 function addMessage(text, type = 'assistant') {
@@ -84,7 +211,8 @@ function displayGeneratingMessage() {
     const messageDiv = document.createElement('div');
     messageDiv.className = 'message system';
     messageDiv.id = 'generatingMessage';
-    messageDiv.innerHTML = '<p>Generating code... ⏳</p>';
+    messageDiv.innerHTML = '<p>Generating code... ⏳ <button class="stop-btn" title="Stop generating">Stop</button></p>';
+    messageDiv.querySelector('.stop-btn').addEventListener('click', cancelGeneration);
     messagesContainer.appendChild(messageDiv);
     messagesContainer.scrollTop = messagesContainer.scrollHeight;
 }
@@ -206,13 +334,22 @@ function rejectCode() {
 }
 
 function executeCode(code) {
-    // TODO: Call Python backend to execute code
     const executionPanel = document.getElementById('executionPanel');
     const executionStatus = document.getElementById('executionStatus');
     
     executionPanel.style.display = 'block';
     document.getElementById('codePanel').style.display = 'none';
+    document.getElementById('profileReport').style.display = 'none';
     executionStatus.innerHTML = '<p>Executing code in Fusion 360...</p>';
+    document.getElementById('executionOutput').innerHTML = '';
+    liveOutputTail = '';
+    
+    if (isFusionBridgeAvailable()) {
+        // Output arrives as executionOutput while the script runs, the result as executionResult
+        const profile = document.getElementById('profileCheckbox').checked;
+        adsk.fusionSendData('executeCode', JSON.stringify({ code: code, profile: profile }));
+        return;
+    }
     
     // Simulate execution
     setTimeout(() => {
@@ -232,6 +369,72 @@ function executeCode(code) {
     }, 1500);
 }
 
+function handleExecutionOutput(chunk) {
+    if (!isExecuting) return;  // Late chunk from a finished run
+    const output = document.getElementById('executionOutput');
+    const lines = (liveOutputTail + chunk.text).split('\n');
+    liveOutputTail = lines.pop();
+    for (const line of lines) {
+        const p = document.createElement('p');
+        p.textContent = line;
+        if (chunk.stream === 'stderr') p.className = 'output-stderr';
+        output.appendChild(p);
+    }
+    // Keep the DOM small however much the script prints; the result has the full (bounded) output
+    while (output.childElementCount > MAX_LIVE_OUTPUT_LINES) {
+        output.removeChild(output.firstElementChild);
+    }
+    output.scrollTop = output.scrollHeight;
+}
+
+function handleExecutionResult(result) {
+    isExecuting = false;
+    liveOutputTail = '';
+    if (!result.success) {
+        showErrorPanel({
+            error: result.error,
+            stack_trace: result.stack_trace,
+            suggestions: result.likely_fixes || []
+        });
+        return;
+    }
+    
+    document.getElementById('executionStatus').innerHTML =
+        `<p style="color: green;">✓ Code executed successfully in ${(result.execution_time * 1000).toFixed(0)} ms</p>`;
+    document.getElementById('executionOutput').innerHTML = result.output
+        ? result.output.split('\n').filter(line => line).map(line => `<p>${escapeHtml(line)}</p>`).join('')
+        : '<p>(no output)</p>';
+    showProfileReport(result.profile);
+}
+
+function showProfileReport(profile) {
+    const report = document.getElementById('profileReport');
+    if (!profile) {
+        report.style.display = 'none';
+        return;
+    }
+    
+    let html = `<strong>Hotspots</strong> <span class="profile-total">` +
+        `${profile.wall_ms.toFixed(1)} ms wall, ${profile.cpu_ms.toFixed(1)} ms CPU</span>`;
+    
+    if (profile.lines.length > 0) {
+        html += '<table class="profile-table"><tr><th>Line</th><th>Code</th><th>Hits</th><th>ms</th><th>%</th></tr>' +
+            profile.lines.map(l => `<tr><td>${l.line}</td><td class="profile-source">${escapeHtml(l.source)}</td>` +
+                `<td>${l.hits}</td><td>${l.wall_ms.toFixed(2)}</td><td>${l.percent.toFixed(1)}</td></tr>`).join('') +
+            '</table>';
+    }
+    
+    if (profile.calls.length > 0) {
+        html += '<table class="profile-table"><tr><th>Line</th><th>API call</th><th>Calls</th><th>ms</th><th>ms/call</th></tr>' +
+            profile.calls.map(c => `<tr><td>${c.line}</td><td class="profile-source">${escapeHtml(c.call)}</td>` +
+                `<td>${c.count}</td><td>${c.wall_ms.toFixed(2)}</td><td>${c.per_call_ms.toFixed(3)}</td></tr>`).join('') +
+            '</table>';
+    }
+    
+    report.innerHTML = html;
+    report.style.display = 'block';
+}
+
 function undoExecution() {
     // TODO: Call Fusion API to undo
     addMessage("Last operation undone.", 'system');
@@ -294,6 +497,7 @@ function saveSettings() {
         model: document.getElementById('modelSelect').value,
         projectRoot: document.getElementById('projectRoot').value,
         autoRun: document.getElementById('autoRunCheckbox').checked,
+        profile: document.getElementById('profileCheckbox').checked,
     };
     localStorage.setItem('copilotSettings', JSON.stringify(settings));
     closeSettings();
@@ -307,6 +511,7 @@ function loadSettings() {
         document.getElementById('modelSelect').value = settings.model || 'openai';
         document.getElementById('projectRoot').value = settings.projectRoot || '';
         document.getElementById('autoRunCheckbox').checked = settings.autoRun || false;
+        document.getElementById('profileCheckbox').checked = settings.profile || false;
     }
 }
 